@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from agent import tracing
+from agent.nodes import create_initial_state, get_file_ranker, get_request_scheduler, get_response_cache, \
+    get_summary_cache
+
+DEFAULT_CONCURRENCY = 4
+STATUS_SUCCESS = "success"
+STATUS_ERROR = "error"
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def read_repo_urls(lines) -> list:
+    """
+    Reads repo urls, one per line, skipping blank lines and comments
+    :param lines: iterable of lines from file or stdin
+    :return: list of repo urls
+    """
+    repo_urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            repo_urls.append(line)
+    return repo_urls
+
+
+def run_batch(graph, repo_urls: list, concurrency: int = DEFAULT_CONCURRENCY) -> dict:
+    """
+    Runs compiled graph for many repos with bounded concurrency
+    :param graph: compiled graph shared between runs
+    :param repo_urls: list of github repo urls
+    :param concurrency: max number of graph runs in flight
+    :return: manifest with per-repo results and summary
+    """
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="readme-agent") as executor:
+        results = list(executor.map(lambda repo_url: run_repo(graph, repo_url), repo_urls))
+
+    return _build_manifest(results, concurrency, time.perf_counter() - start)
+
+
+async def arun_batch(graph, repo_urls: list, concurrency: int = DEFAULT_CONCURRENCY) -> dict:
+    """
+    Runs compiled async graph for many repos on one event loop with bounded concurrency
+    :param graph: compiled graph with async nodes shared between runs
+    :param repo_urls: list of github repo urls
+    :param concurrency: max number of graph runs in flight
+    :return: manifest with per-repo results and summary
+    """
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_with_limit(repo_url: str) -> dict:
+        async with semaphore:
+            return await _arun_repo(graph, repo_url)
+
+    results = await asyncio.gather(*(run_with_limit(repo_url) for repo_url in repo_urls))
+
+    return _build_manifest(list(results), concurrency, time.perf_counter() - start)
+
+
+def write_manifest(manifest: dict, manifest_path: str) -> None:
+    """
+    Writes batch manifest as json file
+    :param manifest: batch manifest
+    :param manifest_path: path of the manifest file
+    """
+    with open(manifest_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    logger.info(f"Batch manifest written to '{manifest_path}'")
+
+
+def run_repo(graph, repo_url: str) -> dict:
+    """
+    Runs compiled graph for a single repo and records result or error
+    :param graph: compiled graph
+    :param repo_url: github repo url
+    :return: manifest entry
+    """
+    start = time.perf_counter()
+
+    try:
+        with tracing.run(repo_url=repo_url):
+            state = graph.invoke(create_initial_state(repo_url=repo_url))
+    except Exception as e:
+        return _error_result(repo_url, e, start)
+
+    return _success_result(repo_url, state, start)
+
+
+def _build_manifest(results: list, concurrency: int, elapsed: float) -> dict:
+    """
+    Builds batch manifest with throughput summary
+    :param results: per-repo manifest entries
+    :param concurrency: max number of graph runs in flight
+    :param elapsed: batch wall time in seconds
+    :return: batch manifest
+    """
+    succeeded = sum(1 for result in results if result["status"] == STATUS_SUCCESS)
+    summary = {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "repos_per_minute": round(len(results) / elapsed * 60, 2) if elapsed else 0.0,
+    }
+    file_ranker = get_file_ranker()
+    if file_ranker is not None:
+        summary["file_ranker"] = file_ranker.stats()
+    summary["llm_requests"] = get_request_scheduler().stats()
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        summary["response_cache"] = response_cache.stats()
+    summary_cache = get_summary_cache()
+    if summary_cache is not None:
+        summary["summary_cache"] = summary_cache.stats()
+    logger.info(f"Batch finished: {summary}")
+
+    return {"summary": summary, "results": results}
+
+
+async def _arun_repo(graph, repo_url: str) -> dict:
+    """
+    Runs compiled async graph for a single repo and records result or error
+    :param graph: compiled graph with async nodes
+    :param repo_url: github repo url
+    :return: manifest entry
+    """
+    start = time.perf_counter()
+
+    try:
+        with tracing.run(measure_cpu=False, repo_url=repo_url):
+            state = await graph.ainvoke(create_initial_state(repo_url=repo_url))
+    except Exception as e:
+        return _error_result(repo_url, e, start)
+
+    return _success_result(repo_url, state, start)
+
+
+def _success_result(repo_url: str, state: dict, start: float) -> dict:
+    return {
+        "repo_url": repo_url,
+        "status": STATUS_SUCCESS,
+        "readme_path": os.path.join(state["temp_directory_path"], "README.md"),
+        "error": None,
+        "duration_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def _error_result(repo_url: str, error: Exception, start: float) -> dict:
+    logger.error(f"Error generating README for {repo_url}: {error}")
+    return {
+        "repo_url": repo_url,
+        "status": STATUS_ERROR,
+        "readme_path": None,
+        "error": f"{type(error).__name__}: {error}",
+        "duration_seconds": round(time.perf_counter() - start, 3),
+    }
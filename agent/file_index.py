@@ -0,0 +1,74 @@
+import logging
+import os
+
+MAX_NAME_MATCHES = 3
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class FileIndex:
+    def __init__(self, repo_path: str, file_paths: list, file_sizes: list = None):
+        self.repo_path = repo_path
+        self.paths_by_rel_path = {}
+        self.paths_by_name = {}
+        self.sizes_by_rel_path = None
+
+        prefix = os.path.join(repo_path, "")
+        for path in file_paths:
+            rel_path = path[len(prefix):] if path.startswith(prefix) else os.path.relpath(path, repo_path)
+            self.paths_by_rel_path[rel_path] = path
+            self.paths_by_name.setdefault(os.path.basename(rel_path), []).append(path)
+
+        if file_sizes is not None:
+            self.sizes_by_rel_path = dict(zip(self.paths_by_rel_path, file_sizes))
+
+        for paths in self.paths_by_name.values():
+            paths.sort(key=lambda path: (path.count("/"), path))
+
+    @property
+    def rel_paths(self) -> list:
+        """
+        Gets relative paths of indexed files
+        :return: list of relative file paths in order of indexing
+        """
+        return list(self.paths_by_rel_path)
+
+    def resolve(self, names: list, max_name_matches: int = MAX_NAME_MATCHES) -> list:
+        """
+        Resolves selected names to file paths, by relative path first and by file name as fallback
+        :param names: list of relative paths or file names, most important first
+        :param max_name_matches: max number of files a file name matching several files resolves to, shallowest first
+        :return: list of unique absolute file paths in order of names
+        """
+        resolved = {}
+
+        for name in names:
+            if not isinstance(name, str):
+                continue
+
+            rel_path = self._normalize(name)
+            path = self.paths_by_rel_path.get(rel_path)
+            if path is not None:
+                resolved.setdefault(path)
+                continue
+
+            matches = self.paths_by_name.get(os.path.basename(rel_path), [])
+            if len(matches) > max_name_matches:
+                logger.warning(f"File name '{name}' matches {len(matches)} files, keeping {max_name_matches}")
+            for path in matches[:max_name_matches]:
+                resolved.setdefault(path)
+
+        return list(resolved)
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        """
+        Normalizes path returned by LLM to relative path
+        :param name: relative path or file name
+        :return: normalized relative path
+        """
+        rel_path = name.strip().replace("\\", "/")
+        while rel_path.startswith("./"):
+            rel_path = rel_path[2:]
+        return rel_path.lstrip("/")
@@ -0,0 +1,248 @@
+import logging
+import os
+import threading
+
+from dataclasses import dataclass, field
+from agent.import_graph import ImportGraph
+
+RANKER_MODE_OFF = "off"
+RANKER_MODE_SHADOW = "shadow"
+RANKER_MODE_AUTO = "auto"
+RANKER_MODES = (RANKER_MODE_OFF, RANKER_MODE_SHADOW, RANKER_MODE_AUTO)
+
+MAX_SELECTED_FILES = 12
+MAX_CANDIDATE_FILES = 300
+MIN_SELECTED_SCORE = 20
+MIN_CONFIDENT_FILES = 3
+MAX_NESTED_MANIFESTS = 3
+MAX_ROOT_ECOSYSTEMS = 2
+
+MANIFEST_SCORE = 100
+ENTRY_POINT_SCORE = 60
+CONTAINER_SCORE = 45
+README_SCORE = 40
+CONFIG_SCORE = 30
+SOURCE_SCORE = 25
+DOC_SCORE = 5
+CENTRALITY_SCORE = 40
+EXCLUDED_SCORE = -100
+DEPTH_PENALTY = 10
+AUXILIARY_PENALTY = 30
+LARGE_FILE_PENALTY = 20
+LARGE_FILE_SIZE = 200 * 1024
+
+MANIFESTS = {
+    "pyproject.toml": "python", "setup.py": "python", "setup.cfg": "python", "requirements.txt": "python",
+    "Pipfile": "python", "environment.yml": "python",
+    "package.json": "node", "deno.json": "node",
+    "Cargo.toml": "rust",
+    "go.mod": "go",
+    "pom.xml": "java", "build.gradle": "java", "build.gradle.kts": "java", "settings.gradle": "java",
+    "Gemfile": "ruby",
+    "composer.json": "php",
+    "mix.exs": "elixir",
+    "pubspec.yaml": "dart",
+    "Package.swift": "swift",
+    "CMakeLists.txt": "c", "meson.build": "c",
+    "build.sbt": "scala",
+    "stack.yaml": "haskell", "cabal.project": "haskell",
+}
+MANIFEST_EXTENSIONS = {".gemspec": "ruby", ".csproj": "dotnet", ".fsproj": "dotnet", ".sln": "dotnet",
+                       ".cabal": "haskell"}
+ENTRY_POINTS = {
+    "main.py", "__main__.py", "app.py", "cli.py", "manage.py", "wsgi.py", "asgi.py", "server.py",
+    "index.js", "index.ts", "main.js", "main.ts", "app.js", "app.ts", "server.js", "server.ts", "cli.js",
+    "main.go", "main.rs", "lib.rs", "Main.java", "Application.java", "Program.cs", "Startup.cs",
+    "main.c", "main.cpp", "main.swift", "main.dart", "main.kt", "Application.kt", "main.rb", "index.php",
+}
+CONTAINER_FILES = {"Dockerfile", "docker-compose.yml", "docker-compose.yaml", "compose.yml", "compose.yaml",
+                   "Containerfile", "Procfile"}
+CONFIG_FILES = {
+    "Makefile", "Justfile", "Taskfile.yml", ".env.example", ".env.sample", "config.py", "settings.py",
+    "config.yml", "config.yaml", "config.json", "tsconfig.json", "vite.config.js", "vite.config.ts",
+    "webpack.config.js", "next.config.js", "application.properties", "application.yml", "tox.ini",
+    "noxfile.py", "serverless.yml", "app.yaml", "fly.toml", "vercel.json", "netlify.toml",
+}
+EXCLUDED_FILES = {
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock", "Cargo.lock", "go.sum",
+    "Gemfile.lock", "composer.lock", "pubspec.lock", "uv.lock", "LICENSE", "LICENSE.md", "LICENSE.txt",
+    "CHANGELOG.md", "CODE_OF_CONDUCT.md", "CONTRIBUTING.md", "SECURITY.md", ".gitattributes", ".editorconfig",
+}
+SOURCE_EXTENSIONS = {
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".kt", ".scala", ".rb", ".php", ".cs", ".fs",
+    ".c", ".h", ".cc", ".cpp", ".hpp", ".swift", ".dart", ".ex", ".exs", ".hs", ".lua", ".sh", ".vue", ".svelte",
+}
+DOC_EXTENSIONS = {".md", ".rst", ".txt", ".adoc"}
+AUXILIARY_DIRS = {"test", "tests", "spec", "specs", "__tests__", "testdata", "fixtures", "example", "examples",
+                  "sample", "samples", "doc", "docs", "benchmark", "benchmarks", "scripts", "migrations", ".github"}
+TEST_FILE_PREFIXES = ("test_", "tests_")
+TEST_FILE_SUFFIXES = ("_test", ".test", ".spec", "_spec", "Test", "Tests")
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+@dataclass
+class RankResult:
+    selected_rel_paths: list = field(default_factory=list)
+    candidate_rel_paths: list = field(default_factory=list)
+    ecosystems: list = field(default_factory=list)
+    confident: bool = False
+
+
+class FileRanker:
+    def __init__(self, mode: str = RANKER_MODE_AUTO, max_selected_files: int = MAX_SELECTED_FILES,
+                 max_candidate_files: int = MAX_CANDIDATE_FILES):
+        if mode not in RANKER_MODES:
+            raise Exception(f"Unsupported file ranker mode: {mode}")
+
+        self.mode = mode
+        self.max_selected_files = max_selected_files
+        self.max_candidate_files = max_candidate_files
+        self.runs = 0
+        self.confident_runs = 0
+        self.comparisons = 0
+        self.agreement_total = 0.0
+        self.recall_total = 0.0
+        self._lock = threading.Lock()
+
+    def rank(self, rel_paths: list, sizes: dict = None, import_graph: ImportGraph = None) -> RankResult:
+        """
+        Ranks files by name, depth, size and ecosystem manifests, and decides if the selection is confident
+        :param rel_paths: list of relative file paths
+        :param sizes: optional dict of relative file path to size in bytes
+        :param import_graph: optional import graph, central source files and entry points rank higher
+        :return: rank result with selected and candidate relative paths
+        """
+        scores = [score_file(rel_path, sizes.get(rel_path) if sizes else None) for rel_path in rel_paths]
+        if import_graph is not None:
+            scores = [score + round(CENTRALITY_SCORE * import_graph.score(rel_path)) if score > EXCLUDED_SCORE
+                      else score for score, rel_path in zip(scores, rel_paths)]
+        ranked = sorted(zip(scores, rel_paths), key=lambda item: (-item[0], item[1].count("/"), item[1]))
+
+        root_ecosystems, nested_manifest_count = set(), 0
+        for rel_path in rel_paths:
+            ecosystem = get_manifest_ecosystem(rel_path)
+            if ecosystem is None:
+                continue
+            if "/" in rel_path:
+                nested_manifest_count += 1
+            else:
+                root_ecosystems.add(ecosystem)
+
+        selected = [rel_path for score, rel_path in ranked if score >= MIN_SELECTED_SCORE][:self.max_selected_files]
+        candidates = [rel_path for score, rel_path in ranked if score > EXCLUDED_SCORE][:self.max_candidate_files]
+        confident = (0 < len(root_ecosystems) <= MAX_ROOT_ECOSYSTEMS
+                     and nested_manifest_count <= MAX_NESTED_MANIFESTS
+                     and len(selected) >= MIN_CONFIDENT_FILES)
+
+        with self._lock:
+            self.runs += 1
+            self.confident_runs += int(confident)
+
+        return RankResult(selected_rel_paths=selected, candidate_rel_paths=candidates,
+                          ecosystems=sorted(root_ecosystems), confident=confident)
+
+    def skips_llm(self, rank_result: RankResult) -> bool:
+        """
+        Checks if ranked files are used without asking LLM
+        :param rank_result: rank result
+        :return: True if selection LLM call is skipped
+        """
+        return self.mode == RANKER_MODE_AUTO and rank_result.confident
+
+    def shortlists(self, rank_result: RankResult) -> bool:
+        """
+        Checks if LLM chooses only among candidate files instead of the whole repo
+        :param rank_result: rank result
+        :return: True if prompt lists candidate files only
+        """
+        return self.mode == RANKER_MODE_AUTO and not rank_result.confident
+
+    def record_agreement(self, rank_result: RankResult, llm_rel_paths: list) -> float:
+        """
+        Records how much ranked selection agrees with files selected by LLM
+        :param rank_result: rank result
+        :param llm_rel_paths: list of relative paths of files selected by LLM
+        :return: Jaccard similarity of both selections
+        """
+        ranked, selected = set(rank_result.selected_rel_paths), set(llm_rel_paths)
+        union = ranked | selected
+        agreement = len(ranked & selected) / len(union) if union else 1.0
+        recall = len(ranked & selected) / len(selected) if selected else 1.0
+
+        with self._lock:
+            self.comparisons += 1
+            self.agreement_total += agreement
+            self.recall_total += recall
+
+        logger.info(f"File ranker agreement with LLM: {agreement:.2f} "
+                    f"({len(ranked & selected)} of {len(selected)} LLM files ranked)")
+        return agreement
+
+    def stats(self) -> dict:
+        """
+        Gets ranking counters and mean agreement with LLM of this process, in auto mode confident runs skip LLM
+        :return: ranker statistics
+        """
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "runs": self.runs,
+                "confident_runs": self.confident_runs,
+                "comparisons": self.comparisons,
+                "mean_agreement": round(self.agreement_total / self.comparisons, 3) if self.comparisons else None,
+                "mean_recall": round(self.recall_total / self.comparisons, 3) if self.comparisons else None,
+            }
+
+
+def get_manifest_ecosystem(rel_path: str) -> str | None:
+    """
+    Gets ecosystem of a package manifest
+    :param rel_path: relative file path
+    :return: ecosystem name like python or node, or None if file is not a manifest
+    """
+    file_name = os.path.basename(rel_path)
+    ecosystem = MANIFESTS.get(file_name)
+    if ecosystem is None:
+        ecosystem = MANIFEST_EXTENSIONS.get(os.path.splitext(file_name)[1])
+    return ecosystem
+
+
+def score_file(rel_path: str, size: int = None) -> int:
+    """
+    Scores how much a file tells about the project, by name, depth and size
+    :param rel_path: relative file path
+    :param size: optional file size in bytes
+    :return: score, files at or below EXCLUDED_SCORE are never useful
+    """
+    *dir_names, file_name = rel_path.split("/")
+    if file_name in EXCLUDED_FILES or size == 0:
+        return EXCLUDED_SCORE
+
+    stem, extension = os.path.splitext(file_name)
+    if get_manifest_ecosystem(file_name) is not None:
+        score = MANIFEST_SCORE
+    elif file_name in ENTRY_POINTS:
+        score = ENTRY_POINT_SCORE
+    elif file_name in CONTAINER_FILES:
+        score = CONTAINER_SCORE
+    elif stem.lower() == "readme":
+        score = README_SCORE
+    elif file_name in CONFIG_FILES:
+        score = CONFIG_SCORE
+    elif extension in SOURCE_EXTENSIONS:
+        score = SOURCE_SCORE
+    elif extension in DOC_EXTENSIONS:
+        score = DOC_SCORE
+    else:
+        score = 0
+
+    score -= DEPTH_PENALTY * len(dir_names)
+    if any(dir_name in AUXILIARY_DIRS for dir_name in dir_names) \
+            or stem.startswith(TEST_FILE_PREFIXES) or stem.endswith(TEST_FILE_SUFFIXES):
+        score -= AUXILIARY_PENALTY
+    if size is not None and size > LARGE_FILE_SIZE:
+        score -= LARGE_FILE_PENALTY
+
+    return score
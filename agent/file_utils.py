@@ -4,6 +4,15 @@ import tempfile
 import json
 import re
 
+from typing import AsyncIterable, Callable, Iterable, Iterator
+from agent import tracing
+from agent.ignore_rules import IgnoreRules, DEFAULT_IGNORE_PATTERNS
+
+MAX_FILE_CHARS = 1_000_000
+MAX_TOTAL_CHARS = 8_000_000
+TRUNCATION_MARKER = "\n... [truncated]"
+FILE_CONTENT_FOOTER = "\n\n"
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
@@ -23,90 +32,163 @@ def create_temp_directory() -> str:
     return temp_dir
 
 
-def get_file_paths(repo_path: str) -> list:
+def get_file_paths(repo_path: str, ignore_patterns=DEFAULT_IGNORE_PATTERNS) -> list:
     """
-    Gets absolute file paths from provided repo
+    Gets absolute file paths from provided repo, skipping ignored directories without walking into them
     :param repo_path: path of the repo
+    :param ignore_patterns: gitignore style patterns applied on top of the repo .gitignore files
     :return: list of file paths
     """
     file_paths = set()
+    dir_ignore_rules = {repo_path: IgnoreRules.from_patterns(ignore_patterns)}
 
     for root, dirs, files in os.walk(repo_path):
         if '.git' in dirs:
             dirs.remove('.git')
 
+        rel_root = os.path.relpath(root, repo_path)
+        rel_prefix = "" if rel_root == "." else rel_root + "/"
+        ignore_rules = dir_ignore_rules.pop(root, None) or IgnoreRules()
+        if '.gitignore' in files:
+            ignore_rules = ignore_rules.extend_from_file(root, rel_prefix.rstrip("/"))
+
+        dirs[:] = [name for name in dirs if not ignore_rules.is_ignored(rel_prefix + name, is_dir=True)]
+        for name in dirs:
+            dir_ignore_rules[os.path.join(root, name)] = ignore_rules
+
         for file in files:
-            if not file == '.gitignore':
+            if not file == '.gitignore' and not ignore_rules.is_ignored(rel_prefix + file, is_dir=False):
                 file_path = os.path.join(root, file)
                 file_paths.add(file_path)
 
     return sorted(file_paths)
 
 
-def get_file_names(file_paths: list) -> list:
+def create_readme(content: str, target_dir: str) -> None:
     """
-    Gets file names from file paths
-    :param file_paths: list of absolute file paths
-    :return: list of file names
+    Creates readme file from string description in provided repo
+    :param content: readme file content
+    :param target_dir: path for target repo
     """
-    file_names = []
+    try:
+        file_path = os.path.join(target_dir, "README.md")
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        logger.info("README.md file created successfully.")
+    except Exception as e:
+        logger.error(f"Error creating README: {e}")
 
-    for path in file_paths:
-        filename = path.split('/')[-1]
-        file_names.append(filename)
 
-    return file_names
+def write_readme_stream(chunks: Iterable[str], target_dir: str, echo: bool = False) -> int:
+    """
+    Writes readme file as content chunks arrive, flushing each chunk so that partial content stays on disk
+    :param chunks: readme content chunks
+    :param target_dir: path for target repo
+    :param echo: also print chunks to stdout as progress
+    :return: number of characters written
+    """
+    file_path = os.path.join(target_dir, "README.md")
+    char_count = 0
+    with open(file_path, "w", encoding="utf-8") as file:
+        for chunk in chunks:
+            _write_chunk(file, chunk, echo)
+            char_count += len(chunk)
+    logger.info(f"README.md streamed successfully, {char_count} characters.")
+    return char_count
 
 
-def get_essential_file_paths(file_names: list, file_paths: list) -> list:
+async def awrite_readme_stream(chunks: AsyncIterable[str], target_dir: str, echo: bool = False) -> int:
+    """
+    Writes readme file as content chunks arrive asynchronously, chunk writes are small and stay on the event loop
+    :param chunks: async iterable of readme content chunks
+    :param target_dir: path for target repo
+    :param echo: also print chunks to stdout as progress
+    :return: number of characters written
     """
-    Gets essential file paths that match provided file names
-    :param file_names: list of file names
+    file_path = os.path.join(target_dir, "README.md")
+    char_count = 0
+    with open(file_path, "w", encoding="utf-8") as file:
+        async for chunk in chunks:
+            _write_chunk(file, chunk, echo)
+            char_count += len(chunk)
+    logger.info(f"README.md streamed successfully, {char_count} characters.")
+    return char_count
+
+
+def _write_chunk(file, chunk: str, echo: bool) -> None:
+    file.write(chunk)
+    file.flush()
+    if echo:
+        print(chunk, end="", flush=True)
+
+
+def iter_capped_files(file_paths: list, max_file_chars: int = MAX_FILE_CHARS, max_total_chars: int = MAX_TOTAL_CHARS,
+                      file_reader: Callable = None) -> Iterator[tuple]:
+    """
+    Reads files one by one, each only up to remaining limits, so that their framed content stays within limits
     :param file_paths: list of absolute file paths
-    :return: filtered list of file paths
+    :param max_file_chars: max number of characters read from each file
+    :param max_total_chars: max number of characters of all framed contents
+    :param file_reader: function reading file content by path, like read_file
+    :return: iterator of (file path, content) tuples, content above its limit is cut and ends with truncation marker
     """
-    essential_file_paths = []
+    file_reader = file_reader or read_file
+    remaining = max_total_chars
 
     for path in file_paths:
-        filename = path.split('/')[-1]
+        framing_chars = len(format_file_content(path, ""))
+        limit = min(max_file_chars, remaining - framing_chars)
+        if limit < len(TRUNCATION_MARKER):
+            logger.warning(f"Merged content reached limit of {max_total_chars} characters, skipping remaining files")
+            return
 
-        if filename in file_names:
-            essential_file_paths.append(path)
+        content = file_reader(path, max_chars=limit)
+        if content is None:
+            continue
+        if len(content) > limit:
+            logger.warning(f"File {path} exceeds limit of {limit} characters, truncating")
+            content = content[:limit - len(TRUNCATION_MARKER)] + TRUNCATION_MARKER
 
-    return essential_file_paths
+        remaining -= framing_chars + len(content)
+        yield path, content
 
 
-def create_readme(content: str, target_dir: str) -> None:
+def read_file(path: str, max_chars: int = None) -> str | None:
     """
-    Creates readme file from string description in provided repo
-    :param content: readme file content
-    :param target_dir: path for target repo
+    Reads text file content
+    :param path: absolute file path
+    :param max_chars: max number of characters to keep, one more is read to detect longer files
+    :return: file content or None if file cannot be read
     """
     try:
-        file_path = os.path.join(target_dir, "README.md")
-        with open(file_path, "w", encoding="utf-8") as file:
-            file.write(content)
-        logger.info("README.md file created successfully.")
+        with open(path, "r", encoding="utf-8") as file:
+            content = file.read() if max_chars is None else file.read(max_chars + 1)
     except Exception as e:
-        logger.error(f"Error creating README: {e}")
+        logger.error(f"Error reading file {path}: {e}")
+        return None
 
+    tracing.add_to_attribute("chars_read", len(content))
+    return content
 
-def merge_files(file_paths: list) -> str:
+
+def format_file_content(path: str, content: str) -> str:
     """
-    Merges files content into string
-    :param file_paths: list of absolute file paths
+    Frames file content with file name header
+    :param path: absolute file path
+    :param content: file content
+    :return: framed file content
+    """
+    filename = os.path.basename(path)
+    return f"--- {filename} ---\n{content}{FILE_CONTENT_FOOTER}"
+
+
+def merge_file_contents(file_contents: list) -> str:
+    """
+    Merges already read files content into string
+    :param file_contents: list of (file path, content) tuples
     :return: merged file content
     """
-    all_files_content = ""
-    for path in file_paths:
-        try:
-            with open(path, "r", encoding="utf-8") as file:
-                content = file.read()
-                filename = os.path.basename(path)
-                all_files_content += f"--- {filename} ---\n{content}\n\n"
-        except Exception as e:
-            logger.error(f"Error reading file {path}: {e}")
-    return all_files_content
+    return "".join(format_file_content(path, content) for path, content in file_contents)
 
 
 def extract_file_names(string_input) -> list:
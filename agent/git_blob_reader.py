@@ -0,0 +1,43 @@
+import logging
+import os
+import threading
+
+from git import Repo
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class GitBlobReader:
+    def __init__(self, repo_path: str, revision: str = "HEAD"):
+        self.repo_path = repo_path
+        self.revision = revision
+        self.repo = Repo(repo_path)
+        self._lock = threading.Lock()
+
+    def read(self, path: str, max_chars: int = None) -> str | None:
+        """
+        Reads file content from git object database through one long-lived git cat-file --batch process
+        :param path: absolute file path inside the repo
+        :param max_chars: max number of characters to keep, one more is kept to detect longer files
+        :return: file content or None if file cannot be read
+        """
+        object_name = f"{self.revision}:{os.path.relpath(path, self.repo_path)}"
+        try:
+            with self._lock:
+                _, object_type, _, data = self.repo.git.get_object_data(object_name)
+            if object_type != b"blob":
+                raise ValueError(f"{object_name} is a {object_type.decode()}, not a blob")
+            content = data.decode("utf-8")
+        except Exception as e:
+            logger.error(f"Error reading file {path}: {e}")
+            return None
+
+        return content if max_chars is None else content[:max_chars + 1]
+
+    def close(self) -> None:
+        """
+        Stops the cat-file process
+        """
+        with self._lock:
+            self.repo.close()
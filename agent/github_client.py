@@ -1,35 +1,273 @@
 import logging
+import os
+
+import threading
 
 from git import Repo, GitCommandError
+from agent import tracing
+from agent.git_blob_reader import GitBlobReader
+from agent.ignore_rules import IgnoreRules, DEFAULT_IGNORE_PATTERNS, GITIGNORE_FILE_NAME
+from agent.mirror_cache import MirrorCache
 
 HTTPS_PREFIX = "https://"
 
+CLONE_MODE_FULL = "full"
+CLONE_MODE_SHALLOW = "shallow"
+CLONE_MODE_BLOBLESS = "blobless"
+CLONE_MODE_SPARSE = "sparse"
+CLONE_MODE_BARE = "bare"
+
+CLONE_OPTIONS = {
+    CLONE_MODE_FULL: {},
+    CLONE_MODE_SHALLOW: {"depth": 1, "single_branch": True},
+    CLONE_MODE_BLOBLESS: {"depth": 1, "single_branch": True, "filter": "blob:none", "no_checkout": True},
+    CLONE_MODE_SPARSE: {"depth": 1, "single_branch": True, "filter": "blob:none", "no_checkout": True,
+                        "sparse": True},
+    CLONE_MODE_BARE: {"depth": 1, "single_branch": True, "filter": "blob:none", "bare": True},
+}
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
 class GitHubClient:
-    def __init__(self, github_token: str):
+    def __init__(self, github_token: str, clone_mode: str = CLONE_MODE_FULL, mirror_cache: MirrorCache = None):
+        if clone_mode not in CLONE_OPTIONS:
+            raise Exception(f"Unsupported clone mode: {clone_mode}")
+
+        if mirror_cache is not None and clone_mode != CLONE_MODE_FULL:
+            logger.warning(f"Clone mode '{clone_mode}' is ignored because mirror cache is configured, "
+                           f"repos are checked out from mirrors as full worktrees")
+
         self.github_token = github_token
+        self.clone_mode = clone_mode
+        self.mirror_cache = mirror_cache
+        self._blob_readers = {}
+        self._blob_readers_lock = threading.Lock()
+
+    @property
+    def has_working_tree(self) -> bool:
+        """
+        Checks if clone mode checks out the whole working tree
+        :return: True if all files are available on disk after clone
+        """
+        return self.mirror_cache is not None or self.clone_mode in (CLONE_MODE_FULL, CLONE_MODE_SHALLOW)
+
+    @property
+    def reads_from_object_database(self) -> bool:
+        """
+        Checks if files are read from git objects instead of a checkout. The bare repository itself still lives in the
+        target directory, which also receives the generated README
+        :return: True if clone has no working tree at all
+        """
+        return self.mirror_cache is None and self.clone_mode == CLONE_MODE_BARE
 
     def clone_repo(self, repo_url: str, target_dir: str) -> None:
         """
-        Clones github repo to target directory
+        Clones github repo to target directory, or checks it out from mirror cache if configured
         :param repo_url: github repo url
         :param target_dir: path for target directory
         """
         if self.github_token and repo_url.startswith(HTTPS_PREFIX):
-            repo_url = self._modify_url(repo_url, self.github_token)
+            authorized_url = self._modify_url(repo_url, self.github_token)
         else:
             raise Exception("Github token is empty or repo url is invalid")
 
+        with tracing.span("github.clone", clone_mode=self.clone_mode,
+                          mirror_cache=int(self.mirror_cache is not None)) as clone_span:
+            if self.mirror_cache is not None:
+                self.mirror_cache.checkout(repo_url=repo_url, target_dir=target_dir, fetch_url=authorized_url)
+            else:
+                self._clone_from(authorized_url, target_dir)
+                if clone_span is not None:
+                    clone_span.set(bytes_cloned=self._get_git_dir_size(target_dir))
+
+    def list_files(self, repo_path: str, ignore_patterns=DEFAULT_IGNORE_PATTERNS) -> list:
+        """
+        Lists absolute file paths of HEAD tree without reading file content, skipping files matched by ignore
+        patterns or by the repo .gitignore files, like the working tree walk does
+        :param repo_path: path of the cloned repo
+        :param ignore_patterns: gitignore style patterns applied on top of the repo .gitignore files
+        :return: sorted list of file paths
+        """
+        with tracing.span("github.list_files") as list_span:
+            output = Repo(repo_path).git.ls_tree("-r", "-z", "HEAD")
+
+            relative_paths = []
+            gitignore_shas = {}
+            for entry in output.split("\0"):
+                if not entry:
+                    continue
+                info, relative_path = entry.split("\t", 1)
+                if os.path.basename(relative_path) == GITIGNORE_FILE_NAME:
+                    gitignore_shas[relative_path] = info.split()[2]
+                else:
+                    relative_paths.append(relative_path)
+
+            ignore_rules = self._read_ignore_rules(repo_path, gitignore_shas, ignore_patterns)
+            file_paths = [os.path.join(repo_path, relative_path) for relative_path in relative_paths
+                          if not ignore_rules.is_ignored_path(relative_path)]
+
+            if list_span is not None:
+                list_span.set(file_count=len(file_paths))
+            return sorted(file_paths)
+
+    def get_blob_shas(self, repo_path: str, file_paths: list) -> dict:
+        """
+        Gets git blob SHAs of files in HEAD tree
+        :param repo_path: path of the cloned repo
+        :param file_paths: list of absolute file paths
+        :return: dict of absolute file path to blob SHA
+        """
+        if not file_paths:
+            return {}
+
+        relative_paths = [os.path.relpath(path, repo_path) for path in file_paths]
+        git = Repo(repo_path).git(literal_pathspecs=True)
+        output = git.ls_tree("-z", "--full-tree", "HEAD", "--", *relative_paths)
+
+        blob_shas = {}
+        for entry in output.split("\0"):
+            if not entry:
+                continue
+            info, relative_path = entry.split("\t", 1)
+            _, object_type, sha = info.split()
+            if object_type == "blob":
+                blob_shas[os.path.join(repo_path, relative_path)] = sha
+
+        return blob_shas
+
+    def checkout_files(self, repo_path: str, file_paths: list) -> None:
+        """
+        Checks out only provided files for clone modes without working tree, or fetches their blobs in bare mode
+        :param repo_path: path of the cloned repo
+        :param file_paths: list of absolute file paths to check out
+        """
+        if self.has_working_tree or not file_paths:
+            return
+
+        relative_paths = [os.path.relpath(path, repo_path) for path in file_paths]
+        git = Repo(repo_path).git
+
+        with tracing.span("github.checkout_files", file_count=len(relative_paths)):
+            try:
+                if self.reads_from_object_database:
+                    self._fetch_blobs(repo_path, self.get_blob_shas(repo_path, file_paths).values())
+                    return
+                if self.clone_mode == CLONE_MODE_SPARSE:
+                    patterns = ["/" + self._escape_sparse_pattern(path) for path in relative_paths]
+                    git.sparse_checkout("set", "--no-cone", *patterns)
+                    git.checkout()
+                else:
+                    git.checkout("HEAD", "--", *relative_paths)
+                logger.info(f"Checked out {len(relative_paths)} files in '{repo_path}'")
+            except GitCommandError as e:
+                logger.error(f"Error checking out files: {e}")
+                raise
+
+    def read_blob(self, repo_path: str, path: str, max_chars: int = None) -> str | None:
+        """
+        Reads file content from git object database of the cloned repo, reusing one reader per repo
+        :param repo_path: path of the cloned repo
+        :param path: absolute file path inside the repo
+        :param max_chars: max number of characters to keep, one more is kept to detect longer files
+        :return: file content or None if file cannot be read
+        """
+        with self._blob_readers_lock:
+            blob_reader = self._blob_readers.get(repo_path)
+            if blob_reader is None:
+                blob_reader = self._blob_readers[repo_path] = GitBlobReader(repo_path)
+
+        content = blob_reader.read(path, max_chars=max_chars)
+        if content is not None:
+            tracing.add_to_attribute("chars_read", len(content))
+        return content
+
+    def close_blob_reader(self, repo_path: str) -> None:
+        """
+        Stops blob reader of the cloned repo if there is one
+        :param repo_path: path of the cloned repo
+        """
+        with self._blob_readers_lock:
+            blob_reader = self._blob_readers.pop(repo_path, None)
+
+        if blob_reader is not None:
+            blob_reader.close()
+
+    def release_repo(self, repo_path: str) -> None:
+        """
+        Releases resources held for the cloned repo once the run is done: its blob reader and mirror worktree
+        :param repo_path: path of the cloned repo
+        """
+        self.close_blob_reader(repo_path)
+        if self.mirror_cache is not None:
+            self.mirror_cache.release(repo_path)
+
+    def _read_ignore_rules(self, repo_path: str, gitignore_shas: dict, ignore_patterns) -> IgnoreRules:
+        """
+        Builds ignore rules from ignore patterns and .gitignore blobs, fetching missing blobs in one request
+        :param repo_path: path of the cloned repo
+        :param gitignore_shas: dict of repo relative .gitignore path to blob SHA
+        :param ignore_patterns: gitignore style patterns applied on top of the repo .gitignore files
+        :return: ignore rules, rules of deeper .gitignore files taking precedence
+        """
+        ignore_rules = IgnoreRules.from_patterns(ignore_patterns)
+        if not gitignore_shas:
+            return ignore_rules
+
+        if not self.has_working_tree:
+            self._fetch_blobs(repo_path, gitignore_shas.values())
+        for relative_path in sorted(gitignore_shas, key=lambda path: (path.count("/"), path)):
+            if ignore_rules.is_ignored_path(relative_path):
+                continue
+            content = self.read_blob(repo_path, os.path.join(repo_path, relative_path))
+            if content is not None:
+                ignore_rules = ignore_rules.extend(content.splitlines(), os.path.dirname(relative_path))
+        return ignore_rules
+
+    def _fetch_blobs(self, repo_path: str, blob_shas) -> None:
+        """
+        Fetches blobs missing from partial clone in one request
+        :param repo_path: path of the cloned repo
+        :param blob_shas: iterable of blob SHAs
+        """
+        blob_shas = sorted(set(blob_shas))
+        git = Repo(repo_path).git(c="fetch.negotiationAlgorithm=noop")
+        git.fetch("--quiet", "--no-tags", "--no-write-fetch-head", "--filter=blob:none", "origin", *blob_shas)
+        logger.info(f"Fetched {len(blob_shas)} blobs in '{repo_path}'")
+
+    def _clone_from(self, repo_url: str, target_dir: str) -> None:
+        """
+        Clones repo with options of configured clone mode
+        :param repo_url: repo url with credentials
+        :param target_dir: path for target directory
+        """
         try:
-            Repo.clone_from(repo_url, target_dir)
-            logger.info(f"Repository cloned successfully into '{target_dir}'")
+            Repo.clone_from(repo_url, target_dir, **CLONE_OPTIONS[self.clone_mode])
+            logger.info(f"Repository cloned successfully into '{target_dir}' ({self.clone_mode} mode)")
         except GitCommandError as e:
             logger.error(f"Error cloning repository: {e}")
             raise
 
+    @staticmethod
+    def _get_git_dir_size(target_dir: str) -> int:
+        """
+        Counts bytes of git objects and metadata of a clone
+        :param target_dir: path of the clone, bare or with working tree
+        :return: size of the git directory in bytes
+        """
+        git_dir = os.path.join(target_dir, ".git")
+        if not os.path.isdir(git_dir):
+            git_dir = target_dir
+
+        total = 0
+        for root, _, files in os.walk(git_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                if not os.path.islink(path):
+                    total += os.path.getsize(path)
+        return total
+
     def _modify_url(self, url: str, token: str) -> str:
         """
         Modifies github url with access token
@@ -38,3 +276,14 @@ class GitHubClient:
         :return: modified url
         """
         return f"{HTTPS_PREFIX}{token}@{url[len(HTTPS_PREFIX):]}"
+
+    @staticmethod
+    def _escape_sparse_pattern(path: str) -> str:
+        """
+        Escapes gitignore special characters in sparse checkout pattern
+        :param path: relative file path
+        :return: escaped pattern
+        """
+        for char in ("\\", "*", "?", "[", "!", "#"):
+            path = path.replace(char, "\\" + char)
+        return path
@@ -0,0 +1,172 @@
+import logging
+import os
+import re
+
+GITIGNORE_FILE_NAME = ".gitignore"
+DEFAULT_IGNORE_PATTERNS = (
+    "node_modules/", "bower_components/", "jspm_packages/", "vendor/", "third_party/", "dist/", "build/",
+    ".venv/", "venv/", "__pycache__/", ".tox/", ".nox/", ".mypy_cache/", ".pytest_cache/", ".ruff_cache/",
+    ".gradle/", ".next/", ".nuxt/", "coverage/", "target/", "Pods/", "*.egg-info/", "*.min.js", "*.min.css",
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class IgnoreRules:
+    def __init__(self, rules: tuple = ()):
+        self.rules = rules
+        self._dir_regex = None
+        self._file_regex = None
+
+        if not any(negate for _, negate, _ in rules):
+            self._dir_regex = _combine([regex for regex, _, _ in rules])
+            self._file_regex = _combine([regex for regex, _, dir_only in rules if not dir_only])
+
+    @classmethod
+    def from_patterns(cls, patterns, base: str = "") -> "IgnoreRules":
+        """
+        Builds rules from gitignore style patterns
+        :param patterns: iterable of patterns
+        :param base: repo relative directory that patterns are relative to
+        :return: ignore rules
+        """
+        return cls().extend(patterns, base)
+
+    def extend(self, patterns, base: str = "") -> "IgnoreRules":
+        """
+        Builds new rules with patterns added after current ones, so that they take precedence
+        :param patterns: iterable of gitignore style patterns
+        :param base: repo relative directory that patterns are relative to
+        :return: ignore rules
+        """
+        rules = [rule for rule in (_parse_pattern(pattern, base) for pattern in patterns) if rule is not None]
+        return IgnoreRules(self.rules + tuple(rules)) if rules else self
+
+    def extend_from_file(self, directory: str, base: str) -> "IgnoreRules":
+        """
+        Builds new rules with patterns of .gitignore file in directory, if there is one
+        :param directory: absolute directory path
+        :param base: repo relative path of the directory
+        :return: ignore rules
+        """
+        try:
+            with open(os.path.join(directory, GITIGNORE_FILE_NAME), "r", encoding="utf-8", errors="replace") as file:
+                return self.extend(file.read().splitlines(), base)
+        except OSError:
+            return self
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        Checks if path is ignored, the last matching rule wins
+        :param rel_path: repo relative path with forward slashes
+        :param is_dir: path is a directory
+        :return: True if path is ignored
+        """
+        if self._dir_regex is not None:
+            regex = self._dir_regex if is_dir else self._file_regex
+            return regex is not None and regex.match(rel_path) is not None
+
+        for regex, negate, dir_only in reversed(self.rules):
+            if (is_dir or not dir_only) and regex.match(rel_path):
+                return not negate
+        return False
+
+    def is_ignored_path(self, rel_path: str) -> bool:
+        """
+        Checks if file or any of its parent directories is ignored, for listings that cannot be pruned during walk
+        :param rel_path: repo relative file path with forward slashes
+        :return: True if file is ignored
+        """
+        parts = rel_path.split("/")
+        for index in range(1, len(parts)):
+            if self.is_ignored("/".join(parts[:index]), is_dir=True):
+                return True
+        return self.is_ignored(rel_path, is_dir=False)
+
+
+def _parse_pattern(pattern: str, base: str) -> tuple | None:
+    """
+    Parses gitignore pattern into regex matching repo relative paths
+    :param pattern: gitignore pattern
+    :param base: repo relative directory of the .gitignore file
+    :return: tuple of compiled regex, negation flag and directory only flag, or None for blank lines and comments
+    """
+    pattern = pattern.rstrip("\n\r")
+    if not pattern.endswith("\\ "):
+        pattern = pattern.rstrip(" ")
+    if not pattern or pattern.startswith("#"):
+        return None
+
+    negate = pattern.startswith("!")
+    if negate or pattern.startswith("\\!") or pattern.startswith("\\#"):
+        pattern = pattern[1:]
+
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    prefix = re.escape(base + "/") if base else ""
+    if not anchored:
+        prefix += "(?:.*/)?"
+
+    try:
+        return re.compile(prefix + _translate(pattern) + r"\Z", re.DOTALL), negate, dir_only
+    except re.error as e:
+        logger.warning(f"Skipping invalid ignore pattern '{pattern}': {e}")
+        return None
+
+
+def _translate(pattern: str) -> str:
+    """
+    Translates gitignore glob into regex, where * and ? do not cross directories and ** does
+    :param pattern: glob pattern without leading and trailing slashes
+    :return: regex source
+    """
+    result = []
+    index = 0
+
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            result.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("/**", index) and index + 3 == len(pattern):
+            result.append("/.*")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            result.append(".*")
+            index += 2
+            continue
+
+        if char == "*":
+            result.append("[^/]*")
+        elif char == "?":
+            result.append("[^/]")
+        elif char == "\\" and index + 1 < len(pattern):
+            index += 1
+            result.append(re.escape(pattern[index]))
+        elif char == "[" and "]" in pattern[index + 2:]:
+            end = pattern.index("]", index + 2)
+            content = pattern[index + 1:end]
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            result.append("[" + content.replace("\\", "\\\\") + "]")
+            index = end
+        else:
+            result.append(re.escape(char))
+        index += 1
+
+    return "".join(result)
+
+
+def _combine(regexes: list) -> re.Pattern | None:
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{regex.pattern})" for regex in regexes), re.DOTALL)
@@ -0,0 +1,432 @@
+import ast
+import logging
+import multiprocessing
+import os
+import posixpath
+import re
+import sys
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from operator import mul, sub
+
+LANGUAGE_PYTHON = "python"
+LANGUAGE_JAVASCRIPT = "javascript"
+LANGUAGE_GO = "go"
+LANGUAGE_JAVA = "java"
+
+LANGUAGES_BY_EXTENSION = {
+    ".py": LANGUAGE_PYTHON,
+    ".js": LANGUAGE_JAVASCRIPT, ".jsx": LANGUAGE_JAVASCRIPT, ".mjs": LANGUAGE_JAVASCRIPT,
+    ".cjs": LANGUAGE_JAVASCRIPT, ".ts": LANGUAGE_JAVASCRIPT, ".tsx": LANGUAGE_JAVASCRIPT,
+    ".go": LANGUAGE_GO,
+    ".java": LANGUAGE_JAVA,
+}
+JAVASCRIPT_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+CLI_DECORATOR_NAMES = frozenset({"command", "group"})
+BLOCK_STATEMENTS = (ast.If, ast.Try, ast.With, ast.AsyncWith, ast.For, ast.AsyncFor, ast.While) + \
+    ((ast.TryStar,) if hasattr(ast, "TryStar") else ())
+BLOCK_FIELDS = ("body", "orelse", "finalbody")
+
+MAX_PARSED_FILE_SIZE = 256 * 1024
+PARALLEL_MIN_FILES = 2000
+MAX_PARSE_PROCESSES = 4
+PARSE_CHUNK_SIZE = 256
+PAGERANK_ITERATIONS = 15
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-3
+ENTRY_POINT_WEIGHT = 1.0
+
+JAVASCRIPT_IMPORT_REGEX = re.compile(
+    r"""(?:\bimport\s+(?:[\w*{}\s,$]+\s+from\s+)?|\bexport\s+[\w*{}\s,$]+\s+from\s+"""
+    r"""|\brequire\s*\(\s*|\bimport\s*\(\s*)"""
+    r"""['"]([^'"\n]+)['"]"""
+)
+JAVASCRIPT_SHEBANG = "#!"
+GO_IMPORT_BLOCK_REGEX = re.compile(r"^import\s*\(([^)]*)\)", re.MULTILINE)
+GO_IMPORT_REGEX = re.compile(r"^import\s+(?:[\w.]+\s+)?\"([^\"]+)\"", re.MULTILINE)
+GO_IMPORT_LINE_REGEX = re.compile(r"\"([^\"]+)\"")
+GO_MAIN_REGEX = re.compile(r"^package\s+main\b.*^func\s+main\s*\(", re.MULTILINE | re.DOTALL)
+GO_MODULE_REGEX = re.compile(r"^module\s+(\S+)", re.MULTILINE)
+JAVA_PACKAGE_REGEX = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.MULTILINE)
+JAVA_IMPORT_REGEX = re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+(?:\.\*)?)\s*;", re.MULTILINE)
+JAVA_MAIN_REGEX = re.compile(r"\bpublic\s+static\s+void\s+main\s*\(")
+PYTHON_IMPORT_REGEX = re.compile(r"^\s*(?:from\s+(\.*[\w.]*)\s+import\s+([\w, ]+)|import\s+([\w., ]+))", re.MULTILINE)
+PYTHON_MAIN_REGEX = re.compile(r"^if\s+__name__\s*==\s*['\"]__main__['\"]", re.MULTILINE)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+class ImportGraph:
+    def __init__(self, edges: dict, entry_points: set):
+        self.edges = edges
+        self.entry_points = entry_points
+        self.centrality = _pagerank(edges)
+        self._min_centrality = min(self.centrality.values(), default=0.0)
+        self._centrality_range = max(self.centrality.values(), default=0.0) - self._min_centrality or 1.0
+
+    def score(self, rel_path: str) -> float:
+        """
+        Scores file by centrality scaled to 0 for files nobody imports and 1 for the most central file,
+        with a bonus for entry points
+        :param rel_path: relative file path
+        :return: score, 0 for files outside of the graph
+        """
+        centrality = self.centrality.get(rel_path)
+        score = (centrality - self._min_centrality) / self._centrality_range if centrality is not None else 0.0
+        if rel_path in self.entry_points:
+            score += ENTRY_POINT_WEIGHT
+        return score
+
+    def rank(self, limit: int = None) -> list:
+        """
+        Ranks parsed source files, most central first
+        :param limit: max number of files
+        :return: list of relative file paths
+        """
+        return sorted(self.edges, key=lambda rel_path: (-self.score(rel_path), rel_path))[:limit]
+
+    def order_by_centrality(self, rel_paths: list) -> list:
+        """
+        Orders files for packing, keeping files outside of the graph like manifests and docs first in their order,
+        followed by source files, most central first
+        :param rel_paths: list of relative file paths
+        :return: reordered list of relative file paths
+        """
+        other = [rel_path for rel_path in rel_paths if rel_path not in self.edges]
+        sources = sorted((rel_path for rel_path in rel_paths if rel_path in self.edges),
+                         key=lambda rel_path: -self.score(rel_path))
+        return other + sources
+
+
+def build_import_graph(repo_path: str, rel_paths: list, max_workers: int = None) -> ImportGraph:
+    """
+    Parses imports of Python, JavaScript/TypeScript, Go and Java files and builds module dependency graph,
+    in a process pool shared by all runs for large repos
+    :param repo_path: path of the repo with checked out files
+    :param rel_paths: list of relative file paths
+    :param max_workers: number of processes of the shared pool when it is created, 1 parses in this process
+    :return: import graph
+    """
+    source_paths = [rel_path for rel_path in rel_paths
+                    if os.path.splitext(rel_path)[1] in LANGUAGES_BY_EXTENSION]
+    chunks = [source_paths[index:index + PARSE_CHUNK_SIZE] for index in range(0, len(source_paths),
+                                                                               PARSE_CHUNK_SIZE)]
+
+    parsed = None
+    if len(source_paths) >= PARALLEL_MIN_FILES and max_workers != 1:
+        try:
+            pool = _get_parse_pool(max_workers)
+            parsed = [result for results in pool.map(parse_files, [repo_path] * len(chunks), chunks)
+                      for result in results]
+        except BrokenProcessPool as e:
+            logger.warning(f"Parsing process pool failed, parsing in this process: {e}")
+            _reset_parse_pool()
+    if parsed is None:
+        parsed = [result for chunk in chunks for result in parse_files(repo_path, chunk)]
+
+    resolver = _ImportResolver(parsed, go_module=_read_go_module(repo_path))
+    edges, entry_points = {}, set()
+    for rel_path, language, imports, _, is_entry_point in parsed:
+        edges[rel_path] = resolver.resolve(rel_path, language, imports)
+        if is_entry_point:
+            entry_points.add(rel_path)
+
+    logger.info(f"Import graph: {len(edges)} source files, {sum(map(len, edges.values()))} imports, "
+                f"{len(entry_points)} entry points")
+    return ImportGraph(edges=edges, entry_points=entry_points)
+
+
+def parse_files(repo_path: str, rel_paths: list) -> list:
+    """
+    Parses imports of source files, run in worker processes
+    :param repo_path: path of the repo
+    :param rel_paths: list of relative file paths
+    :return: list of (relative path, language, imports, package, is entry point) tuples for readable files
+    """
+    results = []
+    for rel_path in rel_paths:
+        path = os.path.join(repo_path, rel_path)
+        try:
+            if os.path.getsize(path) > MAX_PARSED_FILE_SIZE:
+                continue
+            with open(path, "r", encoding="utf-8", errors="replace") as file:
+                source = file.read()
+        except OSError:
+            continue
+
+        language = LANGUAGES_BY_EXTENSION[os.path.splitext(rel_path)[1]]
+        imports, package, is_entry_point = PARSERS[language](source, rel_path)
+        results.append((rel_path, language, imports, package, is_entry_point))
+    return results
+
+
+def parse_python(source: str, rel_path: str) -> tuple:
+    """
+    Parses Python imports with ast, falling back to regex for files that do not parse. Only statement blocks
+    and class bodies are visited, not function bodies and expressions, so imports inside functions are skipped
+    :param source: file content
+    :param rel_path: relative file path
+    :return: tuple of imported modules, package (None) and entry point flag
+    """
+    is_entry_point = os.path.basename(rel_path) == "__main__.py"
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return _parse_python_regex(source), None, is_entry_point or PYTHON_MAIN_REGEX.search(source) is not None
+
+    imports = []
+    statements = tree.body[::-1]
+    while statements:
+        node = statements.pop()
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = "." * node.level + (node.module or "")
+            imports.append(module)
+            imports.extend(f"{module}{'' if module.endswith('.') else '.'}{alias.name}" for alias in node.names
+                           if alias.name != "*")
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            is_entry_point = is_entry_point or any(_is_cli_decorator(decorator) for decorator in node.decorator_list)
+        elif isinstance(node, ast.ClassDef):
+            statements.extend(reversed(node.body))
+        elif isinstance(node, BLOCK_STATEMENTS):
+            is_entry_point = is_entry_point or isinstance(node, ast.If) and _is_main_guard(node.test)
+            children = [child for field_name in BLOCK_FIELDS for child in getattr(node, field_name, ())]
+            children += [child for handler in getattr(node, "handlers", ()) for child in handler.body]
+            statements.extend(reversed(children))
+
+    return imports, None, is_entry_point
+
+
+def parse_javascript(source: str, rel_path: str) -> tuple:
+    """
+    Parses JavaScript and TypeScript import, export and require specifiers with regex
+    :param source: file content
+    :param rel_path: relative file path
+    :return: tuple of import specifiers, package (None) and entry point flag
+    """
+    return JAVASCRIPT_IMPORT_REGEX.findall(source), None, source.startswith(JAVASCRIPT_SHEBANG)
+
+
+def parse_go(source: str, rel_path: str) -> tuple:
+    """
+    Parses Go import paths with regex
+    :param source: file content
+    :param rel_path: relative file path
+    :return: tuple of import paths, package (None) and entry point flag
+    """
+    imports = GO_IMPORT_REGEX.findall(source)
+    for block in GO_IMPORT_BLOCK_REGEX.findall(source):
+        imports.extend(GO_IMPORT_LINE_REGEX.findall(block))
+    return imports, None, GO_MAIN_REGEX.search(source) is not None
+
+
+def parse_java(source: str, rel_path: str) -> tuple:
+    """
+    Parses Java package declaration and imports with regex
+    :param source: file content
+    :param rel_path: relative file path
+    :return: tuple of imported names, package name and entry point flag
+    """
+    package = JAVA_PACKAGE_REGEX.search(source)
+    return JAVA_IMPORT_REGEX.findall(source), package.group(1) if package else "", \
+        JAVA_MAIN_REGEX.search(source) is not None
+
+
+PARSERS = {
+    LANGUAGE_PYTHON: parse_python,
+    LANGUAGE_JAVASCRIPT: parse_javascript,
+    LANGUAGE_GO: parse_go,
+    LANGUAGE_JAVA: parse_java,
+}
+
+
+class _ImportResolver:
+    def __init__(self, parsed: list, go_module: str = None):
+        self.go_module = go_module
+        self.python_modules = {}
+        self.javascript_paths = set()
+        self.go_packages = {}
+        self.java_classes = {}
+        self.java_packages = {}
+
+        python_packages = {posixpath.dirname(rel_path) for rel_path, language, *_ in parsed
+                           if language == LANGUAGE_PYTHON and posixpath.basename(rel_path) == "__init__.py"}
+
+        for rel_path, language, _, package, _ in parsed:
+            if language == LANGUAGE_PYTHON:
+                parts = rel_path[:-len(".py")].split("/")
+                if parts[-1] == "__init__":
+                    parts.pop()
+                for index in range(len(parts)):
+                    if index and "/".join(parts[:index]) in python_packages:
+                        continue
+                    self.python_modules.setdefault(".".join(parts[index:]), []).append(rel_path)
+            elif language == LANGUAGE_JAVASCRIPT:
+                self.javascript_paths.add(rel_path)
+            elif language == LANGUAGE_GO:
+                if not rel_path.endswith("_test.go"):
+                    self.go_packages.setdefault(posixpath.dirname(rel_path), []).append(rel_path)
+            elif language == LANGUAGE_JAVA:
+                class_name = posixpath.splitext(posixpath.basename(rel_path))[0]
+                self.java_classes[f"{package}.{class_name}" if package else class_name] = rel_path
+                self.java_packages.setdefault(package, []).append(rel_path)
+
+        for rel_paths in self.python_modules.values():
+            rel_paths.sort(key=lambda rel_path: (rel_path.count("/"), rel_path))
+
+    def resolve(self, rel_path: str, language: str, imports: list) -> set:
+        """
+        Resolves imports of a file to repo files, ignoring third party modules
+        :param rel_path: relative path of importing file
+        :param language: language of importing file
+        :param imports: list of imported names or specifiers
+        :return: set of relative paths of imported repo files
+        """
+        resolve_import = getattr(self, f"_resolve_{language}")
+        targets = set()
+        for name in imports:
+            targets.update(resolve_import(rel_path, name))
+        targets.discard(rel_path)
+        return targets
+
+    def _resolve_python(self, rel_path: str, name: str) -> list:
+        if name.startswith("."):
+            level = len(name) - len(name.lstrip("."))
+            package_parts = rel_path.split("/")[:-1]
+            if level > 1:
+                package_parts = package_parts[:-(level - 1)]
+            name = ".".join(package_parts + [part for part in name[level:].split(".") if part])
+        elif name.split(".", 1)[0] in sys.stdlib_module_names:
+            return []
+        matches = self.python_modules.get(name)
+        return matches[:1] if matches else []
+
+    def _resolve_javascript(self, rel_path: str, name: str) -> list:
+        if not name.startswith("."):
+            return []
+        base = posixpath.normpath(posixpath.join(posixpath.dirname(rel_path), name))
+        candidates = [base] + [base + extension for extension in JAVASCRIPT_EXTENSIONS] + \
+            [f"{base}/index{extension}" for extension in JAVASCRIPT_EXTENSIONS]
+        for candidate in candidates:
+            if candidate in self.javascript_paths:
+                return [candidate]
+        if base.endswith(".js"):
+            return self._resolve_javascript(rel_path, name[:-len(".js")])
+        return []
+
+    def _resolve_go(self, rel_path: str, name: str) -> list:
+        if not self.go_module or not (name == self.go_module or name.startswith(self.go_module + "/")):
+            return []
+        return self.go_packages.get(name[len(self.go_module) + 1:], [])
+
+    def _resolve_java(self, rel_path: str, name: str) -> list:
+        if name.endswith(".*"):
+            return self.java_packages.get(name[:-2], [])
+        while "." in name:
+            match = self.java_classes.get(name)
+            if match is not None:
+                return [match]
+            name = name.rsplit(".", 1)[0]
+        return []
+
+
+def _parse_python_regex(source: str) -> list:
+    imports = []
+    for from_module, from_names, modules in PYTHON_IMPORT_REGEX.findall(source):
+        if modules:
+            imports.extend(module.split(" as ")[0].strip() for module in modules.split(","))
+        else:
+            imports.append(from_module)
+            separator = "" if from_module.endswith(".") else "."
+            imports.extend(f"{from_module}{separator}{name.split(' as ')[0].strip()}"
+                           for name in from_names.split(",") if name.strip())
+    return imports
+
+
+def _get_parse_pool(max_workers: int = None) -> ProcessPoolExecutor:
+    """
+    Gets process pool shared by all runs, started with spawn so that it is safe to create from worker threads
+    :param max_workers: number of processes if the pool is not created yet
+    :return: process pool
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(max_workers=max_workers or min(MAX_PARSE_PROCESSES, os.cpu_count() or 1),
+                                              mp_context=multiprocessing.get_context("spawn"))
+        return _parse_pool
+
+
+def _reset_parse_pool() -> None:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+def _is_main_guard(test: ast.expr) -> bool:
+    return isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "__name__" \
+        and any(isinstance(comparator, ast.Constant) and comparator.value == "__main__"
+                for comparator in test.comparators)
+
+
+def _is_cli_decorator(decorator: ast.expr) -> bool:
+    if isinstance(decorator, ast.Call):
+        decorator = decorator.func
+    return isinstance(decorator, ast.Attribute) and decorator.attr in CLI_DECORATOR_NAMES
+
+
+def _read_go_module(repo_path: str) -> str | None:
+    try:
+        with open(os.path.join(repo_path, "go.mod"), "r", encoding="utf-8", errors="replace") as file:
+            match = GO_MODULE_REGEX.search(file.read())
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+
+def _pagerank(edges: dict) -> dict:
+    """
+    Computes PageRank of files over import edges, so that files imported by central files rank higher.
+    Ranks are pulled from importing files so that inner loops run in map and sum
+    :param edges: dict of relative file path to set of imported relative file paths
+    :return: dict of relative file path to centrality
+    """
+    rel_paths = list(edges)
+    node_count = len(rel_paths)
+    if not node_count:
+        return {}
+
+    ids = {rel_path: index for index, rel_path in enumerate(rel_paths)}
+    importers = [[] for _ in range(node_count)]
+    out_weights = [0.0] * node_count
+    dangling = []
+    for index, rel_path in enumerate(rel_paths):
+        targets = [ids[target] for target in edges[rel_path] if target in ids]
+        if not targets:
+            dangling.append(index)
+            continue
+        out_weights[index] = PAGERANK_DAMPING / len(targets)
+        for target in targets:
+            importers[target].append(index)
+
+    rank = [1.0 / node_count] * node_count
+    for _ in range(PAGERANK_ITERATIONS):
+        base = (1 - PAGERANK_DAMPING) / node_count + \
+            PAGERANK_DAMPING * sum(map(rank.__getitem__, dangling)) / node_count
+        shares = list(map(mul, rank, out_weights))
+        new_rank = [base + sum(map(shares.__getitem__, node_importers)) for node_importers in importers]
+        change = sum(map(abs, map(sub, new_rank, rank)))
+        rank = new_rank
+        if change < PAGERANK_TOLERANCE:
+            break
+
+    return dict(zip(rel_paths, rank))
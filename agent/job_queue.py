@@ -0,0 +1,188 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from agent.batch import run_repo, STATUS_SUCCESS, STATUS_ERROR
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE_DEPTH = 100
+MAX_RETAINED_JOBS = 1000
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_CANCELLED = "cancelled"
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, graph, workers: int = DEFAULT_WORKERS, max_queue_depth: int = DEFAULT_MAX_QUEUE_DEPTH,
+                 max_retained_jobs: int = MAX_RETAINED_JOBS):
+        if workers < 1 or max_queue_depth < 1:
+            raise Exception(f"Unsupported job queue size: {workers} workers, max queue depth {max_queue_depth}")
+
+        self.graph = graph
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+        self.max_retained_jobs = max_retained_jobs
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._busy_workers = 0
+        self._started = time.monotonic()
+        self._counts = {STATUS_SUCCESS: 0, STATUS_ERROR: 0, STATUS_CANCELLED: 0, "rejected": 0}
+        self._queue_wait_seconds = 0.0
+        self._max_queue_wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def start(self) -> None:
+        """
+        Starts worker threads that share the compiled graph and clients
+        """
+        self._started = time.monotonic()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"readme-agent-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} workers, max queue depth {self.max_queue_depth}")
+
+    def stop(self, timeout: float = None, cancel_pending: bool = False) -> None:
+        """
+        Stops workers after they finish their running jobs, and queued jobs unless these are cancelled
+        :param timeout: max time in seconds to wait for all workers, workers still running after it are abandoned
+        :param cancel_pending: cancel queued jobs that have not started yet
+        """
+        if cancel_pending:
+            self._cancel_pending()
+        for _ in self._threads:
+            self._queue.put(None)
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()) if deadline is not None else None)
+        running = sum(thread.is_alive() for thread in self._threads)
+        if running:
+            logger.warning(f"{running} workers are still running jobs after {timeout}s, not waiting for them")
+        self._threads = []
+
+    def submit(self, repo_url: str) -> dict:
+        """
+        Queues README job for repo
+        :param repo_url: github repo url
+        :return: job
+        :raise QueueFullError when max queue depth is reached
+        """
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "repo_url": repo_url,
+            "status": STATUS_QUEUED,
+            "created": time.time(),
+            "queue_wait_seconds": None,
+            "result": None,
+        }
+        with self._lock:
+            if self._queue.qsize() >= self.max_queue_depth:
+                self._counts["rejected"] += 1
+                raise QueueFullError(f"Job queue is full: {self.max_queue_depth} jobs")
+            self._queue.put_nowait((job["job_id"], time.monotonic()))
+            self._jobs[job["job_id"]] = job
+            self._prune_jobs()
+            return dict(job)
+
+    def get(self, job_id: str) -> dict | None:
+        """
+        Gets job status and result
+        :param job_id: job id
+        :return: copy of job or None if job is unknown or pruned
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self) -> dict:
+        """
+        Gets queue depth, worker usage, job counts, queue wait and throughput since start
+        :return: queue statistics
+        """
+        with self._lock:
+            finished = self._counts[STATUS_SUCCESS] + self._counts[STATUS_ERROR]
+            elapsed = time.monotonic() - self._started
+            return {
+                "workers": self.workers,
+                "busy_workers": self._busy_workers,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "succeeded": self._counts[STATUS_SUCCESS],
+                "failed": self._counts[STATUS_ERROR],
+                "cancelled": self._counts[STATUS_CANCELLED],
+                "rejected": self._counts["rejected"],
+                "mean_queue_wait_seconds": round(self._queue_wait_seconds / finished, 3) if finished else 0.0,
+                "max_queue_wait_seconds": round(self._max_queue_wait_seconds, 3),
+                "mean_run_seconds": round(self._run_seconds / finished, 3) if finished else 0.0,
+                "jobs_per_minute": round(finished / elapsed * 60, 2) if elapsed else 0.0,
+            }
+
+    def _work(self) -> None:
+        """
+        Runs queued jobs until stopped
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            job_id, queued = item
+            queue_wait = time.monotonic() - queued
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job["status"] = STATUS_RUNNING
+                job["queue_wait_seconds"] = round(queue_wait, 3)
+                self._busy_workers += 1
+
+            result = run_repo(self.graph, job["repo_url"])
+
+            with self._lock:
+                job["status"] = result["status"]
+                job["result"] = result
+                self._busy_workers -= 1
+                self._counts[result["status"]] += 1
+                self._queue_wait_seconds += queue_wait
+                self._max_queue_wait_seconds = max(self._max_queue_wait_seconds, queue_wait)
+                self._run_seconds += result["duration_seconds"]
+
+    def _cancel_pending(self) -> None:
+        """
+        Removes queued jobs that have not started and marks them cancelled
+        """
+        cancelled = 0
+        with self._lock:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                job = self._jobs.get(item[0]) if item is not None else None
+                if job is not None:
+                    job["status"] = STATUS_CANCELLED
+                    cancelled += 1
+            self._counts[STATUS_CANCELLED] += cancelled
+        logger.info(f"Cancelled {cancelled} queued jobs")
+
+    def _prune_jobs(self) -> None:
+        """
+        Forgets oldest finished jobs above retention limit. Must be called with lock held
+        """
+        finished_ids = [job_id for job_id, job in self._jobs.items()
+                        if job["status"] in (STATUS_SUCCESS, STATUS_ERROR, STATUS_CANCELLED)]
+        for job_id in finished_ids[:max(0, len(self._jobs) - self.max_retained_jobs)]:
+            del self._jobs[job_id]
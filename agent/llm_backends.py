@@ -0,0 +1,308 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, AsyncIterator, Iterator
+from agent.prompts import get_essential_files_prompt_template, narrow_essential_files_prompt_template
+from agent.token_counter import ApproximateEncoding, get_encoding
+
+if TYPE_CHECKING:
+    import tiktoken
+
+LLM_BACKEND_OPENAI = "openai"
+LLM_BACKEND_STUB = "stub"
+LLM_BACKEND_LOCAL = "local"
+LLM_BACKENDS = (LLM_BACKEND_OPENAI, LLM_BACKEND_STUB, LLM_BACKEND_LOCAL)
+
+MODEL_NAME = "gpt-4o"
+TEMPERATURE = 0.3
+LOCAL_API_KEY = "local"
+STUB_MODEL_NAME = "stub"
+STUB_SELECTED_FILE_COUNT = 10
+STUB_README = """# Project
+
+## Overview
+
+Deterministic README returned by the stub LLM backend.
+
+## Installation
+
+```bash
+pip install .
+```
+
+## Usage
+
+```bash
+python main.py --help
+```
+"""
+SELECTION_TEMPLATES = (get_essential_files_prompt_template, narrow_essential_files_prompt_template)
+SIZE_HINT_PATTERN = re.compile(r" \d+[BKM]$")
+
+
+class StubBackendError(Exception):
+    pass
+
+
+class LLMBackend(ABC):
+    model_name: str
+
+    @abstractmethod
+    def complete(self, prompt: str) -> str:
+        """
+        Completes prompt
+        :param prompt: prompt for LLM
+        :return: LLM response
+        """
+
+    async def acomplete(self, prompt: str) -> str:
+        """
+        Completes prompt asynchronously, in a worker thread unless the backend has native async support
+        :param prompt: prompt for LLM
+        :return: LLM response
+        """
+        return await asyncio.to_thread(self.complete, prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Streams completion of prompt, as a single chunk unless the backend supports streaming
+        :param prompt: prompt for LLM
+        :return: iterator of response chunks
+        """
+        yield self.complete(prompt)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Streams completion of prompt asynchronously
+        :param prompt: prompt for LLM
+        :return: async iterator of response chunks
+        """
+        yield await self.acomplete(prompt)
+
+    def get_encoding(self) -> "tiktoken.Encoding":
+        """
+        Gets tokenizer encoding that token budgets are counted with, the gpt-4o encoding unless the backend
+        supplies another one. Offline runs need a tiktoken cache for it, like TIKTOKEN_CACHE_DIR
+        :return: tiktoken encoding or compatible encoding
+        """
+        return get_encoding(MODEL_NAME)
+
+
+class ChatModelBackend(LLMBackend):
+    def __init__(self, llm, model_name: str = MODEL_NAME):
+        self.llm = llm
+        self.model_name = model_name
+
+    def complete(self, prompt: str) -> str:
+        """
+        Invokes LangChain chat model with prompt as a single human message
+        :param prompt: prompt for LLM
+        :return: LLM response
+        """
+        return self.llm.invoke(self._build_messages(prompt)).content
+
+    async def acomplete(self, prompt: str) -> str:
+        """
+        Invokes LangChain chat model asynchronously
+        :param prompt: prompt for LLM
+        :return: LLM response
+        """
+        return (await self.llm.ainvoke(self._build_messages(prompt))).content
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Streams LangChain chat model response as it is generated
+        :param prompt: prompt for LLM
+        :return: iterator of response chunks
+        """
+        for chunk in self.llm.stream(self._build_messages(prompt)):
+            if chunk.content:
+                yield chunk.content
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Streams LangChain chat model response asynchronously
+        :param prompt: prompt for LLM
+        :return: async iterator of response chunks
+        """
+        async for chunk in self.llm.astream(self._build_messages(prompt)):
+            if chunk.content:
+                yield chunk.content
+
+    @staticmethod
+    def _build_messages(prompt: str) -> list:
+        """
+        Wraps prompt in chat messages, importing langchain only when a chat model is used
+        :param prompt: prompt for LLM
+        :return: list with a single human message
+        """
+        from langchain_core.messages import HumanMessage
+
+        return [HumanMessage(content=prompt)]
+
+
+class StubBackend(LLMBackend):
+    def __init__(self, latency_seconds: float = 0.0, jitter_seconds: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, readme: str = STUB_README):
+        if not 0.0 <= error_rate <= 1.0:
+            raise Exception(f"Unsupported stub error rate: {error_rate}")
+
+        self.model_name = STUB_MODEL_NAME
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.error_rate = error_rate
+        self.readme = readme
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def complete(self, prompt: str) -> str:
+        """
+        Answers after configured latency with canned selection JSON for file selection prompts and canned README
+        text otherwise, failing with configured error rate
+        :param prompt: prompt for LLM
+        :return: LLM response
+        :raise StubBackendError when an error is injected
+        """
+        delay, fails = self._next_call()
+        time.sleep(delay)
+        return self._respond(prompt, fails)
+
+    async def acomplete(self, prompt: str) -> str:
+        """
+        Answers like complete without blocking the event loop
+        :param prompt: prompt for LLM
+        :return: LLM response
+        :raise StubBackendError when an error is injected
+        """
+        delay, fails = self._next_call()
+        await asyncio.sleep(delay)
+        return self._respond(prompt, fails)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Streams canned response line by line after configured latency, failing before the first chunk
+        with configured error rate
+        :param prompt: prompt for LLM
+        :return: iterator of response chunks
+        :raise StubBackendError when an error is injected
+        """
+        delay, fails = self._next_call()
+        time.sleep(delay)
+        yield from self._respond(prompt, fails).splitlines(keepends=True)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Streams like stream without blocking the event loop
+        :param prompt: prompt for LLM
+        :return: async iterator of response chunks
+        :raise StubBackendError when an error is injected
+        """
+        delay, fails = self._next_call()
+        await asyncio.sleep(delay)
+        for chunk in self._respond(prompt, fails).splitlines(keepends=True):
+            yield chunk
+
+    def get_encoding(self) -> ApproximateEncoding:
+        """
+        Gets character based encoding, so that offline runs need no tokenizer download
+        :return: approximate encoding
+        """
+        return ApproximateEncoding()
+
+    def _next_call(self) -> tuple:
+        """
+        Draws latency and injected error of the next call
+        :return: tuple of delay in seconds and True if the call fails
+        """
+        with self._lock:
+            self.calls += 1
+            jitter = self._random.uniform(0.0, self.jitter_seconds) if self.jitter_seconds else 0.0
+            fails = self.error_rate > 0.0 and self._random.random() < self.error_rate
+        return self.latency_seconds + jitter, fails
+
+    def _respond(self, prompt: str, fails: bool) -> str:
+        if fails:
+            raise StubBackendError("Injected stub LLM error")
+
+        for template in SELECTION_TEMPLATES:
+            prefix, suffix = template.split("{files}")
+            if prompt.startswith(prefix) and prompt.endswith(suffix):
+                rel_paths = parse_file_tree(prompt[len(prefix):len(prompt) - len(suffix)])
+                selected = sorted(rel_paths, key=lambda rel_path: rel_path.count("/"))[:STUB_SELECTED_FILE_COUNT]
+                return f"```json\n{json.dumps(selected)}\n```"
+        return self.readme
+
+
+def parse_file_tree(listing: str) -> list:
+    """
+    Parses relative file paths back from encoded file tree, skipping summarized files
+    :param listing: file tree encoded by encode_file_tree
+    :return: list of relative file paths in listing order
+    """
+    rel_paths, dir_labels = [], []
+    for line in listing.splitlines():
+        entry = line.lstrip(" ")
+        if not entry or entry.startswith("[") or " [" in entry:
+            continue
+
+        depth = len(line) - len(entry)
+        del dir_labels[depth:]
+        if entry.endswith("/"):
+            dir_labels.append(entry[:-1])
+        else:
+            rel_paths.append("/".join(dir_labels + [SIZE_HINT_PATTERN.sub("", entry)]))
+    return rel_paths
+
+
+def create_openai_backend(api_key: str, model_name: str = MODEL_NAME, base_url: str = None,
+                          max_retries: int = None) -> ChatModelBackend:
+    """
+    Creates backend of OpenAI chat model, or of an OpenAI-compatible server if base url is provided,
+    importing langchain_openai only when a backend is created
+    :param api_key: OpenAI api key, any value for local servers without authentication
+    :param model_name: model name
+    :param base_url: optional base url of OpenAI-compatible API, like http://localhost:8000/v1
+    :param max_retries: max retries of the OpenAI client, 0 when a request scheduler retries instead
+    :return: chat model backend
+    """
+    from langchain_openai import ChatOpenAI
+
+    options = {"base_url": base_url} if base_url else {}
+    if max_retries is not None:
+        options["max_retries"] = max_retries
+    return ChatModelBackend(ChatOpenAI(model=model_name, temperature=TEMPERATURE, api_key=api_key, **options),
+                            model_name=model_name)
+
+
+def create_backend(backend: str, api_key: str = None, model_name: str = MODEL_NAME, base_url: str = None,
+                   stub_latency_seconds: float = 0.0, stub_jitter_seconds: float = 0.0,
+                   stub_error_rate: float = 0.0, max_retries: int = None) -> LLMBackend:
+    """
+    Creates LLM backend by name
+    :param backend: backend name, one of LLM_BACKENDS
+    :param api_key: OpenAI api key, or key of the local server, which must never get the OpenAI key
+    :param model_name: model name for OpenAI and local backends
+    :param base_url: base url of OpenAI-compatible API for local backend
+    :param stub_latency_seconds: fixed latency of stub backend calls
+    :param stub_jitter_seconds: max random latency added to stub backend calls
+    :param stub_error_rate: share of stub backend calls that fail
+    :param max_retries: max retries of OpenAI and local backend clients, 0 when a request scheduler retries instead
+    :return: LLM backend
+    """
+    if backend == LLM_BACKEND_OPENAI:
+        return create_openai_backend(api_key=api_key, model_name=model_name, max_retries=max_retries)
+    if backend == LLM_BACKEND_LOCAL:
+        if not base_url:
+            raise Exception("Local LLM backend requires base url")
+        return create_openai_backend(api_key=api_key or LOCAL_API_KEY, model_name=model_name, base_url=base_url,
+                                     max_retries=max_retries)
+    if backend == LLM_BACKEND_STUB:
+        return StubBackend(latency_seconds=stub_latency_seconds, jitter_seconds=stub_jitter_seconds,
+                           error_rate=stub_error_rate)
+    raise Exception(f"Unsupported LLM backend: {backend}")
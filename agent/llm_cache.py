@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from contextlib import closing
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10_000
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class LLMResponseCache:
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 bypass: bool = False):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    @staticmethod
+    def make_key(model_name: str, temperature: float, prompt: str) -> str:
+        """
+        Builds cache key from model settings and prompt hash
+        :param model_name: LLM model name
+        :param temperature: LLM temperature
+        :param prompt: LLM prompt
+        :return: cache key
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8", "surrogatepass")).hexdigest()
+        return hashlib.sha256(json.dumps([model_name, temperature, prompt_hash]).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Gets cached response that is not expired
+        :param key: cache key
+        :return: cached response or None on miss or bypass
+        """
+        if self.bypass:
+            return None
+
+        now = time.time()
+        with closing(self._connect()) as connection, connection:
+            row = connection.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            elif row is not None:
+                connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return None if row is None else row[0]
+
+    def set(self, key: str, response: str) -> None:
+        """
+        Stores response and evicts least recently used entries above max entries
+        :param key: cache key
+        :param response: LLM response
+        """
+        now = time.time()
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def stats(self) -> dict:
+        """
+        Gets hit and miss counters of this process
+        :return: cache statistics
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bypass": self.bypass}
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
@@ -1,52 +1,339 @@
+import asyncio
+import itertools
 import logging
-import tiktoken
+import threading
+import time
+import weakref
 
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage
+from typing import TYPE_CHECKING, AsyncIterator, Iterator
+from agent import tracing
+from agent.llm_backends import LLMBackend, ChatModelBackend, MODEL_NAME, TEMPERATURE, create_openai_backend
+from agent.llm_cache import LLMResponseCache
+from agent.request_scheduler import RequestScheduler, PRIORITY_NORMAL
+from agent.token_counter import TokenCounter
+
+if TYPE_CHECKING:
+    import tiktoken
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-MODEL_NAME = "gpt-4o"
 INPUT_TOKEN_LIMIT = 5000
-TEMPERATURE = 0.3
+MAX_CONCURRENT_REQUESTS = 8
 
 
 class LLMClient:
-    def __init__(self, api_key: str):
-        self.model_name = MODEL_NAME
-        self.llm = ChatOpenAI(model=MODEL_NAME, temperature=TEMPERATURE, api_key=api_key)
+    def __init__(self, api_key: str, max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+                 response_cache: LLMResponseCache = None, llm=None, backend: LLMBackend = None,
+                 scheduler: RequestScheduler = None, encoding=None):
+        if backend is None:
+            backend = ChatModelBackend(llm) if llm is not None else create_openai_backend(api_key=api_key)
+
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.max_concurrent_requests = max_concurrent_requests
+        self.response_cache = response_cache
+        self.scheduler = scheduler
+        self.encoding = encoding
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._token_counter = None
+        self._token_counter_lock = threading.Lock()
 
-    def invoke(self, prompt: str) -> str:
+    def invoke(self, prompt: str, token_count: int = None, priority: int = PRIORITY_NORMAL) -> str:
         """
         Invokes LLM with prompt
         :param prompt: prompt for LLM
+        :param token_count: number of tokens in prompt if already counted
+        :param priority: scheduling priority when rate limits are configured
+        :return: LLM response
+        """
+        with tracing.span("llm.invoke", model=self.model_name) as llm_span:
+            cache_key = self._get_cache_key(prompt)
+            if cache_key is not None:
+                cached_response = self.response_cache.get(cache_key)
+                if cached_response is not None:
+                    logger.info(f"LLM response cache hit for {self.model_name}")
+                    self._record_usage(llm_span, token_count, cached_response, cache_hit=True)
+                    return cached_response
+
+            token_count = self._validate_token_count(prompt, token_count)
+
+            logger.info(f"Invoke LLM {self.model_name}")
+            if self.scheduler is None:
+                response = self.backend.complete(prompt)
+            else:
+                response = self.scheduler.call(lambda: self.backend.complete(prompt), prompt_tokens=token_count,
+                                               priority=priority, count_tokens=self._get_completion_counter())
+
+            if cache_key is not None:
+                self.response_cache.set(cache_key, response)
+            self._record_usage(llm_span, token_count, response, cache_hit=False)
+            return response
+
+    async def ainvoke(self, prompt: str, token_count: int = None, priority: int = PRIORITY_NORMAL) -> str:
+        """
+        Invokes LLM with prompt asynchronously, limiting number of requests in flight
+        :param prompt: prompt for LLM
+        :param token_count: number of tokens in prompt if already counted
+        :param priority: scheduling priority when rate limits are configured
         :return: LLM response
         """
-        self._validate_token_count(prompt)
+        with tracing.span("llm.invoke", measure_cpu=False, model=self.model_name) as llm_span:
+            cache_key = self._get_cache_key(prompt)
+            if cache_key is not None:
+                cached_response = await asyncio.to_thread(self.response_cache.get, cache_key)
+                if cached_response is not None:
+                    logger.info(f"LLM response cache hit for {self.model_name}")
+                    self._record_usage(llm_span, token_count, cached_response, cache_hit=True)
+                    return cached_response
+
+            token_count = self._validate_token_count(prompt, token_count)
+
+            async with self._get_semaphore():
+                logger.info(f"Invoke LLM {self.model_name} asynchronously")
+                if self.scheduler is None:
+                    response = await self.backend.acomplete(prompt)
+                else:
+                    response = await self.scheduler.acall(lambda: self.backend.acomplete(prompt),
+                                                          prompt_tokens=token_count, priority=priority,
+                                                          count_tokens=self._get_completion_counter())
+
+            if cache_key is not None:
+                await asyncio.to_thread(self.response_cache.set, cache_key, response)
+            self._record_usage(llm_span, token_count, response, cache_hit=False)
+            return response
+
+    def stream(self, prompt: str, token_count: int = None, priority: int = PRIORITY_NORMAL) -> Iterator[str]:
+        """
+        Streams LLM response to prompt, yielding chunks as they arrive. A cached response is yielded as one chunk
+        :param prompt: prompt for LLM
+        :param token_count: number of tokens in prompt if already counted
+        :param priority: scheduling priority when rate limits are configured
+        :return: iterator of response chunks
+        """
+        with tracing.span("llm.invoke", model=self.model_name) as llm_span:
+            cache_key = self._get_cache_key(prompt)
+            if cache_key is not None:
+                cached_response = self.response_cache.get(cache_key)
+                if cached_response is not None:
+                    logger.info(f"LLM response cache hit for {self.model_name}")
+                    self._record_usage(llm_span, token_count, cached_response, cache_hit=True)
+                    yield cached_response
+                    return
+
+            token_count = self._validate_token_count(prompt, token_count)
+
+            logger.info(f"Stream LLM {self.model_name}")
+            start = time.perf_counter()
+            chunks, first_chunk = self._open_stream(prompt, token_count, priority)
+            if llm_span is not None:
+                llm_span.set(first_chunk_seconds=time.perf_counter() - start)
+
+            parts = [] if cache_key is not None else None
+            count_completion = llm_span is not None or self._paces_tokens()
+            completion_tokens = 0
+            try:
+                for chunk in itertools.chain([first_chunk], chunks):
+                    if parts is not None:
+                        parts.append(chunk)
+                    if count_completion:
+                        completion_tokens += self.get_token_counter().count(chunk)
+                    yield chunk
+            finally:
+                self._settle_stream(token_count, completion_tokens if count_completion else None)
+
+            if parts is not None:
+                self.response_cache.set(cache_key, "".join(parts))
+            if llm_span is not None:
+                llm_span.set(completion_tokens=completion_tokens, cache_hits=0, prompt_tokens=token_count)
+
+    async def astream(self, prompt: str, token_count: int = None,
+                      priority: int = PRIORITY_NORMAL) -> AsyncIterator[str]:
+        """
+        Streams LLM response to prompt asynchronously, holding a request slot until the stream ends
+        :param prompt: prompt for LLM
+        :param token_count: number of tokens in prompt if already counted
+        :param priority: scheduling priority when rate limits are configured
+        :return: async iterator of response chunks
+        """
+        with tracing.span("llm.invoke", measure_cpu=False, model=self.model_name) as llm_span:
+            cache_key = self._get_cache_key(prompt)
+            if cache_key is not None:
+                cached_response = await asyncio.to_thread(self.response_cache.get, cache_key)
+                if cached_response is not None:
+                    logger.info(f"LLM response cache hit for {self.model_name}")
+                    self._record_usage(llm_span, token_count, cached_response, cache_hit=True)
+                    yield cached_response
+                    return
+
+            token_count = self._validate_token_count(prompt, token_count)
+
+            parts = [] if cache_key is not None else None
+            count_completion = llm_span is not None or self._paces_tokens()
+            completion_tokens = 0
+            async with self._get_semaphore():
+                logger.info(f"Stream LLM {self.model_name} asynchronously")
+                start = time.perf_counter()
+                chunks, first_chunk = await self._aopen_stream(prompt, token_count, priority)
+                if llm_span is not None:
+                    llm_span.set(first_chunk_seconds=time.perf_counter() - start)
+
+                try:
+                    async for chunk in _achain(first_chunk, chunks):
+                        if parts is not None:
+                            parts.append(chunk)
+                        if count_completion:
+                            completion_tokens += self.get_token_counter().count(chunk)
+                        yield chunk
+                finally:
+                    self._settle_stream(token_count, completion_tokens if count_completion else None)
+
+            if parts is not None:
+                await asyncio.to_thread(self.response_cache.set, cache_key, "".join(parts))
+            if llm_span is not None:
+                llm_span.set(completion_tokens=completion_tokens, cache_hits=0, prompt_tokens=token_count)
+
+    def get_encoding(self) -> "tiktoken.Encoding":
+        """
+        Gets tokenizer encoding that token budgets are counted with, the injected one or the one of the backend
+        :return: tiktoken encoding or compatible encoding
+        """
+        if self.encoding is not None:
+            return self.encoding
+        return self.backend.get_encoding()
 
-        logger.info(f"Invoke LLM {self.model_name}")
-        return self.llm.invoke([HumanMessage(content=prompt)]).content
+    def get_token_counter(self) -> TokenCounter:
+        """
+        Gets token counter of the model shared by all callers of the client
+        :return: token counter
+        """
+        with self._token_counter_lock:
+            if self._token_counter is None:
+                self._token_counter = TokenCounter(self.get_encoding())
+            return self._token_counter
+
+    def _get_cache_key(self, prompt: str) -> str | None:
+        """
+        Builds response cache key for prompt
+        :param prompt: prompt for LLM
+        :return: cache key or None if response cache is not configured
+        """
+        if self.response_cache is None:
+            return None
+        return self.response_cache.make_key(self.model_name, TEMPERATURE, prompt)
+
+    def _open_stream(self, prompt: str, token_count: int, priority: int) -> tuple:
+        """
+        Starts backend stream and waits for its first chunk, so that failures before any output are retried
+        :param prompt: prompt for LLM
+        :param token_count: number of tokens in prompt
+        :param priority: scheduling priority
+        :return: tuple of chunk iterator and first chunk, empty if the response is empty
+        """
+        def open_stream() -> tuple:
+            chunks = iter(self.backend.stream(prompt))
+            return chunks, next(chunks, "")
+
+        if self.scheduler is None:
+            return open_stream()
+        return self.scheduler.call(open_stream, prompt_tokens=token_count, priority=priority, settle_later=True)
+
+    async def _aopen_stream(self, prompt: str, token_count: int, priority: int) -> tuple:
+        """
+        Starts backend stream asynchronously and waits for its first chunk
+        :param prompt: prompt for LLM
+        :param token_count: number of tokens in prompt
+        :param priority: scheduling priority
+        :return: tuple of async chunk iterator and first chunk, empty if the response is empty
+        """
+        async def open_stream() -> tuple:
+            chunks = aiter(self.backend.astream(prompt))
+            return chunks, await anext(chunks, "")
+
+        if self.scheduler is None:
+            return await open_stream()
+        return await self.scheduler.acall(open_stream, prompt_tokens=token_count, priority=priority,
+                                          settle_later=True)
 
-    def _validate_token_count(self, prompt: str) -> None:
+    def _settle_stream(self, token_count: int, completion_tokens: int) -> None:
+        """
+        Settles scheduler token reservation of an ended stream with completion tokens actually received
+        :param token_count: number of tokens in prompt
+        :param completion_tokens: number of completion tokens counted while streaming, None if not counted
+        """
+        if self.scheduler is None:
+            return
+        if completion_tokens is None:
+            completion_tokens = self.scheduler.expected_completion_tokens
+        self.scheduler.settle(token_count, completion_tokens)
+
+    def _paces_tokens(self) -> bool:
+        return self.scheduler is not None and self.scheduler.paces_tokens
+
+    def _get_completion_counter(self):
+        """
+        Gets function counting completion tokens for scheduler, only if it paces tokens per minute
+        :return: token counting function or None
+        """
+        if not self.scheduler.paces_tokens:
+            return None
+        return self.get_token_counter().count
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """
+        Gets semaphore bound to running event loop
+        :return: semaphore limiting concurrent requests
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    def _record_usage(self, llm_span: tracing.Span | None, token_count: int | None, response: str,
+                      cache_hit: bool) -> None:
+        """
+        Records prompt and completion tokens and cache hits on LLM span, counting completion tokens only if recorded
+        :param llm_span: LLM span or None if nothing is recorded
+        :param token_count: number of tokens in prompt, None if not counted for a cache hit
+        :param response: LLM response
+        :param cache_hit: response came from response cache
+        """
+        if llm_span is None:
+            return
+
+        llm_span.set(completion_tokens=self.get_token_counter().count(response), cache_hits=int(cache_hit))
+        if token_count is not None:
+            llm_span.set(prompt_tokens=token_count)
+
+    def _validate_token_count(self, prompt: str, token_count: int = None) -> int:
         """
         Validates number of tokens
         :param prompt: LLM prompt
+        :param token_count: number of tokens in prompt if already counted
+        :return: number of tokens in prompt
         :raise Exception when prompt exceeds token limit
         """
-        token_count = self._count_tokens(text=prompt, model_name=MODEL_NAME)
+        if token_count is None:
+            token_count = self._count_tokens(text=prompt)
         logger.info(f"Number of tokens: {token_count}")
 
         if token_count > INPUT_TOKEN_LIMIT:
             logger.info(f"Prompt exceeds token limit: {token_count}")
             raise Exception("Prompt exceeds token limit")
+        return token_count
 
-    def _count_tokens(self, text: str, model_name: str) -> int:
+    def _count_tokens(self, text: str) -> int:
         """
         Counts token in text
         :param text: LLM prompt
-        :param model_name: LLM model name
         :return: number of tokens
         """
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
+        return len(self.get_encoding().encode(text, disallowed_special=()))
+
+
+async def _achain(first_chunk: str, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    yield first_chunk
+    async for chunk in chunks:
+        yield chunk
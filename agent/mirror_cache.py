@@ -0,0 +1,273 @@
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from git import Repo, GitCommandError
+
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+FETCH_REFSPECS = ["+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]
+MIRROR_SUFFIX = ".git"
+LOCK_SUFFIX = ".lock"
+PARTIAL_SUFFIX = ".partial"
+SIZE_SUFFIX = ".size"
+GITDIR_PREFIX = "gitdir:"
+WORKTREES_DIR = "worktrees"
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """
+    Normalizes repo url so that equivalent urls share one mirror
+    :param repo_url: repo url, optionally with credentials
+    :return: normalized url without credentials, trailing slash and .git suffix
+    """
+    parts = urlsplit(repo_url.strip())
+    host = (parts.hostname or "").lower()
+    if parts.port:
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/")
+    if path.endswith(MIRROR_SUFFIX):
+        path = path[:-len(MIRROR_SUFFIX)]
+
+    return f"{parts.scheme.lower()}://{host}{path}"
+
+
+class MirrorCache:
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def checkout(self, repo_url: str, target_dir: str, fetch_url: str = None) -> None:
+        """
+        Refreshes the repo mirror and checks out its HEAD as worktree in target directory
+        :param repo_url: repo url used as cache key
+        :param target_dir: path for the worktree, must be empty or missing
+        :param fetch_url: url with credentials to fetch from, defaults to repo url
+        """
+        key = self._key(repo_url)
+        mirror_path = self._mirror_path(key)
+        fetch_url = fetch_url or repo_url
+
+        with self._lock(key):
+            try:
+                if os.path.isdir(mirror_path):
+                    repo = Repo(mirror_path)
+                    repo.git.fetch("--prune", "--quiet", fetch_url, *FETCH_REFSPECS)
+                    logger.info(f"Mirror fetched incrementally: '{mirror_path}'")
+                else:
+                    partial_path = mirror_path + PARTIAL_SUFFIX
+                    shutil.rmtree(partial_path, ignore_errors=True)
+                    Repo.clone_from(fetch_url, partial_path, bare=True)
+                    os.rename(partial_path, mirror_path)
+                    repo = Repo(mirror_path)
+                    repo.git.remote("set-url", "origin", normalize_repo_url(repo_url))
+                    logger.info(f"Mirror created: '{mirror_path}'")
+
+                repo.git.worktree("prune")
+                repo.git.worktree("add", "--detach", target_dir, "HEAD")
+                logger.info(f"Worktree checked out into '{target_dir}'")
+                self._write_size(key, self._get_object_size(repo))
+            except GitCommandError as e:
+                logger.error(f"Error updating mirror: {e}")
+                raise
+
+            os.utime(mirror_path)
+
+        self.evict(keep=key)
+
+    def release(self, target_dir: str) -> None:
+        """
+        Detaches worktree from its mirror once the run is done, so that the mirror can be evicted.
+        Files in the target directory, like the generated README, are kept
+        :param target_dir: path of the worktree created by checkout
+        """
+        git_file_path = os.path.join(target_dir, ".git")
+        try:
+            with open(git_file_path, encoding="utf-8") as git_file:
+                git_dir = git_file.read().strip()
+        except OSError:
+            return
+        if not git_dir.startswith(GITDIR_PREFIX):
+            return
+
+        mirror_path = os.path.dirname(os.path.dirname(git_dir[len(GITDIR_PREFIX):].strip()))
+        if os.path.dirname(os.path.realpath(mirror_path)) != os.path.realpath(self.cache_dir):
+            return
+
+        with self._lock(os.path.basename(mirror_path)[:-len(MIRROR_SUFFIX)]):
+            os.remove(git_file_path)
+            if os.path.isdir(mirror_path):
+                try:
+                    Repo(mirror_path).git.worktree("prune")
+                except GitCommandError as e:
+                    logger.warning(f"Error pruning worktrees of '{mirror_path}': {e}")
+        logger.info(f"Worktree released: '{target_dir}'")
+
+    def evict(self, keep: str = None) -> list:
+        """
+        Removes least recently used mirrors until cache fits max size, skipping mirrors with live worktrees
+        :param keep: key of the mirror that must not be evicted
+        :return: list of evicted keys
+        """
+        mirrors = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir() and entry.name.endswith(MIRROR_SUFFIX):
+                key = entry.name[:-len(MIRROR_SUFFIX)]
+                mirrors.append((entry.stat().st_mtime, key, self._read_size(key)))
+
+        total_bytes = sum(size for _, _, size in mirrors)
+        evicted = []
+
+        for _, key, size in sorted(mirrors):
+            if total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+
+            with self._lock(key, blocking=False) as acquired:
+                if not acquired or self._has_worktrees(key):
+                    continue
+                shutil.rmtree(self._mirror_path(key), ignore_errors=True)
+                self._remove_size(key)
+                self._remove_lock(key)
+
+            total_bytes -= size
+            evicted.append(key)
+            logger.info(f"Mirror evicted: '{key}' ({size} bytes)")
+
+        return evicted
+
+    def _key(self, repo_url: str) -> str:
+        """
+        Builds file system safe cache key for repo url
+        :param repo_url: repo url
+        :return: cache key
+        """
+        normalized_url = normalize_repo_url(repo_url)
+        digest = hashlib.sha256(normalized_url.encode("utf-8")).hexdigest()[:12]
+        readable_name = re.sub(r"[^A-Za-z0-9._-]+", "-", normalized_url.split("://", 1)[-1]).strip("-")
+        return f"{readable_name}-{digest}"
+
+    def _mirror_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + MIRROR_SUFFIX)
+
+    @contextmanager
+    def _lock(self, key: str, blocking: bool = True):
+        """
+        Holds exclusive file lock on mirror, shared between threads and processes. The lock file may be removed
+        on eviction, so a lock taken on a removed file is retried on the new one
+        :param key: cache key
+        :param blocking: wait for the lock if it is held
+        :return: True if lock is acquired
+        """
+        lock_path = self._lock_path(key)
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        while True:
+            with open(lock_path, "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, flags)
+                except BlockingIOError:
+                    yield False
+                    return
+
+                try:
+                    if not self._is_current_lock(lock_file, lock_path):
+                        continue
+                    yield True
+                    return
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + LOCK_SUFFIX)
+
+    @staticmethod
+    def _is_current_lock(lock_file, lock_path: str) -> bool:
+        try:
+            return os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _remove_lock(self, key: str) -> None:
+        """
+        Removes lock file of an evicted mirror, its lock must be held
+        :param key: cache key
+        """
+        try:
+            os.remove(self._lock_path(key))
+        except OSError:
+            pass
+
+    def _has_worktrees(self, key: str) -> bool:
+        """
+        Checks if mirror still has worktrees, after pruning worktrees whose directories were removed
+        :param key: cache key, its lock must be held
+        :return: True if mirror is in use by a run
+        """
+        mirror_path = self._mirror_path(key)
+        try:
+            Repo(mirror_path).git.worktree("prune")
+        except GitCommandError as e:
+            logger.warning(f"Error pruning worktrees of '{mirror_path}': {e}")
+            return True
+
+        worktrees_path = os.path.join(mirror_path, WORKTREES_DIR)
+        return os.path.isdir(worktrees_path) and len(os.listdir(worktrees_path)) > 0
+
+    def _read_size(self, key: str) -> int:
+        """
+        Reads mirror size tracked on checkout, measuring it once if it is not tracked yet
+        :param key: cache key
+        :return: mirror size in bytes
+        """
+        try:
+            with open(os.path.join(self.cache_dir, key + SIZE_SUFFIX), encoding="utf-8") as size_file:
+                return int(size_file.read())
+        except (OSError, ValueError):
+            size = self._directory_size(self._mirror_path(key))
+            self._write_size(key, size)
+            return size
+
+    def _write_size(self, key: str, size: int) -> None:
+        size_path = os.path.join(self.cache_dir, key + SIZE_SUFFIX)
+        partial_path = f"{size_path}.{os.getpid()}.{threading.get_ident()}{PARTIAL_SUFFIX}"
+        with open(partial_path, "w", encoding="utf-8") as size_file:
+            size_file.write(str(size))
+        os.replace(partial_path, size_path)
+
+    def _remove_size(self, key: str) -> None:
+        try:
+            os.remove(os.path.join(self.cache_dir, key + SIZE_SUFFIX))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _get_object_size(repo: Repo) -> int:
+        """
+        Counts bytes of loose and packed objects of a mirror without walking its directory
+        :param repo: mirror repo
+        :return: size in bytes
+        """
+        counts = dict(line.split(": ", 1) for line in repo.git.count_objects("-v").splitlines())
+        return sum(int(counts.get(name, 0)) for name in ("size", "size-pack", "size-garbage")) * 1024
+
+    @staticmethod
+    def _directory_size(path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for file in files:
+                try:
+                    total += os.lstat(os.path.join(root, file)).st_size
+                except OSError:
+                    pass
+        return total
@@ -1,76 +1,735 @@
+import asyncio
+import logging
 import os
+import threading
 
-from typing import TypedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from functools import partial
+from typing import Annotated, Callable, TypedDict
 from dotenv import load_dotenv
-from agent.github_client import GitHubClient
-from agent.file_utils import create_temp_directory, extract_file_names, merge_files, create_readme, get_file_paths, \
-    get_file_names, get_essential_file_paths
-from agent.llm_client import LLMClient
-from agent.prompts import get_essential_files_prompt_template, generate_readme_prompt_template
+from agent import tracing
+from agent.github_client import GitHubClient, CLONE_MODE_FULL
+from agent.file_index import FileIndex
+from agent.file_ranker import FileRanker, RankResult, RANKER_MODE_OFF
+from agent.import_graph import ImportGraph, build_import_graph
+from agent.file_utils import create_temp_directory, extract_file_names, merge_file_contents, create_readme, read_file, \
+    write_readme_stream, awrite_readme_stream
+from agent.llm_cache import LLMResponseCache, DEFAULT_TTL_SECONDS, DEFAULT_MAX_ENTRIES
+from agent.llm_backends import create_backend, LLM_BACKEND_OPENAI, LLM_BACKEND_LOCAL, MODEL_NAME
+from agent.llm_client import LLMClient, MAX_CONCURRENT_REQUESTS, INPUT_TOKEN_LIMIT
+from agent.request_scheduler import RequestScheduler, PRIORITY_HIGH, DEFAULT_MAX_RETRIES
+from agent.mirror_cache import MirrorCache, DEFAULT_MAX_BYTES
+from agent.ignore_rules import DEFAULT_IGNORE_PATTERNS
+from agent.repo_index import index_repo, filter_records, is_binary_extension, MAX_INDEXED_FILE_SIZE
+from agent.summary_cache import FileSummaryCache
+from agent.prompts import get_essential_files_prompt_template, generate_readme_prompt_template, \
+    summarize_files_prompt_template, reduce_readme_prompt_template, narrow_essential_files_prompt_template
+from agent.tree_listing import fit_file_tree, partition_file_tree
+from agent.token_packer import pack_files, pack_contents, count_file_tokens, split_into_chunks
+
+PROMPT_SAFETY_MARGIN_TOKENS = 16
+SELECTION_MODE_TREE = "tree"
+SELECTION_MODE_CHUNKED = "chunked"
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
 
 load_dotenv()
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", MAX_CONCURRENT_REQUESTS))
+LLM_BACKEND = os.getenv("LLM_BACKEND", LLM_BACKEND_OPENAI)
+LLM_MODEL = os.getenv("LLM_MODEL", MODEL_NAME)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+LLM_API_KEY = os.getenv("LLM_API_KEY")
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", 0))
+LLM_STUB_JITTER_MS = float(os.getenv("LLM_STUB_JITTER_MS", 0))
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", 0))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 0))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 0))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+CLONE_MODE = os.getenv("CLONE_MODE", CLONE_MODE_FULL)
+INDEXED_FILE_MAX_BYTES = int(os.getenv("INDEXED_FILE_MAX_BYTES", MAX_INDEXED_FILE_SIZE))
+IGNORE_PATTERNS = tuple(filter(None, map(str.strip, os.environ["IGNORE_PATTERNS"].split(",")))) \
+    if "IGNORE_PATTERNS" in os.environ else DEFAULT_IGNORE_PATTERNS
+MIRROR_CACHE_DIR = os.getenv("MIRROR_CACHE_DIR")
+MIRROR_CACHE_MAX_BYTES = int(os.getenv("MIRROR_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH")
+FILE_RANKER_MODE = os.getenv("FILE_RANKER_MODE", RANKER_MODE_OFF)
+IMPORT_GRAPH = os.getenv("IMPORT_GRAPH", "").lower() in ("1", "true", "yes")
+SELECTION_MODE = os.getenv("SELECTION_MODE", SELECTION_MODE_TREE)
+TRACE_PATH = os.getenv("TRACE_PATH")
+README_STREAMING = os.getenv("README_STREAMING", "").lower() in ("1", "true", "yes")
+README_STREAM_PROGRESS = os.getenv("README_STREAM_PROGRESS", "").lower() in ("1", "true", "yes")
+
+CLIENT_FACTORIES = {
+    "mirror_cache": lambda: MirrorCache(cache_dir=MIRROR_CACHE_DIR, max_bytes=MIRROR_CACHE_MAX_BYTES)
+    if MIRROR_CACHE_DIR else None,
+    "github_client": lambda: GitHubClient(github_token=GITHUB_TOKEN, clone_mode=CLONE_MODE,
+                                          mirror_cache=get_client("mirror_cache")),
+    "response_cache": lambda: LLMResponseCache(path=LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                                               max_entries=LLM_CACHE_MAX_ENTRIES, bypass=LLM_CACHE_BYPASS)
+    if LLM_CACHE_PATH else None,
+    "request_scheduler": lambda: RequestScheduler(requests_per_minute=LLM_REQUESTS_PER_MINUTE or None,
+                                                  tokens_per_minute=LLM_TOKENS_PER_MINUTE or None,
+                                                  max_retries=LLM_MAX_RETRIES),
+    "llm_client": lambda: LLMClient(api_key=OPENAI_API_KEY, max_concurrent_requests=LLM_MAX_CONCURRENT_REQUESTS,
+                                    response_cache=get_client("response_cache"),
+                                    scheduler=get_client("request_scheduler"),
+                                    backend=create_backend(LLM_BACKEND, model_name=LLM_MODEL,
+                                                           api_key=LLM_API_KEY if LLM_BACKEND == LLM_BACKEND_LOCAL
+                                                           else OPENAI_API_KEY,
+                                                           base_url=LLM_BASE_URL,
+                                                           stub_latency_seconds=LLM_STUB_LATENCY_MS / 1000,
+                                                           stub_jitter_seconds=LLM_STUB_JITTER_MS / 1000,
+                                                           stub_error_rate=LLM_STUB_ERROR_RATE, max_retries=0)),
+    "summary_cache": lambda: FileSummaryCache(path=SUMMARY_CACHE_PATH, bypass=LLM_CACHE_BYPASS)
+    if SUMMARY_CACHE_PATH else None,
+    "file_ranker": lambda: FileRanker(mode=FILE_RANKER_MODE) if FILE_RANKER_MODE != RANKER_MODE_OFF else None,
+}
+_clients_lock = threading.RLock()
+
+
+def get_client(name: str):
+    """
+    Gets shared client, creating it from environment settings on first use so that importing nodes stays cheap
+    :param name: client name, one of CLIENT_FACTORIES
+    :return: client, or None for optional clients that are not configured
+    """
+    clients = globals()
+    if name not in clients:
+        with _clients_lock:
+            if name not in clients:
+                clients[name] = CLIENT_FACTORIES[name]()
+    return clients[name]
+
+
+def set_clients(**clients) -> None:
+    """
+    Injects shared clients instead of creating them from environment settings, like a stub LLM client
+    :param clients: clients by name, like llm_client=LLMClient(...)
+    """
+    unknown_names = set(clients) - set(CLIENT_FACTORIES)
+    if unknown_names:
+        raise Exception(f"Unknown clients: {sorted(unknown_names)}")
+
+    with _clients_lock:
+        globals().update(clients)
+
+
+def get_github_client() -> GitHubClient:
+    return get_client("github_client")
+
+
+def get_llm_client() -> LLMClient:
+    return get_client("llm_client")
+
+
+def get_response_cache() -> LLMResponseCache | None:
+    return get_client("response_cache")
+
+
+def get_request_scheduler() -> RequestScheduler:
+    return get_client("request_scheduler")
+
+
+def get_summary_cache() -> FileSummaryCache | None:
+    return get_client("summary_cache")
+
+
+def get_file_ranker() -> FileRanker | None:
+    return get_client("file_ranker")
 
-github_client = GitHubClient(github_token=GITHUB_TOKEN)
-llm_client = LLMClient(api_key=OPENAI_API_KEY)
+
+def __getattr__(name: str):
+    if name in CLIENT_FACTORIES:
+        return get_client(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def merge_chunk_summaries(existing: dict, new: dict) -> dict:
+    return {**(existing or {}), **(new or {})}
 
 
 class AgentState(TypedDict):
     repo_url: str
     temp_directory_path: str
     file_paths: list
+    file_index: FileIndex
+    import_graph: ImportGraph
     essential_file_names: list
+    essential_file_paths: list
+    essential_file_token_counts: list
+    truncated_file_paths: list
+    dropped_file_paths: list
+    chunk_summaries: Annotated[dict, merge_chunk_summaries]
     readme_body: str
+    readme_streamed: bool
+
+
+class ChunkState(TypedDict):
+    temp_directory_path: str
+    chunk_index: int
+    chunk_file_paths: list
+    chunk_file_token_counts: dict
+
+
+def create_initial_state(repo_url: str) -> AgentState:
+    return AgentState(
+        repo_url=repo_url,
+        temp_directory_path="",
+        file_paths=[],
+        file_index=None,
+        import_graph=None,
+        essential_file_names=[],
+        essential_file_paths=[],
+        essential_file_token_counts=None,
+        truncated_file_paths=[],
+        dropped_file_paths=[],
+        chunk_summaries={},
+        readme_body="",
+        readme_streamed=False
+    )
 
 
+@tracing.traced("clone_repo_node")
 def clone_repo_node(state: AgentState) -> AgentState:
     temp_directory = create_temp_directory()
     state["temp_directory_path"] = temp_directory
     repo_url = state["repo_url"]
+    github_client = get_github_client()
 
     github_client.clone_repo(repo_url=repo_url, target_dir=temp_directory)
 
-    file_paths = get_file_paths(repo_path=temp_directory)
+    if github_client.has_working_tree:
+        with tracing.span("index_repo") as index_span:
+            file_records = filter_records(index_repo(repo_path=temp_directory, ignore_patterns=IGNORE_PATTERNS),
+                                          max_file_size=INDEXED_FILE_MAX_BYTES)
+            file_paths = [record.path for record in file_records]
+            file_sizes = [record.size for record in file_records]
+            if index_span is not None:
+                index_span.set(file_count=len(file_paths), indexed_bytes=sum(file_sizes))
+    else:
+        file_paths = [path for path in github_client.list_files(repo_path=temp_directory,
+                                                                ignore_patterns=IGNORE_PATTERNS)
+                      if not is_binary_extension(path)]
+        file_sizes = None
     state["file_paths"] = file_paths
+    state["file_index"] = FileIndex(repo_path=temp_directory, file_paths=file_paths, file_sizes=file_sizes)
+    state["import_graph"] = None
+    if IMPORT_GRAPH and github_client.has_working_tree:
+        with tracing.span("build_import_graph"):
+            state["import_graph"] = build_import_graph(repo_path=temp_directory,
+                                                       rel_paths=state["file_index"].rel_paths)
+    tracing.set_attributes(file_count=len(file_paths))
 
     return state
 
 
+@tracing.traced("select_essential_files_node")
 def select_essential_files_node(state: AgentState) -> AgentState:
-    file_paths = state["file_paths"]
-    file_names = get_file_names(file_paths=file_paths)
+    rank_result = _rank_files(state)
+    if rank_result is not None and get_file_ranker().skips_llm(rank_result):
+        return _set_ranked_file_names(state, rank_result)
 
-    prompt = get_essential_files_prompt_template.format(files=file_names)
+    prompts = _build_essential_files_prompts(state, rank_result)
+    llm_client = get_llm_client()
+    if len(prompts) > 1:
+        invoke = tracing.in_current_context(
+            lambda chunk_prompt: llm_client.invoke(prompt=chunk_prompt[0], token_count=chunk_prompt[1],
+                                                   priority=PRIORITY_HIGH))
+        with ThreadPoolExecutor(max_workers=llm_client.max_concurrent_requests) as executor:
+            chunk_results = list(executor.map(invoke, prompts))
+        prompts = [_build_narrowing_prompt(state, chunk_results)]
 
-    result = llm_client.invoke(prompt=prompt)
-    essential_file_names = extract_file_names(string_input=result)
+    prompt, token_count = prompts[0]
+
+    result = llm_client.invoke(prompt=prompt, token_count=token_count, priority=PRIORITY_HIGH)
+
+    return _set_essential_file_names(state, result, rank_result)
+
+
+@tracing.traced("resolve_essential_files_node")
+def resolve_essential_files_node(state: AgentState) -> AgentState:
+    """
+    Resolves selected file names to paths once, checks them out in partial clone modes and counts their tokens,
+    so that routing and README nodes reuse them
+    :param state: agent state
+    :return: state with essential file paths and token counts
+    """
+    essential_file_paths = _get_essential_file_paths(state)
+    state["essential_file_paths"] = essential_file_paths
+    state["essential_file_token_counts"] = None
+    if get_summary_cache() is None:
+        state["essential_file_token_counts"] = count_file_tokens(
+            file_paths=essential_file_paths, token_counter=get_llm_client().get_token_counter(),
+            file_reader=_get_file_reader(state))
 
-    state["essential_file_names"] = essential_file_names
     return state
 
 
+@tracing.traced("readme_body_node")
 def readme_body_node(state: AgentState) -> AgentState:
-    essential_file_names = state["essential_file_names"]
-    file_paths = state["file_paths"]
-    essential_file_paths = get_essential_file_paths(file_names=essential_file_names, file_paths=file_paths)
+    prompt, token_count = _build_readme_prompt(state)
+    if README_STREAMING:
+        return _stream_readme(state, prompt, token_count)
 
-    merged_content = merge_files(essential_file_paths)
+    readme_body = get_llm_client().invoke(prompt=prompt, token_count=token_count)
 
-    prompt = generate_readme_prompt_template.format(all_files_content=merged_content)
+    state["readme_body"] = readme_body
+
+    return state
+
+
+@tracing.traced("route_readme_generation")
+def route_readme_generation(state: AgentState) -> str | list:
+    """
+    Routes small repos to single README call and large repos to parallel chunk summaries,
+    or to cached per-file summaries if summary cache is configured, using token counts of resolve_essential_files_node
+    :param state: agent state
+    :return: next node name or list of chunk sends
+    """
+    if get_summary_cache() is not None:
+        return "summarize_files_node"
 
-    readme_body = llm_client.invoke(prompt=prompt)
+    token_counter = get_llm_client().get_token_counter()
+    file_token_counts = state["essential_file_token_counts"]
+    total_token_count = sum(token_count for _, token_count in file_token_counts)
+
+    readme_template_token_count = token_counter.count(generate_readme_prompt_template.format(all_files_content=""))
+    if total_token_count <= _get_token_budget(readme_template_token_count):
+        return "readme_body_node"
+
+    summary_template_token_count = token_counter.count(summarize_files_prompt_template.format(all_files_content=""))
+    chunk_token_budget = _get_token_budget(summary_template_token_count)
+    chunks = split_into_chunks(file_token_counts=file_token_counts, token_budget=chunk_token_budget)
+    logger.info(f"Essential files have {total_token_count} tokens, summarizing {len(chunks)} chunks")
+
+    from langgraph.types import Send
+
+    token_counts = dict(file_token_counts)
+    return [
+        Send("summarize_chunk_node", ChunkState(temp_directory_path=state["temp_directory_path"], chunk_index=index,
+                                                 chunk_file_paths=chunk,
+                                                 chunk_file_token_counts={path: token_counts[path] for path in chunk}))
+        for index, chunk in enumerate(chunks)
+    ]
+
+
+@tracing.traced("summarize_chunk_node")
+def summarize_chunk_node(state: ChunkState) -> dict:
+    prompt, token_count = _build_chunk_prompt(state)
+
+    summary = get_llm_client().invoke(prompt=prompt, token_count=token_count)
+
+    return {"chunk_summaries": {state["chunk_index"]: (f"part {state['chunk_index'] + 1}", summary)}}
+
+
+@tracing.traced("summarize_files_node")
+def summarize_files_node(state: AgentState) -> AgentState:
+    essential_file_paths, summary_keys, summaries = _get_cached_file_summaries(state)
+    missing_file_paths = [path for path in essential_file_paths if summary_keys[path] not in summaries]
+
+    summarize_file = tracing.in_current_context(partial(_summarize_file, state["temp_directory_path"]))
+    with ThreadPoolExecutor(max_workers=get_llm_client().max_concurrent_requests) as executor:
+        new_summaries = list(executor.map(summarize_file, missing_file_paths))
+
+    return _set_file_summaries(state, essential_file_paths, summary_keys, summaries,
+                               dict(zip(missing_file_paths, new_summaries)))
+
+
+@tracing.traced("reduce_readme_node")
+def reduce_readme_node(state: AgentState) -> AgentState:
+    prompt, token_count = _build_reduce_prompt(state)
+    if README_STREAMING:
+        return _stream_readme(state, prompt, token_count)
+
+    readme_body = get_llm_client().invoke(prompt=prompt, token_count=token_count)
 
     state["readme_body"] = readme_body
 
     return state
 
 
+@tracing.traced("readme_file_node")
 def readme_file_node(state: AgentState) -> AgentState:
     readme_body = state["readme_body"]
     temp_directory_path = state["temp_directory_path"]
 
-    create_readme(content=readme_body, target_dir=temp_directory_path)
+    if not state.get("readme_streamed"):
+        create_readme(content=readme_body, target_dir=temp_directory_path)
+    get_github_client().release_repo(repo_path=temp_directory_path)
 
     return state
+
+
+async def aclone_repo_node(state: AgentState) -> AgentState:
+    return await asyncio.to_thread(clone_repo_node, state)
+
+
+@tracing.traced("select_essential_files_node")
+async def aselect_essential_files_node(state: AgentState) -> AgentState:
+    rank_result = await asyncio.to_thread(_rank_files, state)
+    if rank_result is not None and get_file_ranker().skips_llm(rank_result):
+        return _set_ranked_file_names(state, rank_result)
+
+    prompts = await asyncio.to_thread(_build_essential_files_prompts, state, rank_result)
+    llm_client = get_llm_client()
+    if len(prompts) > 1:
+        chunk_results = await asyncio.gather(*(llm_client.ainvoke(prompt=chunk_prompt, token_count=chunk_token_count,
+                                                                  priority=PRIORITY_HIGH)
+                                               for chunk_prompt, chunk_token_count in prompts))
+        prompts = [await asyncio.to_thread(_build_narrowing_prompt, state, list(chunk_results))]
+
+    prompt, token_count = prompts[0]
+
+    result = await llm_client.ainvoke(prompt=prompt, token_count=token_count, priority=PRIORITY_HIGH)
+
+    return _set_essential_file_names(state, result, rank_result)
+
+
+async def aresolve_essential_files_node(state: AgentState) -> AgentState:
+    return await asyncio.to_thread(resolve_essential_files_node, state)
+
+
+@tracing.traced("readme_body_node")
+async def areadme_body_node(state: AgentState) -> AgentState:
+    prompt, token_count = await asyncio.to_thread(_build_readme_prompt, state)
+    if README_STREAMING:
+        return await _astream_readme(state, prompt, token_count)
+
+    readme_body = await get_llm_client().ainvoke(prompt=prompt, token_count=token_count)
+
+    state["readme_body"] = readme_body
+
+    return state
+
+
+async def aroute_readme_generation(state: AgentState) -> str | list:
+    return await asyncio.to_thread(route_readme_generation, state)
+
+
+@tracing.traced("summarize_chunk_node")
+async def asummarize_chunk_node(state: ChunkState) -> dict:
+    prompt, token_count = await asyncio.to_thread(_build_chunk_prompt, state)
+
+    summary = await get_llm_client().ainvoke(prompt=prompt, token_count=token_count)
+
+    return {"chunk_summaries": {state["chunk_index"]: (f"part {state['chunk_index'] + 1}", summary)}}
+
+
+@tracing.traced("summarize_files_node")
+async def asummarize_files_node(state: AgentState) -> AgentState:
+    essential_file_paths, summary_keys, summaries = await asyncio.to_thread(_get_cached_file_summaries, state)
+    missing_file_paths = [path for path in essential_file_paths if summary_keys[path] not in summaries]
+
+    new_summaries = await asyncio.gather(*(_asummarize_file(state["temp_directory_path"], path)
+                                           for path in missing_file_paths))
+
+    return await asyncio.to_thread(_set_file_summaries, state, essential_file_paths, summary_keys, summaries,
+                                   dict(zip(missing_file_paths, new_summaries)))
+
+
+@tracing.traced("reduce_readme_node")
+async def areduce_readme_node(state: AgentState) -> AgentState:
+    prompt, token_count = await asyncio.to_thread(_build_reduce_prompt, state)
+    if README_STREAMING:
+        return await _astream_readme(state, prompt, token_count)
+
+    readme_body = await get_llm_client().ainvoke(prompt=prompt, token_count=token_count)
+
+    state["readme_body"] = readme_body
+
+    return state
+
+
+async def areadme_file_node(state: AgentState) -> AgentState:
+    return await asyncio.to_thread(readme_file_node, state)
+
+
+def _stream_readme(state: AgentState, prompt: str, token_count: int) -> AgentState:
+    """
+    Streams README body from LLM straight into README.md, so that the body is not kept in state and a partial
+    README stays on disk if the run is cut off. Progress output is meant for single runs, batch runs would interleave
+    :param state: agent state
+    :param prompt: README prompt
+    :param token_count: number of tokens in prompt
+    :return: state with readme_streamed set
+    """
+    chunks = get_llm_client().stream(prompt=prompt, token_count=token_count)
+    char_count = write_readme_stream(chunks, target_dir=state["temp_directory_path"], echo=README_STREAM_PROGRESS)
+    tracing.set_attributes(readme_chars=char_count)
+
+    state["readme_streamed"] = True
+    return state
+
+
+async def _astream_readme(state: AgentState, prompt: str, token_count: int) -> AgentState:
+    """
+    Streams README body from LLM straight into README.md asynchronously
+    :param state: agent state
+    :param prompt: README prompt
+    :param token_count: number of tokens in prompt
+    :return: state with readme_streamed set
+    """
+    chunks = get_llm_client().astream(prompt=prompt, token_count=token_count)
+    char_count = await awrite_readme_stream(chunks, target_dir=state["temp_directory_path"],
+                                            echo=README_STREAM_PROGRESS)
+    tracing.set_attributes(readme_chars=char_count)
+
+    state["readme_streamed"] = True
+    return state
+
+
+def _rank_files(state: AgentState) -> RankResult | None:
+    """
+    Ranks indexed files with local heuristics if file ranker is configured
+    :param state: agent state
+    :return: rank result or None if file ranker is off
+    """
+    file_ranker = get_file_ranker()
+    if file_ranker is None:
+        return None
+
+    file_index = _get_file_index(state)
+    return file_ranker.rank(rel_paths=file_index.rel_paths, sizes=file_index.sizes_by_rel_path,
+                            import_graph=state.get("import_graph"))
+
+
+def _build_essential_files_prompts(state: AgentState, rank_result: RankResult = None) -> list:
+    """
+    Builds file selection prompt with listing fitted to token budget, or in chunked selection mode one prompt
+    per directory chunk of a listing that does not fit
+    :param state: agent state
+    :param rank_result: optional rank result of file ranker
+    :return: list of (prompt, token count) tuples
+    """
+    file_index = _get_file_index(state)
+    token_counter = get_llm_client().get_token_counter()
+    template_token_count = token_counter.count(get_essential_files_prompt_template.format(files=""))
+    token_budget = _get_token_budget(template_token_count)
+
+    rel_paths = file_index.rel_paths
+    if rank_result is not None and get_file_ranker().shortlists(rank_result):
+        rel_paths = rank_result.candidate_rel_paths
+        logger.info(f"File ranker is not confident, listing {len(rel_paths)} of {len(file_index.rel_paths)} files")
+
+    if SELECTION_MODE == SELECTION_MODE_CHUNKED:
+        listings = partition_file_tree(rel_paths=rel_paths, token_budget=token_budget, token_counter=token_counter,
+                                       sizes=file_index.sizes_by_rel_path)
+        if len(listings) > 1:
+            logger.info(f"File listing does not fit token budget, selecting from {len(listings)} chunks")
+    else:
+        listings = [fit_file_tree(rel_paths=rel_paths, token_budget=token_budget, token_counter=token_counter,
+                                  sizes=file_index.sizes_by_rel_path)]
+
+    tracing.set_attributes(listed_files=len(rel_paths), listing_chunks=len(listings))
+    return [(get_essential_files_prompt_template.format(files=listing), template_token_count + listing_token_count)
+            for listing, listing_token_count in listings]
+
+
+def _build_narrowing_prompt(state: AgentState, chunk_results: list) -> tuple:
+    """
+    Builds prompt choosing global essential files among candidates selected from each chunk
+    :param state: agent state
+    :param chunk_results: list of LLM responses of chunk selection prompts
+    :return: tuple of prompt and its token count
+    """
+    file_index = _get_file_index(state)
+    repo_path = state["temp_directory_path"]
+    candidate_names = [name for result in chunk_results for name in extract_file_names(string_input=result)]
+    rel_paths = [os.path.relpath(path, repo_path) for path in file_index.resolve(candidate_names)]
+    logger.info(f"Narrowing {len(rel_paths)} candidate files selected from {len(chunk_results)} chunks")
+
+    token_counter = get_llm_client().get_token_counter()
+    template_token_count = token_counter.count(narrow_essential_files_prompt_template.format(files=""))
+    listing, listing_token_count = fit_file_tree(rel_paths=rel_paths,
+                                                 token_budget=_get_token_budget(template_token_count),
+                                                 token_counter=token_counter, sizes=file_index.sizes_by_rel_path)
+    prompt = narrow_essential_files_prompt_template.format(files=listing)
+
+    return prompt, template_token_count + listing_token_count
+
+
+def _set_essential_file_names(state: AgentState, result: str, rank_result: RankResult = None) -> AgentState:
+    essential_file_names = extract_file_names(string_input=result)
+
+    if rank_result is not None:
+        repo_path = state["temp_directory_path"]
+        essential_file_paths = _get_file_index(state).resolve(essential_file_names)
+        llm_rel_paths = [os.path.relpath(path, repo_path) for path in essential_file_paths]
+        get_file_ranker().record_agreement(rank_result, llm_rel_paths)
+
+    tracing.set_attributes(selected_files=len(essential_file_names))
+    state["essential_file_names"] = essential_file_names
+    return state
+
+
+def _set_ranked_file_names(state: AgentState, rank_result: RankResult) -> AgentState:
+    logger.info(f"File ranker recognized {rank_result.ecosystems} layout, "
+                f"selected {len(rank_result.selected_rel_paths)} files without LLM")
+
+    tracing.set_attributes(selected_files=len(rank_result.selected_rel_paths), skipped_llm=1)
+    state["essential_file_names"] = rank_result.selected_rel_paths
+    return state
+
+
+def _get_file_reader(state: AgentState | ChunkState) -> Callable:
+    """
+    Gets function reading file content, from git objects if clone has no working tree
+    :param state: agent or chunk state
+    :return: function like read_file
+    """
+    github_client = get_github_client()
+    if github_client.reads_from_object_database:
+        return partial(github_client.read_blob, state["temp_directory_path"])
+    return read_file
+
+
+def _get_file_index(state: AgentState) -> FileIndex:
+    """
+    Gets file index built on clone, or builds it for states created without one
+    :param state: agent state
+    :return: file index
+    """
+    if state.get("file_index") is None:
+        state["file_index"] = FileIndex(repo_path=state["temp_directory_path"], file_paths=state["file_paths"])
+    return state["file_index"]
+
+
+def _get_essential_file_paths(state: AgentState) -> list:
+    """
+    Resolves essential file names to paths, most central source files first if import graph is built,
+    and checks them out if clone has no working tree
+    :param state: agent state
+    :return: list of absolute essential file paths
+    """
+    file_index = _get_file_index(state)
+    essential_file_paths = file_index.resolve(state["essential_file_names"])
+
+    import_graph = state.get("import_graph")
+    if import_graph is not None:
+        repo_path = state["temp_directory_path"]
+        rel_paths = import_graph.order_by_centrality([os.path.relpath(path, repo_path)
+                                                      for path in essential_file_paths])
+        essential_file_paths = [file_index.paths_by_rel_path[rel_path] for rel_path in rel_paths]
+
+    github_client = get_github_client()
+    if not github_client.has_working_tree:
+        github_client.checkout_files(repo_path=state["temp_directory_path"], file_paths=essential_file_paths)
+
+    return essential_file_paths
+
+
+def _get_token_budget(template_token_count: int) -> int:
+    return INPUT_TOKEN_LIMIT - template_token_count - PROMPT_SAFETY_MARGIN_TOKENS
+
+
+def _build_readme_prompt(state: AgentState) -> tuple:
+    essential_file_paths = state["essential_file_paths"]
+    file_token_counts = state.get("essential_file_token_counts")
+
+    token_counter = get_llm_client().get_token_counter()
+    template_token_count = token_counter.count(generate_readme_prompt_template.format(all_files_content=""))
+    token_budget = _get_token_budget(template_token_count)
+
+    pack_result = pack_files(file_paths=essential_file_paths, token_budget=token_budget, token_counter=token_counter,
+                             file_reader=_get_file_reader(state),
+                             file_token_counts=dict(file_token_counts) if file_token_counts is not None else None)
+    state["truncated_file_paths"] = pack_result.truncated_file_paths
+    state["dropped_file_paths"] = pack_result.dropped_file_paths
+    tracing.set_attributes(packed_files=len(pack_result.file_contents), packed_tokens=pack_result.token_count,
+                           truncated_files=len(pack_result.truncated_file_paths),
+                           dropped_files=len(pack_result.dropped_file_paths))
+
+    merged_content = merge_file_contents(pack_result.file_contents)
+    prompt = generate_readme_prompt_template.format(all_files_content=merged_content)
+
+    return prompt, template_token_count + pack_result.token_count
+
+
+def _build_chunk_prompt(state: ChunkState) -> tuple:
+    token_counter = get_llm_client().get_token_counter()
+    template_token_count = token_counter.count(summarize_files_prompt_template.format(all_files_content=""))
+    token_budget = _get_token_budget(template_token_count)
+
+    pack_result = pack_files(file_paths=state["chunk_file_paths"], token_budget=token_budget,
+                             token_counter=token_counter, file_reader=_get_file_reader(state),
+                             file_token_counts=state.get("chunk_file_token_counts"))
+    merged_content = merge_file_contents(pack_result.file_contents)
+    prompt = summarize_files_prompt_template.format(all_files_content=merged_content)
+
+    return prompt, template_token_count + pack_result.token_count
+
+
+def _get_cached_file_summaries(state: AgentState) -> tuple:
+    """
+    Looks up summaries of essential files by git blob SHA
+    :param state: agent state
+    :return: tuple of essential file paths, dict of file path to summary key and dict of summary key to summary
+    """
+    essential_file_paths = state["essential_file_paths"]
+    blob_shas = get_github_client().get_blob_shas(repo_path=state["temp_directory_path"],
+                                                  file_paths=essential_file_paths)
+
+    repo_path = state["temp_directory_path"]
+    model_name = get_llm_client().model_name
+    summary_keys = {}
+    for path in essential_file_paths:
+        blob_sha = blob_shas.get(path)
+        summary_keys[path] = FileSummaryCache.make_summary_key(blob_sha, os.path.relpath(path, repo_path), model_name,
+                                                               summarize_files_prompt_template) if blob_sha else path
+
+    summaries = get_summary_cache().get_many([key for path, key in summary_keys.items() if path in blob_shas])
+    logger.info(f"Summary cache: {len(summaries)} of {len(essential_file_paths)} essential files unchanged")
+
+    return essential_file_paths, summary_keys, summaries
+
+
+def _set_file_summaries(state: AgentState, essential_file_paths: list, summary_keys: dict, summaries: dict,
+                        new_summaries: dict) -> AgentState:
+    get_summary_cache().set_many({summary_keys[path]: summary for path, summary in new_summaries.items()
+                                  if summary_keys[path] != path})
+    summaries.update({summary_keys[path]: summary for path, summary in new_summaries.items()})
+
+    repo_path = state["temp_directory_path"]
+    state["chunk_summaries"] = {
+        index: (os.path.relpath(path, repo_path), summaries[summary_keys[path]])
+        for index, path in enumerate(essential_file_paths)
+    }
+    return state
+
+
+def _summarize_file(repo_path: str, path: str) -> str:
+    prompt, token_count = _build_chunk_prompt(ChunkState(temp_directory_path=repo_path, chunk_index=0,
+                                                         chunk_file_paths=[path]))
+    return get_llm_client().invoke(prompt=prompt, token_count=token_count)
+
+
+async def _asummarize_file(repo_path: str, path: str) -> str:
+    prompt, token_count = await asyncio.to_thread(_build_chunk_prompt,
+                                                  ChunkState(temp_directory_path=repo_path, chunk_index=0,
+                                                             chunk_file_paths=[path]))
+    return await get_llm_client().ainvoke(prompt=prompt, token_count=token_count)
+
+
+def _build_reduce_prompt(state: AgentState) -> tuple:
+    chunk_summaries = state["chunk_summaries"]
+    summary_contents = [chunk_summaries[index] for index in sorted(chunk_summaries)]
+
+    token_counter = get_llm_client().get_token_counter()
+    template_token_count = token_counter.count(reduce_readme_prompt_template.format(summaries=""))
+    token_budget = _get_token_budget(template_token_count)
+
+    pack_result = pack_contents(file_contents=summary_contents, token_budget=token_budget,
+                                token_counter=token_counter)
+    summaries = merge_file_contents(pack_result.file_contents)
+    prompt = reduce_readme_prompt_template.format(summaries=summaries)
+
+    return prompt, template_token_count + pack_result.token_count
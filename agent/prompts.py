@@ -15,10 +15,56 @@ generate_readme_prompt_template = """
 
 get_essential_files_prompt_template = """
     You are an expert in creating software documentation. 
-    Given the following repository file names, identify the essential files 
+    Given the following repository file tree, identify the essential files 
     that would contribute the most useful information to write a README file.
-    Format the output list of the files as an array of strings. For example: ["User.java", "UserController.java"] 
+    The tree lists one entry per line, indented by one space per directory level. Directory names end with "/",
+    chains of single directories are joined into one line, file sizes may follow file names, 
+    and files that are not listed are summarized as counts in square brackets.
+    Format the output list of the full file paths as an array of strings. For example: ["pom.xml", "src/User.java"] 
 
     Repository files: 
     {files}
-    """
\ No newline at end of file
+    """
+
+narrow_essential_files_prompt_template = """
+    You are an expert in creating software documentation. 
+    The repository is too large to list at once, so candidate files were picked from each part of its file tree.
+    Given the following candidate file tree, identify the essential files 
+    that would contribute the most useful information to write a README file for the whole repository.
+    The tree lists one entry per line, indented by one space per directory level. Directory names end with "/",
+    chains of single directories are joined into one line, and file sizes may follow file names.
+    Format the output list of the full file paths as an array of strings. For example: ["pom.xml", "src/User.java"] 
+
+    Candidate files: 
+    {files}
+    """
+
+summarize_files_prompt_template = """
+    You are an expert in software documentation and code analysis. 
+    I am providing you with the contents of some of the files from a github project. 
+    The project is too large to analyze at once, so summarize these files for a later README generation step.
+    Describe concisely:
+        - The purpose of each file and the components it defines
+        - Public interfaces, commands and configuration options
+        - Installation, build or usage details
+
+    The files provided are:
+    {all_files_content}
+
+    Return only the summary, without introduction.
+    """
+
+reduce_readme_prompt_template = """
+    You are an expert in software documentation and code analysis. 
+    I am providing you with summaries of different parts of a github project. 
+    Combine them and generate a comprehensive README file that includes:
+        - A project overview
+        - Installation instructions
+        - Usage examples
+        - Details on configuration and key components extracted from the summaries
+
+    The summaries provided are:
+    {summaries}
+
+    Generate a well-structured and detailed README file. Do not include changelog, licence, and contributing sections.
+    """
@@ -0,0 +1,143 @@
+import logging
+import os
+
+from operator import attrgetter
+from agent.ignore_rules import IgnoreRules, DEFAULT_IGNORE_PATTERNS, GITIGNORE_FILE_NAME
+
+SNIFF_BYTES = 8000
+MAX_INDEXED_FILE_SIZE = 1024 ** 2
+SKIPPED_DIR_NAMES = frozenset({".git"})
+SKIPPED_FILE_NAMES = frozenset({GITIGNORE_FILE_NAME})
+BINARY_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".tif", ".tiff", ".psd",
+    ".pdf", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".jar", ".war", ".whl", ".egg",
+    ".exe", ".dll", ".so", ".dylib", ".a", ".o", ".obj", ".lib", ".class", ".pyc", ".pyo", ".wasm",
+    ".mp3", ".mp4", ".wav", ".ogg", ".flac", ".avi", ".mov", ".mkv", ".webm",
+    ".ttf", ".otf", ".woff", ".woff2", ".eot", ".bin", ".dat", ".db", ".sqlite", ".sqlite3", ".pkl", ".npy", ".npz",
+})
+TEXT_EXTENSIONS = frozenset({
+    ".py", ".pyi", ".md", ".rst", ".txt", ".json", ".yml", ".yaml", ".toml", ".cfg", ".ini", ".xml", ".html", ".css",
+    ".scss", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".kt", ".scala", ".c", ".h", ".cc", ".cpp", ".hpp",
+    ".cs", ".rb", ".php", ".swift", ".sh", ".sql", ".lock",
+})
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class FileRecord:
+    __slots__ = ("root", "rel_path", "size", "extension", "is_binary")
+
+    def __init__(self, root: str, rel_path: str, size: int, extension: str, is_binary: bool):
+        self.root = root
+        self.rel_path = rel_path
+        self.size = size
+        self.extension = extension
+        self.is_binary = is_binary
+
+    @property
+    def path(self) -> str:
+        """
+        Gets absolute file path, built on access so that records share one root string
+        :return: absolute file path
+        """
+        return os.path.join(self.root, self.rel_path)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FileRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"FileRecord(rel_path={self.rel_path!r}, size={self.size}, is_binary={self.is_binary})"
+
+
+def index_repo(repo_path: str, sniff: bool = True, ignore_patterns=DEFAULT_IGNORE_PATTERNS) -> list:
+    """
+    Indexes repo files with os.scandir, reusing directory entry stats for sizes and skipping ignored subtrees
+    :param repo_path: path of the repo
+    :param sniff: read file headers to detect binary files with extensions not known as binary or text
+    :param ignore_patterns: gitignore style patterns applied on top of the repo .gitignore files
+    :return: list of file records sorted by relative path
+    """
+    repo_path = os.path.normpath(repo_path)
+    records = []
+    extensions = {}
+    pending_dirs = [(repo_path, "", IgnoreRules.from_patterns(ignore_patterns))]
+
+    while pending_dirs:
+        directory, rel_directory, ignore_rules = pending_dirs.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = list(iterator)
+        except OSError as e:
+            logger.error(f"Error scanning directory: {e}")
+            continue
+
+        if any(entry.name == GITIGNORE_FILE_NAME for entry in entries):
+            ignore_rules = ignore_rules.extend_from_file(directory, rel_directory)
+        rel_prefix = rel_directory + "/" if rel_directory else ""
+
+        for entry in entries:
+            name = entry.name
+            rel_path = rel_prefix + name
+            if entry.is_dir(follow_symlinks=False):
+                if name not in SKIPPED_DIR_NAMES and not ignore_rules.is_ignored(rel_path, is_dir=True):
+                    pending_dirs.append((entry.path, rel_path, ignore_rules))
+                continue
+            if name in SKIPPED_FILE_NAMES or not entry.is_file() or ignore_rules.is_ignored(rel_path, is_dir=False):
+                continue
+
+            try:
+                size = entry.stat().st_size
+            except OSError:
+                size = 0
+
+            # one shared lower-cased string per distinct extension
+            extension = os.path.splitext(name)[1]
+            extension = extensions.setdefault(extension, extension.lower())
+
+            if extension in BINARY_EXTENSIONS:
+                is_binary = True
+            else:
+                is_binary = sniff and size > 0 and extension not in TEXT_EXTENSIONS and _sniff_binary(entry.path)
+            records.append(FileRecord(repo_path, rel_path, size, extension, is_binary))
+
+    records.sort(key=attrgetter("rel_path"))
+    return records
+
+
+def filter_records(records: list, max_file_size: int = MAX_INDEXED_FILE_SIZE, include_binary: bool = False) -> list:
+    """
+    Filters out binary and oversized files without reopening them
+    :param records: list of file records
+    :param max_file_size: max file size in bytes, None to keep files of any size
+    :param include_binary: keep binary files
+    :return: filtered list of file records
+    """
+    return [
+        record for record in records
+        if (include_binary or not record.is_binary) and (max_file_size is None or record.size <= max_file_size)
+    ]
+
+
+def is_binary_extension(path: str) -> bool:
+    """
+    Checks if file extension belongs to a known binary format
+    :param path: file path
+    :return: True for known binary extensions
+    """
+    return os.path.splitext(path)[1].lower() in BINARY_EXTENSIONS
+
+
+def _sniff_binary(path: str) -> bool:
+    """
+    Detects binary content the way git does, by a NUL byte in the file header
+    :param path: absolute file path
+    :return: True if file header contains NUL byte or file cannot be read
+    """
+    try:
+        with open(path, "rb") as file:
+            return b"\0" in file.read(SNIFF_BYTES)
+    except OSError:
+        return True
@@ -0,0 +1,407 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+from typing import Callable
+from agent import tracing
+from agent.llm_backends import StubBackendError
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal"}
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY_SECONDS = 1.0
+DEFAULT_MAX_DELAY_SECONDS = 60.0
+EXPECTED_COMPLETION_TOKENS = 1000
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+                         "ServiceUnavailableError", "Timeout", "TimeoutError", "ConnectionError"}
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        if per_minute <= 0:
+            raise Exception(f"Unsupported rate limit: {per_minute}")
+
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: int, now: float) -> float:
+        """
+        Gets time until bucket holds amount, amounts above capacity wait for a full bucket
+        :param amount: number of requests or tokens
+        :param now: monotonic time
+        :return: wait time in seconds, 0 if amount is available
+        """
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def consume(self, amount: int, now: float) -> None:
+        """
+        Takes amount from bucket
+        :param amount: number of requests or tokens
+        :param now: monotonic time
+        """
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: int) -> None:
+        """
+        Settles difference between reserved and used amount, the level goes below zero if more was used
+        :param amount: additionally used amount, negative to give back
+        """
+        self.level = min(self.capacity, self.level - amount)
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class _Waiter:
+    __slots__ = ("tokens", "notify", "cancelled", "granted")
+
+    def __init__(self, tokens: int, notify: Callable):
+        self.tokens = tokens
+        self.notify = notify
+        self.cancelled = False
+        self.granted = False
+
+
+class RequestScheduler:
+    def __init__(self, requests_per_minute: int = None, tokens_per_minute: int = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay_seconds: float = DEFAULT_BASE_DELAY_SECONDS,
+                 max_delay_seconds: float = DEFAULT_MAX_DELAY_SECONDS,
+                 expected_completion_tokens: int = EXPECTED_COMPLETION_TOKENS, seed: int = None):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.expected_completion_tokens = expected_completion_tokens
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer = None
+        self._timer_due = None
+        self._requests = 0
+        self._failures = 0
+        self._retries = 0
+        self._tokens = 0
+        self._queue_waits = {priority: [0, 0.0, 0.0] for priority in PRIORITY_NAMES}
+        self._first_start = None
+        self._last_end = None
+
+    @property
+    def paces_tokens(self) -> bool:
+        """
+        Checks if calls are paced by tokens per minute, so that callers count completion tokens
+        :return: True if tokens per minute limit is set
+        """
+        return self.token_bucket is not None
+
+    def call(self, function: Callable, prompt_tokens: int = 0, priority: int = PRIORITY_NORMAL,
+             count_tokens: Callable = None, settle_later: bool = False):
+        """
+        Calls function when rate limits allow, retrying transient errors with jittered exponential backoff
+        :param function: function sending one request
+        :param prompt_tokens: number of prompt tokens
+        :param priority: PRIORITY_HIGH calls are started before waiting PRIORITY_NORMAL calls
+        :param count_tokens: optional function counting completion tokens of the result, settles token reservation
+        :param settle_later: keep token reservation until settle is called, for streams counted when they end
+        :return: function result
+        """
+        tokens = self._reserved_tokens(prompt_tokens)
+        for attempt in range(self.max_retries + 1):
+            start = time.monotonic()
+            self._acquire(tokens, priority)
+            self._record_start(priority, time.monotonic() - start)
+            try:
+                result = function()
+            except Exception as e:
+                self._release(tokens)
+                delay = self._get_retry_delay(e, attempt)
+                if delay is None:
+                    self._record_end(failed=True)
+                    raise
+                time.sleep(delay)
+                continue
+            if not settle_later:
+                self._settle(tokens, prompt_tokens + self._count_completion_tokens(result, count_tokens))
+            return result
+
+    async def acall(self, function: Callable, prompt_tokens: int = 0, priority: int = PRIORITY_NORMAL,
+                    count_tokens: Callable = None, settle_later: bool = False):
+        """
+        Awaits coroutine function when rate limits allow, retrying transient errors with jittered exponential backoff
+        :param function: function returning awaitable that sends one request
+        :param prompt_tokens: number of prompt tokens
+        :param priority: PRIORITY_HIGH calls are started before waiting PRIORITY_NORMAL calls
+        :param count_tokens: optional function counting completion tokens of the result, settles token reservation
+        :param settle_later: keep token reservation until settle is called, for streams counted when they end
+        :return: awaited result
+        """
+        tokens = self._reserved_tokens(prompt_tokens)
+        for attempt in range(self.max_retries + 1):
+            start = time.monotonic()
+            await self._aacquire(tokens, priority)
+            self._record_start(priority, time.monotonic() - start)
+            try:
+                result = await function()
+            except Exception as e:
+                self._release(tokens)
+                delay = self._get_retry_delay(e, attempt)
+                if delay is None:
+                    self._record_end(failed=True)
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            if not settle_later:
+                self._settle(tokens, prompt_tokens + self._count_completion_tokens(result, count_tokens))
+            return result
+
+    def settle(self, prompt_tokens: int, completion_tokens: int) -> None:
+        """
+        Settles token reservation of a call made with settle_later once its completion tokens are known
+        :param prompt_tokens: number of prompt tokens passed to the call
+        :param completion_tokens: number of completion tokens actually received
+        """
+        self._settle(self._reserved_tokens(prompt_tokens), prompt_tokens + completion_tokens)
+
+    def stats(self) -> dict:
+        """
+        Gets request counters, queue wait by priority and effective throughput of this process
+        :return: scheduler statistics
+        """
+        with self._lock:
+            elapsed = (self._last_end - self._first_start) if self._last_end is not None else 0.0
+            return {
+                "requests": self._requests,
+                "failures": self._failures,
+                "retries": self._retries,
+                "tokens": self._tokens,
+                "requests_per_minute_limit": self.request_bucket.capacity if self.request_bucket else None,
+                "tokens_per_minute_limit": self.token_bucket.capacity if self.token_bucket else None,
+                "queue_wait": {
+                    PRIORITY_NAMES[priority]: {
+                        "starts": starts,
+                        "mean_seconds": round(total / starts, 3) if starts else 0.0,
+                        "max_seconds": round(longest, 3),
+                    }
+                    for priority, (starts, total, longest) in self._queue_waits.items()
+                },
+                "requests_per_minute": round(self._requests / elapsed * 60, 2) if elapsed else 0.0,
+                "tokens_per_minute": round(self._tokens / elapsed * 60, 2) if elapsed else 0.0,
+            }
+
+    def _reserved_tokens(self, prompt_tokens: int) -> int:
+        return prompt_tokens + self.expected_completion_tokens if self.token_bucket else 0
+
+    def _acquire(self, tokens: int, priority: int) -> None:
+        """
+        Blocks until the request may start
+        :param tokens: number of tokens to reserve
+        :param priority: request priority
+        """
+        if self.request_bucket is None and self.token_bucket is None:
+            return
+
+        granted = threading.Event()
+        self._enqueue(_Waiter(tokens, granted.set), priority)
+        granted.wait()
+
+    async def _aacquire(self, tokens: int, priority: int) -> None:
+        """
+        Waits without blocking the event loop until the request may start
+        :param tokens: number of tokens to reserve
+        :param priority: request priority
+        """
+        if self.request_bucket is None and self.token_bucket is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        waiter = _Waiter(tokens, lambda: loop.call_soon_threadsafe(_set_granted, granted))
+        self._enqueue(waiter, priority)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            self._cancel(waiter)
+            raise
+
+    def _enqueue(self, waiter: _Waiter, priority: int) -> None:
+        with self._lock:
+            heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+            self._dispatch()
+
+    def _cancel(self, waiter: _Waiter) -> None:
+        """
+        Drops waiter of a cancelled request, giving back its request slot and tokens if it was already granted
+        :param waiter: waiter of the cancelled request
+        """
+        with self._lock:
+            waiter.cancelled = True
+            if not waiter.granted:
+                return
+            if self.request_bucket:
+                self.request_bucket.adjust(-1)
+            if self.token_bucket:
+                self.token_bucket.adjust(-waiter.tokens)
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """
+        Starts waiting requests in priority order while both buckets allow, and sets a timer for the next one.
+        Must be called with lock held
+        """
+        while self._waiters:
+            _, _, waiter = self._waiters[0]
+            if waiter.cancelled:
+                heapq.heappop(self._waiters)
+                continue
+
+            now = time.monotonic()
+            wait = max(self.request_bucket.wait_time(1, now) if self.request_bucket else 0.0,
+                       self.token_bucket.wait_time(waiter.tokens, now) if self.token_bucket else 0.0)
+            if wait > 0:
+                self._set_timer(wait)
+                return
+
+            heapq.heappop(self._waiters)
+            if self.request_bucket:
+                self.request_bucket.consume(1, now)
+            if self.token_bucket:
+                self.token_bucket.consume(waiter.tokens, now)
+            waiter.granted = True
+            waiter.notify()
+
+    def _set_timer(self, wait: float) -> None:
+        """
+        Schedules dispatch after wait unless an earlier dispatch is scheduled. Must be called with lock held
+        :param wait: time in seconds until the head of the queue can start
+        """
+        due = time.monotonic() + wait
+        if self._timer is not None and self._timer_due <= due:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+
+        self._timer = threading.Timer(wait, self._on_timer)
+        self._timer.daemon = True
+        self._timer_due = due
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _get_retry_delay(self, error: Exception, attempt: int) -> float | None:
+        """
+        Gets backoff before retrying failed request, honoring Retry-After of rate limit responses
+        :param error: request error
+        :param attempt: number of the failed attempt, starting at 0
+        :return: delay in seconds, or None if error is not transient or retries are exhausted
+        """
+        if attempt >= self.max_retries or not is_transient_error(error):
+            return None
+
+        with self._lock:
+            self._retries += 1
+            delay = self._random.uniform(0.0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** attempt))
+        delay = max(delay, min(self.max_delay_seconds, get_retry_after(error) or 0.0))
+
+        tracing.add_to_attribute("retries", 1)
+        logger.warning(f"Transient LLM error {type(error).__name__}, retry {attempt + 1} of {self.max_retries} "
+                       f"in {delay:.2f}s: {error}")
+        return delay
+
+    def _count_completion_tokens(self, result, count_tokens: Callable) -> int:
+        return count_tokens(result) if count_tokens else self.expected_completion_tokens
+
+    def _settle(self, tokens: int, used_tokens: int) -> None:
+        """
+        Returns unused reserved tokens, or takes extra ones if completion was longer than expected
+        :param tokens: number of reserved tokens
+        :param used_tokens: number of prompt and completion tokens used
+        """
+        with self._lock:
+            if self.token_bucket is not None:
+                self.token_bucket.adjust(used_tokens - tokens)
+                self._dispatch()
+            self._tokens += used_tokens
+        self._record_end(failed=False)
+
+    def _release(self, tokens: int) -> None:
+        """
+        Gives back token reservation of a failed attempt, a retry reserves tokens again
+        :param tokens: number of reserved tokens
+        """
+        if self.token_bucket is None:
+            return
+        with self._lock:
+            self.token_bucket.adjust(-tokens)
+            self._dispatch()
+
+    def _record_start(self, priority: int, queue_wait: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._first_start is None:
+                self._first_start = now - queue_wait
+            waits = self._queue_waits[priority]
+            waits[0] += 1
+            waits[1] += queue_wait
+            waits[2] = max(waits[2], queue_wait)
+        tracing.add_to_attribute("queue_wait_seconds", queue_wait)
+
+    def _record_end(self, failed: bool) -> None:
+        with self._lock:
+            self._last_end = time.monotonic()
+            if failed:
+                self._failures += 1
+            else:
+                self._requests += 1
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Checks if request error is worth retrying, like rate limits, timeouts and server errors
+    :param error: request error
+    :return: True if error is transient
+    """
+    if isinstance(error, (StubBackendError, TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, "status_code", None) in TRANSIENT_STATUS_CODES:
+        return True
+    return any(error_type.__name__ in TRANSIENT_ERROR_NAMES for error_type in type(error).__mro__)
+
+
+def get_retry_after(error: Exception) -> float | None:
+    """
+    Gets Retry-After of rate limit response attached to request error
+    :param error: request error
+    :return: delay in seconds or None if response has no numeric Retry-After header
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _set_granted(granted: asyncio.Future) -> None:
+    if not granted.done():
+        granted.set_result(None)
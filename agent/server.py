@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agent.batch import STATUS_SUCCESS
+from agent.job_queue import JobQueue, QueueFullError, DEFAULT_WORKERS, DEFAULT_MAX_QUEUE_DEPTH
+from agent.nodes import CLIENT_FACTORIES, get_client, get_llm_client, get_file_ranker, get_request_scheduler, \
+    get_response_cache, get_summary_cache
+from agent.tracing import SummaryExporter
+
+MAX_REQUEST_BYTES = 64 * 1024
+SHUTDOWN_TIMEOUT_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    server: "JobServer"
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        raw_content_length = (self.headers.get("Content-Length") or "0").strip()
+        if not (raw_content_length.isascii() and raw_content_length.isdigit()):
+            self.close_connection = True
+            self._send_json(400, {"error": "Invalid Content-Length"})
+            return
+        content_length = int(raw_content_length)
+        if content_length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": "Request too large"})
+            return
+        try:
+            repo_url = json.loads(self.rfile.read(content_length) or b"{}").get("repo_url")
+        except (ValueError, AttributeError):
+            repo_url = None
+        if not isinstance(repo_url, str) or not repo_url.strip():
+            self._send_json(400, {"error": "Expected JSON body with repo_url"})
+            return
+
+        try:
+            job = self.server.job_queue.submit(repo_url.strip())
+        except QueueFullError as e:
+            self._send_json(429, {"error": str(e)})
+            return
+        self._send_json(202, job)
+
+    def do_GET(self) -> None:
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if parts == ["health"]:
+            self._send_json(200, {"status": "ok"})
+        elif parts == ["metrics"]:
+            self._send_json(200, self.server.get_metrics())
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.server.job_queue.get(parts[1])
+            if job is None:
+                self._send_json(404, {"error": "Unknown job"})
+            else:
+                self._send_json(200, job)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "readme":
+            self._send_readme(parts[1])
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def log_message(self, format: str, *args) -> None:
+        logger.info(f"{self.address_string()} {format % args}")
+
+    def _send_readme(self, job_id: str) -> None:
+        job = self.server.job_queue.get(job_id)
+        if job is None:
+            self._send_json(404, {"error": "Unknown job"})
+            return
+        if job["status"] != STATUS_SUCCESS:
+            self._send_json(409, {"error": f"Job is {job['status']}"})
+            return
+
+        try:
+            with open(job["result"]["readme_path"], "rb") as file:
+                content = file.read()
+        except OSError as e:
+            self._send_json(410, {"error": f"README is not available: {e}"})
+            return
+        self._send(200, content, "text/markdown; charset=utf-8")
+
+    def _send_json(self, status: int, body: dict) -> None:
+        self._send(status, json.dumps(body).encode("utf-8"), "application/json")
+
+    def _send(self, status: int, content: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class JobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, job_queue: JobQueue, host: str, port: int, span_summary: SummaryExporter = None):
+        super().__init__((host, port), JobRequestHandler)
+        self.job_queue = job_queue
+        self.span_summary = span_summary
+
+    def get_metrics(self) -> dict:
+        """
+        Gets job queue metrics with LLM request, cache, file ranker and span statistics of all jobs so far
+        :return: metrics
+        """
+        metrics = {"queue": self.job_queue.stats(), "llm_requests": get_request_scheduler().stats()}
+        file_ranker = get_file_ranker()
+        if file_ranker is not None:
+            metrics["file_ranker"] = file_ranker.stats()
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            metrics["response_cache"] = response_cache.stats()
+        summary_cache = get_summary_cache()
+        if summary_cache is not None:
+            metrics["summary_cache"] = summary_cache.stats()
+        if self.span_summary is not None:
+            metrics["spans"] = self.span_summary.stats()
+        return metrics
+
+
+def warm_up() -> None:
+    """
+    Creates shared clients, caches and tokenizer before the first job, so that jobs do not pay for them
+    """
+    start = time.perf_counter()
+    for name in CLIENT_FACTORIES:
+        get_client(name)
+    get_llm_client().get_token_counter()
+    logger.info(f"Clients warmed up in {time.perf_counter() - start:.2f}s")
+
+
+def serve(graph, host: str, port: int, workers: int = DEFAULT_WORKERS,
+          max_queue_depth: int = DEFAULT_MAX_QUEUE_DEPTH, span_summary: SummaryExporter = None) -> None:
+    """
+    Serves README jobs over HTTP until interrupted, running them on warm workers that share the compiled graph
+    :param graph: compiled graph shared between jobs
+    :param host: host to bind
+    :param port: port to bind, 0 for any free port
+    :param workers: number of jobs run concurrently
+    :param max_queue_depth: max number of jobs waiting for a worker before new jobs are rejected
+    :param span_summary: optional span summary exporter included in metrics
+    """
+    warm_up()
+    job_queue = JobQueue(graph, workers=workers, max_queue_depth=max_queue_depth)
+    job_queue.start()
+    server = JobServer(job_queue, host=host, port=port, span_summary=span_summary)
+    logger.info(f"Serving README jobs on http://{host}:{server.server_port} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping server")
+    finally:
+        server.server_close()
+        job_queue.stop(timeout=SHUTDOWN_TIMEOUT_SECONDS, cancel_pending=True)
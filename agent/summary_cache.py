@@ -0,0 +1,42 @@
+import hashlib
+import json
+
+from agent.llm_cache import LLMResponseCache
+
+SUMMARY_TTL_SECONDS = 90 * 24 * 60 * 60
+SUMMARY_MAX_ENTRIES = 200_000
+
+
+class FileSummaryCache(LLMResponseCache):
+    def __init__(self, path: str, ttl_seconds: float = SUMMARY_TTL_SECONDS, max_entries: int = SUMMARY_MAX_ENTRIES,
+                 bypass: bool = False):
+        super().__init__(path=path, ttl_seconds=ttl_seconds, max_entries=max_entries, bypass=bypass)
+
+    @staticmethod
+    def make_summary_key(blob_sha: str, rel_path: str, model_name: str, prompt_template: str) -> str:
+        """
+        Builds content-addressed key of file summary
+        :param blob_sha: git blob SHA of the file
+        :param rel_path: repo relative file path, since the summary prompt names the file
+        :param model_name: LLM model name
+        :param prompt_template: summary prompt template, so that prompt changes invalidate summaries
+        :return: cache key
+        """
+        template_hash = hashlib.sha256(prompt_template.encode("utf-8")).hexdigest()
+        return hashlib.sha256(json.dumps([blob_sha, rel_path, model_name, template_hash]).encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Gets cached summaries of many files
+        :param keys: list of cache keys
+        :return: dict of cache key to summary for hits
+        """
+        return {key: summary for key in keys if (summary := self.get(key)) is not None}
+
+    def set_many(self, summaries: dict) -> None:
+        """
+        Stores summaries of many files
+        :param summaries: dict of cache key to summary
+        """
+        for key, summary in summaries.items():
+            self.set(key, summary)
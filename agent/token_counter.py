@@ -0,0 +1,112 @@
+import hashlib
+import threading
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tiktoken
+
+CACHE_SIZE = 100_000
+ENCODE_THREADS = 8
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str) -> "tiktoken.Encoding":
+    """
+    Gets tokenizer encoding of the model, loaded once per process, importing tiktoken on first use
+    :param model_name: LLM model name
+    :return: tiktoken encoding
+    """
+    import tiktoken
+
+    return tiktoken.encoding_for_model(model_name)
+
+
+class ApproximateEncoding:
+    """
+    Encoding without tokenizer data that splits text into tokens of fixed number of characters,
+    estimating token counts for offline backends
+    """
+
+    def __init__(self, chars_per_token: int = CHARS_PER_TOKEN):
+        self.chars_per_token = chars_per_token
+
+    def encode(self, text: str, disallowed_special=()) -> list:
+        return [text[index:index + self.chars_per_token] for index in range(0, len(text), self.chars_per_token)]
+
+    def encode_batch(self, texts: list, num_threads: int = 1, disallowed_special=()) -> list:
+        return [self.encode(text) for text in texts]
+
+    def decode(self, tokens: list) -> str:
+        return "".join(tokens)
+
+
+class TokenCounter:
+    def __init__(self, encoding: "tiktoken.Encoding", cache_size: int = CACHE_SIZE,
+                 num_threads: int = ENCODE_THREADS):
+        self.encoding = encoding
+        self.cache_size = cache_size
+        self.num_threads = num_threads
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        """
+        Counts tokens in text, memoized by content hash
+        :param text: text to count
+        :return: number of tokens
+        """
+        return self.count_many([text])[0]
+
+    def count_many(self, texts: list) -> list:
+        """
+        Counts tokens of many texts, encoding cache misses in one multithreaded batch
+        :param texts: list of texts
+        :return: list of token counts in order of texts
+        """
+        keys = [self._key(text) for text in texts]
+        counts = {}
+        missing = {}
+
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in self._counts:
+                    self._counts.move_to_end(key)
+                    counts[key] = self._counts[key]
+                else:
+                    missing[key] = text
+
+        if missing:
+            encoded = self.encoding.encode_batch(list(missing.values()), num_threads=self.num_threads,
+                                                 disallowed_special=())
+            with self._lock:
+                for key, tokens in zip(missing, encoded):
+                    counts[key] = len(tokens)
+                    self._counts[key] = len(tokens)
+                while len(self._counts) > self.cache_size:
+                    self._counts.popitem(last=False)
+
+        return [counts[key] for key in keys]
+
+    def encode(self, text: str) -> list:
+        """
+        Encodes text into tokens, treating special tokens as plain text
+        :param text: text to encode
+        :return: list of tokens
+        """
+        return self.encoding.encode(text, disallowed_special=())
+
+    def decode(self, tokens: list) -> str:
+        """
+        Decodes tokens into text
+        :param tokens: list of tokens
+        :return: decoded text
+        """
+        return self.encoding.decode(tokens)
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
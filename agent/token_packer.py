@@ -0,0 +1,141 @@
+import logging
+
+from dataclasses import dataclass, field
+from typing import Callable
+from agent.file_utils import read_file, format_file_content, iter_capped_files, TRUNCATION_MARKER
+from agent.token_counter import TokenCounter
+
+MIN_TRUNCATED_TOKENS = 200
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+@dataclass
+class PackResult:
+    file_contents: list = field(default_factory=list)
+    token_count: int = 0
+    truncated_file_paths: list = field(default_factory=list)
+    dropped_file_paths: list = field(default_factory=list)
+
+
+def pack_files(file_paths: list, token_budget: int, token_counter: TokenCounter,
+               file_reader: Callable = read_file, file_token_counts: dict = None) -> PackResult:
+    """
+    Greedily packs files content into token budget, truncating files that do not fit
+    :param file_paths: list of absolute file paths, most important first
+    :param token_budget: max number of tokens for merged content
+    :param token_counter: token counter of the model
+    :param file_reader: function reading file content by path, like read_file
+    :param file_token_counts: optional dict of file path to framed token count from count_file_tokens,
+        reused unless a file is missing or was cut by character limits
+    :return: packed files content with report of truncated and dropped files
+    """
+    file_contents = list(iter_capped_files(file_paths, file_reader=file_reader))
+
+    token_counts = None
+    if file_token_counts is not None and all(path in file_token_counts and not content.endswith(TRUNCATION_MARKER)
+                                             for path, content in file_contents):
+        token_counts = [file_token_counts[path] for path, _ in file_contents]
+    return pack_contents(file_contents=file_contents, token_budget=token_budget, token_counter=token_counter,
+                         token_counts=token_counts)
+
+
+def pack_contents(file_contents: list, token_budget: int, token_counter: TokenCounter,
+                  token_counts: list = None) -> PackResult:
+    """
+    Greedily packs already read contents into token budget, truncating contents that do not fit
+    :param file_contents: list of (file path, content) tuples, most important first
+    :param token_budget: max number of tokens for merged content
+    :param token_counter: token counter of the model
+    :param token_counts: optional framed token counts of contents if already counted
+    :return: packed contents with report of truncated and dropped files
+    """
+    result = PackResult()
+    if token_counts is None:
+        token_counts = token_counter.count_many([format_file_content(path, content)
+                                                 for path, content in file_contents])
+
+    for (path, content), token_count in zip(file_contents, token_counts):
+        remaining = token_budget - result.token_count
+
+        if token_count <= remaining:
+            result.file_contents.append((path, content))
+            result.token_count += token_count
+            continue
+
+        truncated = _truncate_content(path, content, remaining, token_counter) \
+            if remaining >= MIN_TRUNCATED_TOKENS else None
+        if truncated is None:
+            result.dropped_file_paths.append(path)
+            continue
+
+        truncated_content, token_count = truncated
+        result.file_contents.append((path, truncated_content))
+        result.token_count += token_count
+        result.truncated_file_paths.append(path)
+
+    if result.truncated_file_paths or result.dropped_file_paths:
+        logger.warning(f"Files do not fit token budget of {token_budget}: "
+                       f"truncated {result.truncated_file_paths}, dropped {result.dropped_file_paths}")
+
+    return result
+
+
+def count_file_tokens(file_paths: list, token_counter: TokenCounter, file_reader: Callable = read_file) -> list:
+    """
+    Counts tokens of framed content per file
+    :param file_paths: list of absolute file paths
+    :param token_counter: token counter of the model
+    :param file_reader: function reading file content by path, like read_file
+    :return: list of (file path, token count) tuples for readable files within character limits
+    """
+    file_contents = list(iter_capped_files(file_paths, file_reader=file_reader))
+
+    token_counts = token_counter.count_many([format_file_content(path, content) for path, content in file_contents])
+    return [(path, token_count) for (path, _), token_count in zip(file_contents, token_counts)]
+
+
+def split_into_chunks(file_token_counts: list, token_budget: int) -> list:
+    """
+    Splits files into consecutive chunks that fit token budget, a file larger than budget forms its own chunk
+    :param file_token_counts: list of (file path, token count) tuples
+    :param token_budget: max number of tokens per chunk
+    :return: list of chunks, each a list of file paths
+    """
+    chunks = []
+    chunk, chunk_token_count = [], 0
+
+    for path, token_count in file_token_counts:
+        if chunk and chunk_token_count + token_count > token_budget:
+            chunks.append(chunk)
+            chunk, chunk_token_count = [], 0
+        chunk.append(path)
+        chunk_token_count += token_count
+
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _truncate_content(path: str, content: str, token_budget: int, token_counter: TokenCounter) -> tuple | None:
+    """
+    Truncates file content so that framed content fits token budget
+    :param path: absolute file path
+    :param content: file content
+    :param token_budget: max number of tokens for framed content
+    :param token_counter: token counter of the model
+    :return: tuple of truncated content and its framed token count, or None if nothing fits
+    """
+    content_tokens = token_counter.encode(content)
+    overhead = token_counter.count(format_file_content(path, TRUNCATION_MARKER))
+    keep = token_budget - overhead
+
+    while keep > 0:
+        truncated_content = token_counter.decode(content_tokens[:keep]) + TRUNCATION_MARKER
+        token_count = token_counter.count(format_file_content(path, truncated_content))
+        if token_count <= token_budget:
+            return truncated_content, token_count
+        keep -= token_count - token_budget
+
+    return None
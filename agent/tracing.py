@@ -0,0 +1,309 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+
+RUN_SPAN_NAME = "run"
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+@dataclass
+class Span:
+    name: str
+    run_id: str | None
+    span_id: str
+    parent_id: str | None
+    start_time: float
+    wall_seconds: float = 0.0
+    cpu_seconds: float | None = None
+    attributes: dict = field(default_factory=dict)
+
+    def set(self, **attributes) -> None:
+        """
+        Sets span attributes, overwriting previous values
+        :param attributes: attributes by name, like file_count=10
+        """
+        self.attributes.update(attributes)
+
+    def add(self, name: str, amount: int | float) -> None:
+        """
+        Adds amount to a numeric span attribute
+        :param name: attribute name, like chars_read
+        :param amount: amount to add
+        """
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, spans: list) -> None:
+        """
+        Exports finished spans of one run, or a single span recorded outside any run
+        :param spans: list of spans, the run span last
+        """
+
+    def close(self) -> None:
+        """
+        Releases exporter resources
+        """
+
+
+class JsonLinesExporter(SpanExporter):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: list) -> None:
+        """
+        Appends spans as JSON objects, one per line
+        :param spans: list of spans
+        """
+        lines = "".join(json.dumps(asdict(span), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+
+class SummaryExporter(SpanExporter):
+    def __init__(self):
+        self.runs = 0
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def export(self, spans: list) -> None:
+        """
+        Aggregates span count, wall and CPU time and numeric attributes by span name
+        :param spans: list of spans
+        """
+        with self._lock:
+            for span in spans:
+                if span.name == RUN_SPAN_NAME:
+                    self.runs += 1
+                totals = self._totals.setdefault(span.name, {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+                totals["count"] += 1
+                totals["wall_seconds"] += span.wall_seconds
+                totals["cpu_seconds"] += span.cpu_seconds or 0.0
+                for name, value in span.attributes.items():
+                    if isinstance(value, (int, float)):
+                        totals[name] = totals.get(name, 0) + value
+
+    def stats(self) -> dict:
+        """
+        Gets aggregated span totals of all exported runs
+        :return: dict of span name to totals, rounded for reports
+        """
+        with self._lock:
+            return {name: {key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()}
+                    for name, totals in sorted(self._totals.items())}
+
+    def format_table(self) -> str:
+        """
+        Formats aggregated span totals as a text table
+        :return: table with one row per span name
+        """
+        lines = [f"{'span':<32}{'count':>7}{'wall s':>10}{'cpu s':>10}  attributes"]
+        for name, totals in self.stats().items():
+            attributes = ", ".join(f"{key}={value}" for key, value in totals.items()
+                                   if key not in ("count", "wall_seconds", "cpu_seconds"))
+            lines.append(f"{name:<32}{totals['count']:>7}{totals['wall_seconds']:>10.3f}"
+                         f"{totals['cpu_seconds']:>10.3f}  {attributes}")
+        return "\n".join(lines)
+
+
+class _Run:
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+_exporters = []
+_exporters_lock = threading.Lock()
+_current_run = contextvars.ContextVar("current_run", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def add_exporter(exporter: SpanExporter) -> None:
+    """
+    Adds exporter that receives spans of every finished run
+    :param exporter: span exporter
+    """
+    with _exporters_lock:
+        _exporters.append(exporter)
+
+
+def remove_exporter(exporter: SpanExporter) -> None:
+    """
+    Removes exporter and closes it
+    :param exporter: span exporter added before
+    """
+    with _exporters_lock:
+        _exporters.remove(exporter)
+    exporter.close()
+
+
+def is_recording() -> bool:
+    """
+    Checks if spans are recorded, so that callers can skip measurements that cost time
+    :return: True inside a run or if any exporter is added
+    """
+    return _current_run.get() is not None or bool(_exporters)
+
+
+def current_span() -> Span | None:
+    """
+    Gets innermost span of the current context
+    :return: span or None if nothing is recorded
+    """
+    return _current_span.get()
+
+
+def set_attributes(**attributes) -> None:
+    """
+    Sets attributes of the current span if there is one
+    :param attributes: attributes by name
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def add_to_attribute(name: str, amount: int | float) -> None:
+    """
+    Adds amount to numeric attribute of the current span if there is one
+    :param name: attribute name
+    :param amount: amount to add
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.add(name, amount)
+
+
+@contextmanager
+def run(measure_cpu: bool = True, **attributes):
+    """
+    Records spans of one graph run and exports them together when the run finishes
+    :param measure_cpu: measure CPU time of the run span, off for runs sharing an event loop
+    :param attributes: run attributes, like repo_url
+    :return: context manager yielding the run span
+    """
+    recorded_run = _Run(run_id=uuid.uuid4().hex)
+    run_token = _current_run.set(recorded_run)
+    try:
+        with span(RUN_SPAN_NAME, measure_cpu=measure_cpu, **attributes) as run_span:
+            yield run_span
+    finally:
+        _current_run.reset(run_token)
+        _export(recorded_run.spans)
+
+
+@contextmanager
+def span(name: str, measure_cpu: bool = True, **attributes):
+    """
+    Records wall time, CPU time of the current thread and attributes of a block
+    :param name: span name, like llm.invoke
+    :param measure_cpu: measure CPU time, off for async blocks whose thread runs other coroutines in between
+    :param attributes: initial attributes
+    :return: context manager yielding the span, or None if nothing is recorded
+    """
+    with _record_span(name, attributes, measure_cpu=measure_cpu) as recorded_span:
+        yield recorded_span
+
+
+def traced(name: str):
+    """
+    Decorates sync or async function to run in a span, async spans leave CPU time unset
+    :param name: span name
+    :return: decorator
+    """
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, measure_cpu=False):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def in_current_context(function):
+    """
+    Wraps function to run in a copy of the current context, so that spans created in executor threads
+    belong to the current run and span
+    :param function: function submitted to an executor
+    :return: wrapped function
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(function, *args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def _record_span(name: str, attributes: dict, measure_cpu: bool):
+    """
+    Records span and adds it to the current run, or exports it right away outside any run
+    :param name: span name
+    :param attributes: initial attributes
+    :param measure_cpu: measure CPU time of the current thread
+    :return: context manager yielding the span, or None if nothing is recorded
+    """
+    if not is_recording():
+        yield None
+        return
+
+    recorded_run = _current_run.get()
+    parent = _current_span.get()
+    recorded_span = Span(name=name, run_id=recorded_run.run_id if recorded_run else None,
+                         span_id=uuid.uuid4().hex[:16], parent_id=parent.span_id if parent else None,
+                         start_time=time.time(), attributes=attributes)
+    span_token = _current_span.set(recorded_span)
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield recorded_span
+    except BaseException as e:
+        recorded_span.set(error=type(e).__name__)
+        raise
+    finally:
+        recorded_span.wall_seconds = time.perf_counter() - start
+        if measure_cpu:
+            recorded_span.cpu_seconds = time.thread_time() - cpu_start
+        _current_span.reset(span_token)
+        if recorded_run is not None:
+            with recorded_run.lock:
+                recorded_run.spans.append(recorded_span)
+        else:
+            _export([recorded_span])
+
+
+def _export(spans: list) -> None:
+    """
+    Exports spans to all exporters, logging exporter errors instead of failing the run
+    :param spans: list of spans
+    """
+    with _exporters_lock:
+        exporters = list(_exporters)
+
+    for exporter in exporters:
+        try:
+            exporter.export(spans)
+        except Exception as e:
+            logger.error(f"Error exporting spans with {type(exporter).__name__}: {e}")
@@ -0,0 +1,218 @@
+import os
+
+from collections import Counter
+from agent.token_counter import TokenCounter
+
+DETAIL_LEVELS = (
+    (None, None), (50, None), (20, None), (10, None), (10, 6), (10, 4), (10, 3), (5, 3), (5, 2), (5, 1), (5, 0),
+    (2, 0), (0, 0),
+)
+SUMMARY_EXTENSION_COUNT = 3
+
+
+class _TreeNode:
+    __slots__ = ("dirs", "files", "file_count")
+
+    def __init__(self):
+        self.dirs = {}
+        self.files = []
+        self.file_count = 0
+
+
+def encode_file_tree(rel_paths: list, sizes: dict = None, max_files_per_dir: int = None,
+                     max_depth: int = None) -> str:
+    """
+    Encodes relative file paths as indented tree, one space per level, with single child directories collapsed
+    :param rel_paths: list of relative file paths
+    :param sizes: optional dict of relative file path to size in bytes, shown as size hints
+    :param max_files_per_dir: max number of files listed per directory, the rest is summarized as counts
+    :param max_depth: max depth of listed directories, deeper subtrees are summarized as counts
+    :return: encoded file tree
+    """
+    lines = []
+    _encode_node(_build_tree(rel_paths), "", "", 0, lines, sizes, max_files_per_dir, max_depth)
+    return "\n".join(lines)
+
+
+def fit_file_tree(rel_paths: list, token_budget: int, token_counter: TokenCounter, sizes: dict = None) -> tuple:
+    """
+    Encodes file tree in the most detailed form that fits token budget, dropping size hints first,
+    then listing fewer files per directory and summarizing deeper subtrees as counts
+    :param rel_paths: list of relative file paths
+    :param token_budget: max number of tokens for encoded tree
+    :param token_counter: token counter of the model
+    :param sizes: optional dict of relative file path to size in bytes
+    :return: tuple of encoded file tree and its token count
+    """
+    tree = _build_tree(rel_paths)
+    levels = [(sizes, None, None)] if sizes else []
+    levels += [(None, max_files_per_dir, max_depth) for max_files_per_dir, max_depth in DETAIL_LEVELS]
+
+    listing, token_count = "", 0
+    for level_sizes, max_files_per_dir, max_depth in levels:
+        lines = []
+        _encode_node(tree, "", "", 0, lines, level_sizes, max_files_per_dir, max_depth)
+        listing = "\n".join(lines)
+        token_count = token_counter.count(listing)
+        if token_count <= token_budget:
+            break
+
+    return listing, token_count
+
+
+def partition_file_tree(rel_paths: list, token_budget: int, token_counter: TokenCounter, sizes: dict = None) -> list:
+    """
+    Partitions file tree by directory into listings that each fit token budget, splitting directories that do not
+    fit into their subdirectories and merging neighbouring small directories into one listing
+    :param rel_paths: list of relative file paths
+    :param token_budget: max number of tokens per listing
+    :param token_counter: token counter of the model
+    :param sizes: optional dict of relative file path to size in bytes
+    :return: list of (encoded file tree, token count) tuples, a single file that does not fit forms its own listing
+    """
+    chunks = []
+    chunk_groups, chunk_token_count = [], 0
+
+    for group, token_count in _split_paths(sorted(rel_paths), 0, token_budget, token_counter, sizes):
+        if chunk_groups and chunk_token_count + token_count > token_budget:
+            chunks += _encode_chunk(chunk_groups, token_budget, token_counter, sizes)
+            chunk_groups, chunk_token_count = [], 0
+        chunk_groups.append(group)
+        chunk_token_count += token_count
+
+    if chunk_groups:
+        chunks += _encode_chunk(chunk_groups, token_budget, token_counter, sizes)
+    return chunks
+
+
+def format_size(size: int) -> str:
+    """
+    Formats file size as short size hint
+    :param size: size in bytes
+    :return: size hint like 512B, 4K or 2M
+    """
+    if size < 1024:
+        return f"{size}B"
+    if size < 1024 ** 2:
+        return f"{size // 1024}K"
+    return f"{size // 1024 ** 2}M"
+
+
+def _build_tree(rel_paths: list) -> _TreeNode:
+    root = _TreeNode()
+    for rel_path in rel_paths:
+        node = root
+        node.file_count += 1
+        *dir_names, file_name = rel_path.split("/")
+        for dir_name in dir_names:
+            child = node.dirs.get(dir_name)
+            if child is None:
+                child = node.dirs[dir_name] = _TreeNode()
+            node = child
+            node.file_count += 1
+        node.files.append(file_name)
+    return root
+
+
+def _encode_node(node: _TreeNode, prefix: str, indent: str, depth: int, lines: list, sizes: dict,
+                 max_files_per_dir: int, max_depth: int) -> None:
+    """
+    Appends lines of directory files and subdirectories
+    :param node: directory node
+    :param prefix: relative path of the directory with trailing slash, empty for root
+    :param indent: indentation of directory entries
+    :param depth: depth of the directory
+    :param lines: list of output lines
+    :param sizes: optional dict of relative file path to size in bytes
+    :param max_files_per_dir: max number of files listed per directory
+    :param max_depth: max depth of listed directories
+    """
+    files = sorted(node.files)
+    listed_files = files if max_files_per_dir is None else files[:max_files_per_dir]
+    for file_name in listed_files:
+        size = sizes.get(prefix + file_name) if sizes else None
+        lines.append(f"{indent}{file_name} {format_size(size)}" if size is not None else f"{indent}{file_name}")
+    if len(listed_files) < len(files):
+        lines.append(f"{indent}{_summarize_files(files[len(listed_files):], more=bool(listed_files))}")
+
+    for dir_name in sorted(node.dirs):
+        child = node.dirs[dir_name]
+        label = dir_name
+        while not child.files and len(child.dirs) == 1:
+            (child_name, child), = child.dirs.items()
+            label = f"{label}/{child_name}"
+
+        if max_depth is not None and depth >= max_depth:
+            lines.append(f"{indent}{label}/ [{child.file_count} files]")
+            continue
+
+        lines.append(f"{indent}{label}/")
+        _encode_node(child, f"{prefix}{label}/", indent + " ", depth + 1, lines, sizes, max_files_per_dir, max_depth)
+
+
+def _summarize_files(file_names: list, more: bool) -> str:
+    """
+    Summarizes files as counts by extension
+    :param file_names: list of file names
+    :param more: files are listed before the summary
+    :return: summary like [+120 more: 100 .py, 20 .json]
+    """
+    extension_counts = Counter(os.path.splitext(file_name)[1] or file_name for file_name in file_names)
+    top_extensions = ", ".join(f"{count} {extension}"
+                               for extension, count in extension_counts.most_common(SUMMARY_EXTENSION_COUNT))
+    if len(extension_counts) > SUMMARY_EXTENSION_COUNT:
+        top_extensions += ", ..."
+    return f"[{'+' if more else ''}{len(file_names)} {'more' if more else 'files'}: {top_extensions}]"
+
+
+def _split_paths(rel_paths: list, depth: int, token_budget: int, token_counter: TokenCounter, sizes: dict) -> list:
+    """
+    Splits sorted relative paths into groups whose encoded trees fit token budget
+    :param rel_paths: sorted list of relative file paths sharing directories up to depth
+    :param depth: depth of the directory the paths are grouped by
+    :param token_budget: max number of tokens per group
+    :param token_counter: token counter of the model
+    :param sizes: optional dict of relative file path to size in bytes
+    :return: list of (relative file paths, token count) tuples, in order
+    """
+    token_count = token_counter.count(encode_file_tree(rel_paths, sizes=sizes))
+    if token_count <= token_budget or len(rel_paths) <= 1:
+        return [(rel_paths, token_count)]
+
+    files, dirs = [], {}
+    for rel_path in rel_paths:
+        parts = rel_path.split("/", depth + 1)
+        if len(parts) <= depth + 1:
+            files.append(rel_path)
+        else:
+            dirs.setdefault(parts[depth], []).append(rel_path)
+
+    if not dirs:
+        middle = len(files) // 2
+        return _split_paths(files[:middle], depth, token_budget, token_counter, sizes) + \
+            _split_paths(files[middle:], depth, token_budget, token_counter, sizes)
+
+    groups = _split_paths(files, depth, token_budget, token_counter, sizes) if files else []
+    for dir_paths in dirs.values():
+        groups += _split_paths(dir_paths, depth + 1, token_budget, token_counter, sizes)
+    return groups
+
+
+def _encode_chunk(groups: list, token_budget: int, token_counter: TokenCounter, sizes: dict) -> list:
+    """
+    Encodes merged groups as one listing, halving them in the rare case that shared directory lines and
+    indentation make the merged tree larger than the sum of its groups
+    :param groups: list of groups of relative file paths
+    :param token_budget: max number of tokens per listing
+    :param token_counter: token counter of the model
+    :param sizes: optional dict of relative file path to size in bytes
+    :return: list of (encoded file tree, token count) tuples
+    """
+    listing = encode_file_tree([rel_path for group in groups for rel_path in group], sizes=sizes)
+    token_count = token_counter.count(listing)
+    if token_count <= token_budget or len(groups) == 1:
+        return [(listing, token_count)]
+
+    middle = len(groups) // 2
+    return _encode_chunk(groups[:middle], token_budget, token_counter, sizes) + \
+        _encode_chunk(groups[middle:], token_budget, token_counter, sizes)
@@ -0,0 +1,63 @@
+"""
+Compares clone time and bytes on disk for each GitHubClient clone mode.
+
+Usage: python -m benchmarks.bench_clone_modes --files 5000 --commits 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from agent.github_client import GitHubClient, CLONE_OPTIONS
+from benchmarks.synthetic_repo import create_bare_repo, directory_size
+
+SELECTED_FILE_COUNT = 10
+
+
+def bench_mode(clone_mode: str, repo_url: str, base_dir: str) -> dict:
+    """
+    Clones repo in provided mode and checks out a few selected files
+    :param clone_mode: clone mode name
+    :param repo_url: file url of the bare repo
+    :param base_dir: directory for clone targets
+    :return: benchmark result
+    """
+    client = GitHubClient(github_token="", clone_mode=clone_mode)
+    target_dir = os.path.join(base_dir, clone_mode)
+
+    start = time.perf_counter()
+    client._clone_from(repo_url, target_dir)
+    clone_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    file_paths = client.list_files(target_dir)
+    client.checkout_files(target_dir, file_paths[:SELECTED_FILE_COUNT])
+    checkout_seconds = time.perf_counter() - start
+
+    return {
+        "mode": clone_mode,
+        "clone_s": clone_seconds,
+        "list_checkout_s": checkout_seconds,
+        "bytes": directory_size(target_dir),
+        "files": len(file_paths),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000, help="Number of files in synthetic repo")
+    parser.add_argument("--commits", type=int, default=10, help="Number of commits in synthetic repo")
+    parser.add_argument("--file-size", type=int, default=4096, help="Approximate file size in bytes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        repo_url = create_bare_repo(base_dir, args.files, args.commits, args.file_size)
+        print(f"{'mode':<10}{'clone s':>10}{'list+co s':>12}{'MiB':>10}{'files':>8}")
+        for clone_mode in CLONE_OPTIONS:
+            result = bench_mode(clone_mode, repo_url, base_dir)
+            print(f"{result['mode']:<10}{result['clone_s']:>10.3f}{result['list_checkout_s']:>12.3f}"
+                  f"{result['bytes'] / 2 ** 20:>10.2f}{result['files']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares file listing before and after ignored directory pruning on a repo-shaped fixture.
+
+Usage: python -m benchmarks.bench_file_listing --packages 800
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from agent.file_utils import get_file_paths
+from agent.llm_client import MODEL_NAME
+from agent.prompts import get_essential_files_prompt_template
+from agent.repo_index import index_repo
+from agent.token_counter import get_encoding
+
+
+def get_file_paths_unpruned(repo_path: str) -> list:
+    """
+    Previous implementation, kept as baseline: prunes only .git
+    :param repo_path: path of the repo
+    :return: list of file paths
+    """
+    file_paths = set()
+    for root, dirs, files in os.walk(repo_path):
+        if '.git' in dirs:
+            dirs.remove('.git')
+        for file in files:
+            if not file == '.gitignore':
+                file_paths.add(os.path.join(root, file))
+    return sorted(file_paths)
+
+
+def write_files(base_dir: str, relative_paths) -> None:
+    """
+    Writes small files, creating parent directories
+    :param base_dir: root directory
+    :param relative_paths: iterable of relative file paths
+    """
+    for relative_path in relative_paths:
+        path = os.path.join(base_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("// synthetic\n")
+
+
+def create_fixture(base_dir: str, packages: int) -> None:
+    """
+    Creates web app shaped repo with committed dependencies, build output and virtualenv
+    :param base_dir: root directory of the fixture
+    :param packages: number of packages in node_modules
+    """
+    write_files(base_dir, [f"src/components/Component{index}.tsx" for index in range(150)])
+    write_files(base_dir, [f"src/api/endpoint{index}.ts" for index in range(50)])
+    write_files(base_dir, [f"server/app/module{index}.py" for index in range(80)])
+    write_files(base_dir, ["package.json", "README.md", "server/requirements.txt", "Dockerfile"])
+    write_files(base_dir, [f"node_modules/pkg{index}/lib/file{file}.js" for index in range(packages)
+                           for file in range(20)])
+    write_files(base_dir, [f"node_modules/pkg{index}/package.json" for index in range(packages)])
+    write_files(base_dir, [f"dist/assets/chunk{index}.min.js" for index in range(200)])
+    write_files(base_dir, [f"server/.venv/lib/python3.12/site-packages/dep{index // 30}/m{index}.py"
+                           for index in range(3000)])
+    write_files(base_dir, [f"server/vendor/lib{index}/x.py" for index in range(300)])
+    write_files(base_dir, [f"logs/run{index}.log" for index in range(100)])
+    with open(os.path.join(base_dir, ".gitignore"), "w", encoding="utf-8") as f:
+        f.write("logs/\n*.log\n.env\n")
+
+
+def measure(name: str, list_files, encoding) -> dict:
+    """
+    Measures listing time and size of the selection prompt it produces
+    :param name: implementation name
+    :param list_files: function returning list of file paths
+    :param encoding: tokenizer encoding or None if it cannot be loaded
+    :return: benchmark result
+    """
+    start = time.perf_counter()
+    file_paths = list_files()
+    seconds = time.perf_counter() - start
+
+    prompt = get_essential_files_prompt_template.format(files=[os.path.basename(path) for path in file_paths])
+    tokens = len(encoding.encode(prompt, disallowed_special=())) if encoding is not None else None
+    return {"name": name, "seconds": seconds, "files": len(file_paths), "chars": len(prompt), "tokens": tokens}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--packages", type=int, default=800, help="Number of packages in node_modules")
+    args = parser.parse_args()
+
+    try:
+        encoding = get_encoding(MODEL_NAME)
+    except Exception as e:
+        print(f"Token counts skipped, tokenizer cannot be loaded: {e}")
+        encoding = None
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        create_fixture(base_dir, args.packages)
+        results = [
+            measure("before", lambda: get_file_paths_unpruned(base_dir), encoding),
+            measure("get_file_paths", lambda: get_file_paths(base_dir), encoding),
+            measure("index_repo", lambda: [record.path for record in index_repo(base_dir)], encoding),
+        ]
+
+    print(f"{'implementation':<16}{'s':>10}{'files':>10}{'prompt chars':>14}{'tokens':>10}")
+    for result in results:
+        tokens = result["tokens"] if result["tokens"] is not None else "n/a"
+        print(f"{result['name']:<16}{result['seconds']:>10.3f}{result['files']:>10}{result['chars']:>14}{tokens:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Measures import graph build time on a synthetic Python repo, parsed in this process and in a process pool.
+
+Usage: python -m benchmarks.bench_import_graph --files 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from agent.import_graph import build_import_graph
+
+PACKAGE_COUNT = 200
+IMPORTS_PER_FILE = 4
+
+
+def create_python_repo(base_dir: str, file_count: int, seed: int = 0) -> list:
+    """
+    Creates synthetic Python packages whose modules import random other modules
+    :param base_dir: root directory of the repo
+    :param file_count: number of modules
+    :param seed: random seed
+    :return: list of relative file paths
+    """
+    rng = random.Random(seed)
+    modules = [(f"pkg{index % PACKAGE_COUNT}", f"mod{index}") for index in range(file_count)]
+
+    for package in {package for package, _ in modules}:
+        os.makedirs(os.path.join(base_dir, "src", package))
+
+    rel_paths = []
+    for package, module in modules:
+        imported = rng.sample(modules, min(IMPORTS_PER_FILE, file_count))
+        lines = [f"from {imported_package}.{imported_module} import run" for imported_package, imported_module
+                 in imported]
+        lines += ["import os", "", "def run():", "    return os.getcwd()", ""]
+        rel_path = f"src/{package}/{module}.py"
+        with open(os.path.join(base_dir, rel_path), "w", encoding="utf-8") as file:
+            file.write("\n".join(lines))
+        rel_paths.append(rel_path)
+    return rel_paths
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100_000, help="Number of Python modules")
+    parser.add_argument("--workers", type=int, default=None, help="Max number of parsing processes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        rel_paths = create_python_repo(base_dir, args.files)
+
+        print(f"{'parsing':<16}{'s':>10}{'files':>10}{'imports':>10}")
+        for name, max_workers in (("single process", 1), ("process pool", args.workers)):
+            start = time.perf_counter()
+            graph = build_import_graph(base_dir, rel_paths, max_workers=max_workers)
+            seconds = time.perf_counter() - start
+            print(f"{name:<16}{seconds:>10.3f}{len(graph.edges):>10}{sum(map(len, graph.edges.values())):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Compares reading and merging prompt files as the pipeline does, with iter_capped_files and merge_file_contents,
+against the previous string concatenation implementation.
+
+Usage: python -m benchmarks.bench_merge_files --files 200 --file-size 65536
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from agent.file_utils import iter_capped_files, merge_file_contents
+
+
+def merge_files_concat(file_paths: list) -> str:
+    """
+    Previous implementation, kept as baseline: reads every file fully and concatenates with +=
+    :param file_paths: list of absolute file paths
+    :return: merged file content
+    """
+    all_files_content = ""
+    for path in file_paths:
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                content = file.read()
+                filename = os.path.basename(path)
+                all_files_content += f"--- {filename} ---\n{content}\n\n"
+        except Exception:
+            pass
+    return all_files_content
+
+
+def merge_files_capped(file_paths: list) -> str:
+    """
+    Current prompt path: reads files up to per-file and overall caps and merges them with one join
+    :param file_paths: list of absolute file paths
+    :return: merged file content
+    """
+    return merge_file_contents(list(iter_capped_files(file_paths)))
+
+
+def create_files(base_dir: str, file_count: int, file_size: int, huge_file_size: int) -> list:
+    """
+    Creates text files of provided size, plus one huge generated file if requested
+    :param base_dir: directory for files
+    :param file_count: number of regular files
+    :param file_size: size of each regular file in characters
+    :param huge_file_size: size of the huge file in characters, 0 to skip
+    :return: list of file paths
+    """
+    line = "value = compute(value, 42)  # synthetic line\n"
+    sizes = [file_size] * file_count + ([huge_file_size] if huge_file_size else [])
+
+    file_paths = []
+    for index, size in enumerate(sizes):
+        path = os.path.join(base_dir, f"file{index}.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write((line * (size // len(line) + 1))[:size])
+        file_paths.append(path)
+    return file_paths
+
+
+def measure(merge, file_paths: list, repeat: int) -> dict:
+    """
+    Measures best wall time and peak traced memory of merge function
+    :param merge: merge function
+    :param file_paths: list of file paths
+    :param repeat: number of timed runs
+    :return: benchmark result
+    """
+    best_seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        merge(file_paths)
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = merge(file_paths)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": best_seconds, "peak_bytes": peak_bytes, "chars": len(result)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200, help="Number of regular files")
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="Size of each regular file in characters")
+    parser.add_argument("--huge-file-size", type=int, default=64 * 2 ** 20,
+                        help="Size of one generated huge file in characters, 0 to skip")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        file_paths = create_files(base_dir, args.files, args.file_size, args.huge_file_size)
+        print(f"{'implementation':<16}{'best s':>10}{'peak MiB':>12}{'chars':>14}")
+        for name, merge in [("concat", merge_files_concat), ("capped", merge_files_capped)]:
+            result = measure(merge, file_paths, args.repeat)
+            print(f"{name:<16}{result['seconds']:>10.3f}{result['peak_bytes'] / 2 ** 20:>12.2f}{result['chars']:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+Runs the full README pipeline on synthetic local repos of increasing size against the stub LLM backend,
+and reports per-stage timings, traced memory, peak RSS and tokens. Results are saved as JSON and can be compared
+with a saved baseline to catch regressions.
+
+Usage: python -m benchmarks.bench_pipeline --sizes 1000,10000,100000 --latency-ms 200 --jitter-ms 50 \
+           --output pipeline.json
+       python -m benchmarks.bench_pipeline --sizes 1000 --baseline pipeline.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from datetime import datetime, timezone
+from agent import tracing
+from agent.file_index import FileIndex
+from agent.file_utils import extract_file_names, merge_file_contents
+from agent.github_client import GitHubClient, CLONE_MODE_SHALLOW
+from agent.llm_backends import StubBackend, MODEL_NAME
+from agent.llm_client import LLMClient, INPUT_TOKEN_LIMIT
+from agent.nodes import create_initial_state, set_clients, PROMPT_SAFETY_MARGIN_TOKENS
+from agent.prompts import get_essential_files_prompt_template, generate_readme_prompt_template
+from agent.repo_index import index_repo, filter_records
+from agent.token_packer import pack_files, count_file_tokens
+from agent.token_counter import get_encoding
+from agent.tracing import SummaryExporter, RUN_SPAN_NAME
+from agent.tree_listing import fit_file_tree
+from benchmarks.synthetic_repo import create_project_repo, run_git
+from main import build_graph
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_LATENCY_MS = 200
+MAX_REGRESSION_RATIO = 1.25
+MIN_COMPARED_SECONDS = 0.05
+ESSENTIAL_FILES = ["README.md", "pyproject.toml", "main.py", "src/app.py"]
+SELECTION_RESPONSE = f"```json\n{json.dumps(ESSENTIAL_FILES)}\n```"
+
+
+class LocalGitHubClient(GitHubClient):
+    """GitHub client that clones local file urls without a token"""
+
+    def clone_repo(self, repo_url: str, target_dir: str) -> None:
+        self._clone_from(repo_url, target_dir)
+
+
+def measure(stages: dict, name: str, function):
+    """
+    Measures wall time and peak traced memory of a stage, running it once untraced and once traced
+    :param stages: dict of stage name to stage result, updated in place
+    :param name: stage name
+    :param function: function running the stage
+    :return: stage output
+    """
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    function()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stages[name] = {"seconds": seconds, "peak_bytes": peak_bytes, "tokens": None}
+    return result
+
+
+def bench_file_utils(repo_url: str, base_dir: str, token_counter) -> dict:
+    """
+    Measures file stages of the pipeline on a checkout of the repo. Stage names are kept from the earlier file
+    utilities so that saved baselines stay comparable: get_file_paths is index_repo with filter_records,
+    get_file_names is the fit_file_tree listing, get_essential_file_paths is FileIndex.resolve, count_tokens is
+    count_file_tokens and merge_files is pack_files with merge_file_contents
+    :param repo_url: file url of the bare repo
+    :param base_dir: directory for the checkout
+    :param token_counter: token counter of the model
+    :return: dict of stage name to stage result
+    """
+    work_dir = os.path.join(base_dir, "checkout")
+    run_git("clone", "-q", repo_url, work_dir, cwd=base_dir)
+
+    stages = {}
+    file_records = measure(stages, "get_file_paths", lambda: filter_records(index_repo(repo_path=work_dir)))
+    file_index = FileIndex(repo_path=work_dir, file_paths=[record.path for record in file_records],
+                           file_sizes=[record.size for record in file_records])
+
+    template_token_count = token_counter.count(get_essential_files_prompt_template.format(files=""))
+    _, listing_token_count = measure(stages, "get_file_names", lambda: fit_file_tree(
+        rel_paths=file_index.rel_paths, token_budget=_get_token_budget(template_token_count),
+        token_counter=token_counter, sizes=file_index.sizes_by_rel_path))
+    stages["get_file_names"]["tokens"] = listing_token_count
+
+    file_names = measure(stages, "extract_file_names", lambda: extract_file_names(SELECTION_RESPONSE))
+    essential_file_paths = measure(stages, "get_essential_file_paths", lambda: file_index.resolve(file_names))
+
+    file_token_counts = measure(stages, "count_tokens", lambda: count_file_tokens(file_paths=essential_file_paths,
+                                                                                  token_counter=token_counter))
+    stages["count_tokens"]["tokens"] = sum(token_count for _, token_count in file_token_counts)
+
+    template_token_count = token_counter.count(generate_readme_prompt_template.format(all_files_content=""))
+
+    def pack() -> int:
+        pack_result = pack_files(file_paths=essential_file_paths, token_budget=_get_token_budget(template_token_count),
+                                 token_counter=token_counter, file_token_counts=dict(file_token_counts))
+        merge_file_contents(pack_result.file_contents)
+        return pack_result.token_count
+
+    packed_token_count = measure(stages, "merge_files", pack)
+    stages["merge_files"]["tokens"] = packed_token_count
+
+    return stages
+
+
+def _get_token_budget(template_token_count: int) -> int:
+    return INPUT_TOKEN_LIMIT - template_token_count - PROMPT_SAFETY_MARGIN_TOKENS
+
+
+def bench_pipeline(repo_url: str, use_async: bool) -> dict:
+    """
+    Runs the whole graph in a traced run and aggregates its spans by name
+    :param repo_url: file url of the bare repo
+    :param use_async: run async nodes on an event loop
+    :return: dict of stage name to stage result
+    """
+    graph = build_graph(use_async=use_async)
+    span_summary = SummaryExporter()
+    tracing.add_exporter(span_summary)
+
+    try:
+        with tracing.run(measure_cpu=not use_async, repo_url=repo_url):
+            if use_async:
+                state = asyncio.run(graph.ainvoke(create_initial_state(repo_url=repo_url)))
+            else:
+                state = graph.invoke(create_initial_state(repo_url=repo_url))
+    finally:
+        tracing.remove_exporter(span_summary)
+    shutil.rmtree(state["temp_directory_path"], ignore_errors=True)
+
+    stages = {}
+    for name, totals in span_summary.stats().items():
+        stage_name = "pipeline" if name == RUN_SPAN_NAME else f"span:{name}"
+        stages[stage_name] = {
+            "seconds": totals["wall_seconds"],
+            "peak_bytes": None,
+            "tokens": totals.get("prompt_tokens", 0) + totals.get("completion_tokens", 0) or None,
+            "llm_calls": totals["count"] if name == "llm.invoke" else None,
+        }
+    return stages
+
+
+def bench_size(file_count: int, latency_seconds: float, jitter_seconds: float, use_async: bool) -> dict:
+    """
+    Benchmarks one repo size, meant to run in a fresh process so that peak RSS belongs to this size only
+    :param file_count: number of files in the synthetic repo
+    :param latency_seconds: stub LLM latency per call
+    :param jitter_seconds: max random latency added to stub LLM calls
+    :param use_async: run async nodes on an event loop
+    :return: benchmark result
+    """
+    llm_client = LLMClient(api_key="", backend=StubBackend(latency_seconds=latency_seconds,
+                                                           jitter_seconds=jitter_seconds),
+                           encoding=get_encoding(MODEL_NAME))
+    token_counter = llm_client.get_token_counter()
+    set_clients(llm_client=llm_client, github_client=LocalGitHubClient(github_token="", clone_mode=CLONE_MODE_SHALLOW))
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        start = time.perf_counter()
+        repo_url = create_project_repo(base_dir, file_count)
+        setup_seconds = time.perf_counter() - start
+
+        stages = bench_file_utils(repo_url, base_dir, token_counter)
+        pipeline_stages = bench_pipeline(repo_url, use_async)
+
+    return {
+        "files": file_count,
+        "setup_seconds": setup_seconds,
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "stages": {**stages, **pipeline_stages},
+    }
+
+
+def compare(results: dict, baseline: dict, max_regression_ratio: float) -> list:
+    """
+    Compares stage timings with a saved baseline
+    :param results: benchmark results by repo size
+    :param baseline: saved benchmark results by repo size
+    :param max_regression_ratio: max allowed ratio of current to baseline seconds
+    :return: list of regression descriptions
+    """
+    regressions = []
+    for size, result in results.items():
+        baseline_stages = baseline.get(size, {}).get("stages", {})
+        for name, stage in result["stages"].items():
+            baseline_seconds = baseline_stages.get(name, {}).get("seconds")
+            if baseline_seconds is None or max(baseline_seconds, stage["seconds"]) < MIN_COMPARED_SECONDS:
+                continue
+            ratio = stage["seconds"] / baseline_seconds if baseline_seconds else float("inf")
+            print(f"{size:>8}  {name:<36}{baseline_seconds:>10.3f}{stage['seconds']:>10.3f}{ratio:>8.2f}x")
+            if ratio > max_regression_ratio:
+                regressions.append(f"{name} on {size} files: {baseline_seconds:.3f}s -> {stage['seconds']:.3f}s")
+    return regressions
+
+
+def print_result(result: dict) -> None:
+    print(f"\n{result['files']} files, peak RSS {result['peak_rss_bytes'] / 2 ** 20:.1f} MiB, "
+          f"repo setup {result['setup_seconds']:.1f}s")
+    print(f"{'stage':<36}{'s':>10}{'peak MiB':>10}{'tokens':>10}{'calls':>7}")
+    for name, stage in result["stages"].items():
+        peak = f"{stage['peak_bytes'] / 2 ** 20:.2f}" if stage["peak_bytes"] is not None else "-"
+        tokens = stage["tokens"] if stage["tokens"] is not None else "-"
+        llm_calls = stage.get("llm_calls") if stage.get("llm_calls") is not None else "-"
+        print(f"{name:<36}{stage['seconds']:>10.3f}{peak:>10}{tokens:>10}{llm_calls:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma separated numbers of files in synthetic repos")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS, help="Stub LLM latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Max random latency added to stub LLM calls")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Run async nodes")
+    parser.add_argument("--output", help="Path of JSON file for results")
+    parser.add_argument("--baseline", help="Path of saved JSON results to compare with")
+    parser.add_argument("--max-regression", type=float, default=MAX_REGRESSION_RATIO,
+                        help="Max allowed ratio of stage time to baseline before failing")
+    args = parser.parse_args()
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for file_count in (int(size) for size in args.sizes.split(",")):
+        with context.Pool(processes=1) as pool:
+            result = pool.apply(bench_size, (file_count, args.latency_ms / 1000, args.jitter_ms / 1000,
+                                             args.use_async))
+        results[str(file_count)] = result
+        print_result(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "latency_ms": args.latency_ms,
+                "jitter_ms": args.jitter_ms,
+                "async": args.use_async,
+                "results": results,
+            }, file, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        print(f"\n{'files':>8}  {'stage':<36}{'base s':>10}{'s':>10}{'ratio':>9}")
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Compares get_file_paths with the scandir indexer on a synthetic file tree.
+
+Usage: python -m benchmarks.bench_repo_index --files 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from agent.file_utils import get_file_paths
+from agent.repo_index import index_repo, filter_records
+
+FILES_PER_DIRECTORY = 50
+BINARY_FILE_EVERY = 20
+
+
+def create_file_tree(base_dir: str, file_count: int, file_size: int) -> None:
+    """
+    Creates nested file tree with a share of binary files
+    :param base_dir: root directory of the tree
+    :param file_count: number of files
+    :param file_size: size of each file in bytes
+    """
+    text_content = b"x" * file_size
+    binary_content = b"\0" * file_size
+
+    for index in range(file_count):
+        directory_index = index // FILES_PER_DIRECTORY
+        directory = os.path.join(base_dir, f"pkg{directory_index % 40}", f"mod{directory_index}")
+        if index % FILES_PER_DIRECTORY == 0:
+            os.makedirs(directory, exist_ok=True)
+
+        is_binary = index % BINARY_FILE_EVERY == 0
+        name = f"file{index}.blob" if is_binary else f"file{index}.py"
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(binary_content if is_binary else text_content)
+
+
+def walk_with_sizes(base_dir: str) -> list:
+    """
+    Baseline that gets the same sizes with os.walk and a stat call per file
+    :param base_dir: root directory of the tree
+    :return: sorted list of (file path, size) tuples
+    """
+    files = []
+    for root, _, names in os.walk(base_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            files.append((path, os.path.getsize(path)))
+    return sorted(files)
+
+
+def measure(name: str, index) -> dict:
+    """
+    Measures wall time and peak traced memory of indexing function
+    :param name: implementation name
+    :param index: function returning list of indexed files
+    :return: benchmark result
+    """
+    start = time.perf_counter()
+    result = index()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    index()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"name": name, "seconds": seconds, "peak_bytes": peak_bytes, "files": len(result)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200_000, help="Number of files in synthetic tree")
+    parser.add_argument("--file-size", type=int, default=64, help="Size of each file in bytes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        create_file_tree(base_dir, args.files, args.file_size)
+        results = [
+            measure("os.walk", lambda: get_file_paths(base_dir)),
+            measure("os.walk+stat", lambda: walk_with_sizes(base_dir)),
+            measure("scandir", lambda: index_repo(base_dir, sniff=False)),
+            measure("scandir+sniff", lambda: index_repo(base_dir)),
+            measure("scandir+filter", lambda: filter_records(index_repo(base_dir))),
+        ]
+
+    print(f"{'implementation':<16}{'s':>10}{'peak MiB':>12}{'files':>10}")
+    for result in results:
+        print(f"{result['name']:<16}{result['seconds']:>10.3f}{result['peak_bytes'] / 2 ** 20:>12.2f}"
+              f"{result['files']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares selection prompt size of the flat file name list and the tree encoded listing.
+
+Usage: python -m benchmarks.bench_selection_listing --files 50000
+"""
+import argparse
+import os
+import random
+import time
+
+from agent.llm_client import INPUT_TOKEN_LIMIT, MODEL_NAME
+from agent.prompts import get_essential_files_prompt_template
+from agent.token_counter import TokenCounter, get_encoding
+from agent.tree_listing import encode_file_tree, fit_file_tree
+
+EXTENSIONS = [".py", ".ts", ".tsx", ".json", ".md", ".go", ".java", ".yaml"]
+
+
+def create_rel_paths(file_count: int, seed: int = 0) -> list:
+    """
+    Creates monorepo shaped relative file paths
+    :param file_count: number of files
+    :param seed: random seed
+    :return: sorted list of relative file paths
+    """
+    rng = random.Random(seed)
+    rel_paths = {"README.md", "package.json", "pyproject.toml", "Makefile"}
+    while len(rel_paths) < file_count:
+        depth = rng.randint(1, 6)
+        parts = [f"{rng.choice(['services', 'libs', 'apps', 'tools'])}{rng.randint(0, 30)}"]
+        parts += [f"{rng.choice(['src', 'pkg', 'internal', 'test', 'api', 'model'])}{rng.randint(0, 5)}"
+                  for _ in range(depth - 1)]
+        parts.append(f"file{rng.randint(0, 999)}{rng.choice(EXTENSIONS)}")
+        rel_paths.add("/".join(parts))
+    return sorted(rel_paths)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=50_000, help="Number of files in synthetic repo")
+    args = parser.parse_args()
+
+    token_counter = TokenCounter(get_encoding(MODEL_NAME))
+    rel_paths = create_rel_paths(args.files)
+    template_token_count = token_counter.count(get_essential_files_prompt_template.format(files=""))
+    token_budget = INPUT_TOKEN_LIMIT - template_token_count
+
+    flat_listing = str([os.path.basename(rel_path) for rel_path in rel_paths])
+    tree_listing = encode_file_tree(rel_paths)
+    start = time.perf_counter()
+    fitted_listing, fitted_token_count = fit_file_tree(rel_paths, token_budget, token_counter)
+    fit_seconds = time.perf_counter() - start
+
+    print(f"files: {len(rel_paths)}, listing budget: {token_budget} tokens")
+    print(f"{'listing':<16}{'chars':>12}{'tokens':>10}{'fits':>6}")
+    for name, listing in [("flat names", flat_listing), ("full tree", tree_listing)]:
+        token_count = token_counter.count(listing)
+        print(f"{name:<16}{len(listing):>12}{token_count:>10}{'yes' if token_count <= token_budget else 'no':>6}")
+    print(f"{'fitted tree':<16}{len(fitted_listing):>12}{fitted_token_count:>10}"
+          f"{'yes' if fitted_token_count <= token_budget else 'no':>6}  ({fit_seconds:.2f} s)")
+
+
+if __name__ == '__main__':
+    main()
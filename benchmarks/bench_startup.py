@@ -0,0 +1,77 @@
+"""
+Measures CLI startup with python -X importtime and wall time of main.py --help, against a startup budget.
+
+Usage: python -m benchmarks.bench_startup --runs 5 --budget-ms 500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STARTUP_BUDGET_MS = 500
+MEASURED_MODULES = ("main", "agent.nodes")
+HEAVY_MODULES = ("langchain_openai", "langgraph", "tiktoken", "openai")
+TOP_IMPORT_COUNT = 10
+
+
+def measure_imports(module: str) -> list:
+    """
+    Imports module in a fresh interpreter with -X importtime
+    :param module: module name
+    :return: list of (module name, self microseconds, cumulative microseconds, nesting level) tuples
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True, check=True)
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip())) // 2))
+    return imports
+
+
+def measure_help(runs: int) -> list:
+    """
+    Measures wall time of main.py --help in fresh interpreters
+    :param runs: number of runs
+    :return: list of wall times in milliseconds
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", "--help"], cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL,
+                       check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Number of main.py --help runs")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="Max median wall time of main.py --help in milliseconds")
+    args = parser.parse_args()
+
+    for module in MEASURED_MODULES:
+        imports = measure_imports(module)
+        total_us = next(cumulative_us for name, _, cumulative_us, _ in imports if name == module)
+        loaded_heavy_modules = sorted({name.split(".")[0] for name, _, _, _ in imports} & set(HEAVY_MODULES))
+        print(f"import {module}: {total_us / 1000:.1f} ms, heavy modules: {loaded_heavy_modules or 'none'}")
+
+        top_imports = sorted((item for item in imports if item[3] == 1), key=lambda item: -item[2])
+        for name, _, cumulative_us, _ in top_imports[:TOP_IMPORT_COUNT]:
+            print(f"  {name:<40}{cumulative_us / 1000:>10.1f} ms")
+
+    median_ms = statistics.median(measure_help(args.runs))
+    print(f"main.py --help: median {median_ms:.1f} ms over {args.runs} runs, budget {args.budget_ms:.0f} ms")
+    if median_ms > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import os
+import random
+import subprocess
+
+GIT_IDENTITY = ["-c", "user.name=bench", "-c", "user.email=bench@example.com"]
+
+PROJECT_FILES = {
+    "README.md": "# Synthetic project\n\nGenerated for benchmarks.\n",
+    "pyproject.toml": "[project]\nname = \"synthetic\"\nversion = \"0.1.0\"\n",
+    "main.py": "from src.app import run\n\nif __name__ == '__main__':\n    run()\n",
+    "src/app.py": "def run():\n    print('synthetic')\n",
+}
+DIRECTORY_NAMES = ("core", "services", "handlers", "models", "utils", "internal", "impl", "detail")
+TEXT_EXTENSIONS = (".py", ".py", ".md", ".json", ".txt")
+TEXT_LINES = ("value = compute(value)", "return result", "import os", "def handler(event):", "    pass",
+              "class Model:", "    name = 'synthetic'", "logger.info('done')")
+
+
+def run_git(*args: str, cwd: str) -> None:
+    """
+    Runs git command quietly
+    :param args: git arguments
+    :param cwd: working directory
+    """
+    subprocess.run(["git", *GIT_IDENTITY, *args], cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+
+
+def create_bare_repo(base_dir: str, file_count: int, commit_count: int = 1, file_size: int = 2048,
+                     seed: int = 0) -> str:
+    """
+    Creates local bare repo with synthetic source tree and history
+    :param base_dir: directory for work tree and bare repo
+    :param file_count: number of files in the tree
+    :param commit_count: number of commits, each rewriting a slice of the files
+    :param file_size: approximate size of each file in bytes
+    :param seed: random seed
+    :return: file url of the bare repo
+    """
+    rng = random.Random(seed)
+    work_dir = os.path.join(base_dir, "work")
+    bare_dir = os.path.join(base_dir, "repo.git")
+    os.makedirs(work_dir)
+    run_git("init", "-q", "-b", "main", cwd=work_dir)
+
+    relative_paths = []
+    for index in range(file_count):
+        directory = os.path.join(f"pkg{index % 17}", f"mod{index % 5}")
+        relative_paths.append(os.path.join(directory, f"file{index}.py"))
+
+    for commit in range(commit_count):
+        changed = relative_paths if commit == 0 else rng.sample(relative_paths, max(1, file_count // 10))
+        for relative_path in changed:
+            path = os.path.join(work_dir, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(rng.randbytes(file_size // 2).hex())
+        run_git("add", "-A", cwd=work_dir)
+        run_git("commit", "-q", "-m", f"commit {commit}", cwd=work_dir)
+
+    return publish_bare_repo(work_dir, bare_dir)
+
+
+def create_project_repo(base_dir: str, file_count: int, depth: int = 6, binary_every: int = 10,
+                        file_size: int = 2048, seed: int = 0) -> str:
+    """
+    Creates local bare repo of a Python project with root manifest, README and entry point, and a deep source tree
+    of mixed text files and a share of binary files
+    :param base_dir: directory for work tree and bare repo
+    :param file_count: number of files in the source tree
+    :param depth: max directory depth of the source tree
+    :param binary_every: every n-th file is binary
+    :param file_size: approximate size of each file in bytes
+    :param seed: random seed
+    :return: file url of the bare repo
+    """
+    rng = random.Random(seed)
+    work_dir = os.path.join(base_dir, "work")
+    bare_dir = os.path.join(base_dir, "repo.git")
+    os.makedirs(work_dir)
+    run_git("init", "-q", "-b", "main", cwd=work_dir)
+
+    for relative_path, content in PROJECT_FILES.items():
+        path = os.path.join(work_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+    for index in range(file_count):
+        directory = os.path.join("src", *(f"{name}{rng.randrange(8)}" for name in DIRECTORY_NAMES[:1 + index % depth]))
+        os.makedirs(os.path.join(work_dir, directory), exist_ok=True)
+        if index % binary_every == 0:
+            with open(os.path.join(work_dir, directory, f"asset{index}.png"), "wb") as file:
+                file.write(b"\x89PNG\0" + rng.randbytes(file_size))
+            continue
+
+        extension = TEXT_EXTENSIONS[index % len(TEXT_EXTENSIONS)]
+        with open(os.path.join(work_dir, directory, f"file{index}{extension}"), "w", encoding="utf-8") as file:
+            file.write(f"# module {index}\n" + "\n".join(rng.choice(TEXT_LINES) for _ in range(file_size // 32)))
+
+    run_git("add", "-A", cwd=work_dir)
+    run_git("commit", "-q", "-m", "synthetic project", cwd=work_dir)
+    return publish_bare_repo(work_dir, bare_dir)
+
+
+def publish_bare_repo(work_dir: str, bare_dir: str) -> str:
+    """
+    Clones work tree into bare repo that serves partial clones
+    :param work_dir: git work tree with commits
+    :param bare_dir: path for bare repo
+    :return: file url of the bare repo
+    """
+    run_git("clone", "-q", "--bare", work_dir, bare_dir, cwd=os.path.dirname(bare_dir))
+    run_git("config", "uploadpack.allowfilter", "true", cwd=bare_dir)
+    run_git("config", "uploadpack.allowanysha1inwant", "true", cwd=bare_dir)
+    return f"file://{bare_dir}"
+
+
+def directory_size(path: str) -> int:
+    """
+    Counts bytes on disk of all files in directory
+    :param path: directory path
+    :return: total size in bytes
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            if not os.path.islink(file_path):
+                total += os.path.getsize(file_path)
+    return total
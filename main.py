@@ -1,44 +1,130 @@
 import argparse
+import asyncio
+import sys
 
-from langgraph.graph import StateGraph, START, END
-from agent.nodes import AgentState, clone_repo_node, select_essential_files_node, readme_body_node, readme_file_node
+from agent import tracing
+from agent.batch import DEFAULT_CONCURRENCY, read_repo_urls, run_batch, arun_batch, write_manifest
+from agent.nodes import AgentState, create_initial_state, clone_repo_node, select_essential_files_node, \
+    resolve_essential_files_node, readme_body_node, readme_file_node, route_readme_generation, summarize_chunk_node, \
+    summarize_files_node, reduce_readme_node, aclone_repo_node, aselect_essential_files_node, \
+    aresolve_essential_files_node, areadme_body_node, areadme_file_node, aroute_readme_generation, \
+    asummarize_chunk_node, asummarize_files_node, areduce_readme_node, TRACE_PATH
+from agent.job_queue import DEFAULT_WORKERS, DEFAULT_MAX_QUEUE_DEPTH
+from agent.tracing import SummaryExporter, JsonLinesExporter
 
 
-def build_graph():
+def build_graph(use_async: bool = False):
+    from langgraph.graph import StateGraph, START, END
+
     graph_builder = StateGraph(AgentState)
 
-    graph_builder.add_node("clone_repo_node", clone_repo_node)
-    graph_builder.add_node("select_essential_files_node", select_essential_files_node)
-    graph_builder.add_node("readme_body_node", readme_body_node)
-    graph_builder.add_node("readme_file_node", readme_file_node)
+    if use_async:
+        graph_builder.add_node("clone_repo_node", aclone_repo_node)
+        graph_builder.add_node("select_essential_files_node", aselect_essential_files_node)
+        graph_builder.add_node("resolve_essential_files_node", aresolve_essential_files_node)
+        graph_builder.add_node("readme_body_node", areadme_body_node)
+        graph_builder.add_node("summarize_chunk_node", asummarize_chunk_node)
+        graph_builder.add_node("summarize_files_node", asummarize_files_node)
+        graph_builder.add_node("reduce_readme_node", areduce_readme_node)
+        graph_builder.add_node("readme_file_node", areadme_file_node)
+        route = aroute_readme_generation
+    else:
+        graph_builder.add_node("clone_repo_node", clone_repo_node)
+        graph_builder.add_node("select_essential_files_node", select_essential_files_node)
+        graph_builder.add_node("resolve_essential_files_node", resolve_essential_files_node)
+        graph_builder.add_node("readme_body_node", readme_body_node)
+        graph_builder.add_node("summarize_chunk_node", summarize_chunk_node)
+        graph_builder.add_node("summarize_files_node", summarize_files_node)
+        graph_builder.add_node("reduce_readme_node", reduce_readme_node)
+        graph_builder.add_node("readme_file_node", readme_file_node)
+        route = route_readme_generation
 
     graph_builder.add_edge(START, "clone_repo_node")
     graph_builder.add_edge("clone_repo_node", "select_essential_files_node")
-    graph_builder.add_edge("select_essential_files_node", "readme_body_node")
+    graph_builder.add_edge("select_essential_files_node", "resolve_essential_files_node")
+    graph_builder.add_conditional_edges("resolve_essential_files_node", route,
+                                        ["readme_body_node", "summarize_chunk_node", "summarize_files_node"])
     graph_builder.add_edge("readme_body_node", "readme_file_node")
+    graph_builder.add_edge("summarize_chunk_node", "reduce_readme_node")
+    graph_builder.add_edge("summarize_files_node", "reduce_readme_node")
+    graph_builder.add_edge("reduce_readme_node", "readme_file_node")
     graph_builder.add_edge("readme_file_node", END)
 
     return graph_builder.compile()
 
 
-def get_repo_url():
+def parse_args():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--url", required=True, help="URL of the github repo")
-    return parser.parse_args().url
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--url", help="URL of the github repo")
+    source.add_argument("--batch", help="File with github repo URLs, one per line, or '-' for stdin")
+    source.add_argument("--serve", action="store_true", help="Serve README jobs over a local HTTP API")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Number of repos processed concurrently in batch mode")
+    parser.add_argument("--manifest", default="batch_manifest.json",
+                        help="Path of the result and error manifest in batch mode")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run batch jobs on one event loop with async nodes")
+    parser.add_argument("--host", default="127.0.0.1", help="Host of the HTTP API in server mode")
+    parser.add_argument("--port", type=int, default=8080, help="Port of the HTTP API in server mode")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Number of jobs run concurrently in server mode")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE_DEPTH,
+                        help="Max number of queued jobs in server mode before new jobs are rejected")
+    args = parser.parse_args()
+    if args.serve and args.use_async:
+        parser.error("--async is not supported with --serve")
+    for name in ("concurrency", "workers", "max_queue"):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    return args
 
 
 def run_agent():
-    initial_state = AgentState(
-        repo_url=get_repo_url(),
-        temp_directory_path="",
-        file_paths=[],
-        essential_file_names=[],
-        readme_body=""
-    )
+    args = parse_args()
+    graph = build_graph(use_async=args.use_async)
+
+    span_summary = SummaryExporter()
+    tracing.add_exporter(span_summary)
+    if TRACE_PATH:
+        tracing.add_exporter(JsonLinesExporter(TRACE_PATH))
+
+    if args.url:
+        try:
+            with tracing.run(repo_url=args.url):
+                if args.use_async:
+                    asyncio.run(graph.ainvoke(create_initial_state(repo_url=args.url)))
+                else:
+                    graph.invoke(create_initial_state(repo_url=args.url))
+        finally:
+            print(span_summary.format_table())
+        return
+
+    if args.serve:
+        from agent.server import serve
+
+        serve(graph, host=args.host, port=args.port, workers=args.workers, max_queue_depth=args.max_queue,
+              span_summary=span_summary)
+        return
+
+    if args.batch == "-":
+        repo_urls = read_repo_urls(sys.stdin)
+    else:
+        with open(args.batch, encoding="utf-8") as file:
+            repo_urls = read_repo_urls(file)
 
-    graph = build_graph()
+    if args.use_async:
+        manifest = asyncio.run(arun_batch(graph, repo_urls, concurrency=args.concurrency))
+    else:
+        manifest = run_batch(graph, repo_urls, concurrency=args.concurrency)
+    manifest["summary"]["spans"] = span_summary.stats()
+    write_manifest(manifest, args.manifest)
 
-    graph.invoke(initial_state)
+    summary = manifest["summary"]
+    print(f"Processed {summary['total']} repos ({summary['succeeded']} succeeded, {summary['failed']} failed) "
+          f"in {summary['elapsed_seconds']}s with concurrency {summary['concurrency']}: "
+          f"{summary['repos_per_minute']} repos/min")
+    print(span_summary.format_table())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from agent.batch import read_repo_urls, run_batch, arun_batch, write_manifest, STATUS_SUCCESS, STATUS_ERROR
+
+
+class TestReadRepoUrls(unittest.TestCase):
+    def test_skips_blank_lines_and_comments(self):
+        """Test urls are read one per line"""
+        lines = ["https://github.com/a/one\n", "\n", "# comment\n", "  https://github.com/a/two  \n"]
+
+        assert read_repo_urls(lines) == ["https://github.com/a/one", "https://github.com/a/two"]
+
+
+class TestRunBatch(unittest.TestCase):
+    def test_records_results_and_errors(self):
+        """Test manifest contains success and error entries with summary"""
+        graph = MagicMock()
+
+        def invoke(state):
+            if state["repo_url"].endswith("broken"):
+                raise Exception("clone failed")
+            return {**state, "temp_directory_path": "/tmp/" + state["repo_url"].rsplit("/", 1)[-1]}
+
+        graph.invoke.side_effect = invoke
+
+        manifest = run_batch(graph, ["https://github.com/a/ok", "https://github.com/a/broken"], concurrency=2)
+
+        ok, broken = manifest["results"]
+        assert ok["status"] == STATUS_SUCCESS
+        assert ok["readme_path"] == "/tmp/ok/README.md"
+        assert broken["status"] == STATUS_ERROR
+        assert broken["error"] == "Exception: clone failed"
+        assert manifest["summary"]["total"] == 2
+        assert manifest["summary"]["succeeded"] == 1
+        assert manifest["summary"]["failed"] == 1
+        assert manifest["summary"]["concurrency"] == 2
+        assert graph.invoke.call_count == 2
+
+    def test_concurrency_is_bounded(self):
+        """Test no more than configured number of graph runs are in flight"""
+        lock = threading.Lock()
+        in_flight = {"current": 0, "max": 0}
+
+        def invoke(state):
+            with lock:
+                in_flight["current"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["current"])
+            time.sleep(0.02)
+            with lock:
+                in_flight["current"] -= 1
+            return {**state, "temp_directory_path": "/tmp/x"}
+
+        graph = MagicMock()
+        graph.invoke.side_effect = invoke
+
+        manifest = run_batch(graph, [f"https://github.com/a/{index}" for index in range(10)], concurrency=3)
+
+        assert in_flight["max"] == 3
+        assert manifest["summary"]["succeeded"] == 10
+
+    @patch("agent.batch.get_summary_cache")
+    @patch("agent.batch.get_response_cache")
+    def test_reports_cache_stats(self, mock_get_response_cache, mock_get_summary_cache):
+        """Test manifest summary contains response and summary cache hits and misses"""
+        mock_get_response_cache.return_value.stats.return_value = {"hits": 3, "misses": 1, "bypass": False}
+        mock_get_summary_cache.return_value.stats.return_value = {"hits": 5, "misses": 2, "bypass": False}
+        graph = MagicMock()
+        graph.invoke.side_effect = lambda state: {**state, "temp_directory_path": "/tmp/x"}
+
+        summary = run_batch(graph, ["https://github.com/a/ok"])["summary"]
+
+        assert summary["response_cache"] == {"hits": 3, "misses": 1, "bypass": False}
+        assert summary["summary_cache"] == {"hits": 5, "misses": 2, "bypass": False}
+
+    @patch("agent.batch.get_summary_cache", return_value=None)
+    @patch("agent.batch.get_response_cache", return_value=None)
+    def test_omits_cache_stats_without_caches(self, mock_get_response_cache, mock_get_summary_cache):
+        """Test manifest summary has no cache stats when caches are not configured"""
+        graph = MagicMock()
+        graph.invoke.side_effect = lambda state: {**state, "temp_directory_path": "/tmp/x"}
+
+        summary = run_batch(graph, ["https://github.com/a/ok"])["summary"]
+
+        assert "response_cache" not in summary
+        assert "summary_cache" not in summary
+
+
+class TestArunBatch(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_jobs_on_event_loop_with_bounded_concurrency(self):
+        """Test async batch records results and limits jobs in flight"""
+        in_flight = {"current": 0, "max": 0}
+
+        async def ainvoke(state):
+            in_flight["current"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["current"])
+            await asyncio.sleep(0.01)
+            in_flight["current"] -= 1
+            if state["repo_url"].endswith("broken"):
+                raise Exception("clone failed")
+            return {**state, "temp_directory_path": "/tmp/x"}
+
+        graph = MagicMock()
+        graph.ainvoke = AsyncMock(side_effect=ainvoke)
+        repo_urls = [f"https://github.com/a/{index}" for index in range(8)] + ["https://github.com/a/broken"]
+
+        manifest = await arun_batch(graph, repo_urls, concurrency=4)
+
+        assert in_flight["max"] == 4
+        assert manifest["summary"]["succeeded"] == 8
+        assert manifest["results"][-1]["error"] == "Exception: clone failed"
+        graph.invoke.assert_not_called()
+
+
+class TestWriteManifest(unittest.TestCase):
+    def test_writes_json(self):
+        """Test manifest is written as json"""
+        manifest = {"summary": {"total": 0}, "results": []}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "manifest.json")
+
+            write_manifest(manifest, path)
+
+            with open(path) as f:
+                assert json.load(f) == manifest
@@ -0,0 +1,41 @@
+import unittest
+
+from agent.file_index import FileIndex
+
+
+class TestFileIndex(unittest.TestCase):
+    def setUp(self):
+        self.file_index = FileIndex("/repo", [
+            "/repo/README.md",
+            "/repo/docs/README.md",
+            "/repo/pkg/a/__init__.py",
+            "/repo/pkg/b/__init__.py",
+            "/repo/pkg/c/__init__.py",
+            "/repo/pkg/__init__.py",
+            "/repo/src/main.py",
+        ])
+
+    def test_rel_paths(self):
+        """Test relative paths keep indexing order"""
+        self.assertEqual(self.file_index.rel_paths[:2], ["README.md", "docs/README.md"])
+
+    def test_resolve_by_relative_path(self):
+        """Test relative path resolves to exactly one file"""
+        self.assertEqual(self.file_index.resolve(["docs/README.md", "./src/main.py", "/pkg/b/__init__.py"]),
+                         ["/repo/docs/README.md", "/repo/src/main.py", "/repo/pkg/b/__init__.py"])
+
+    def test_resolve_by_name_limits_ambiguous_matches(self):
+        """Test file name falls back to matching files, shallowest first and limited"""
+        result = self.file_index.resolve(["__init__.py"], max_name_matches=2)
+
+        self.assertEqual(result, ["/repo/pkg/__init__.py", "/repo/pkg/a/__init__.py"])
+
+    def test_resolve_keeps_order_and_removes_duplicates(self):
+        """Test resolved paths follow selection order without duplicates"""
+        result = self.file_index.resolve(["main.py", "README.md", "src/main.py", "missing.py", None])
+
+        self.assertEqual(result, ["/repo/src/main.py", "/repo/README.md"])
+
+    def test_resolve_unknown_path_falls_back_to_name(self):
+        """Test path that does not exist resolves by its file name"""
+        self.assertEqual(self.file_index.resolve(["lib/main.py"]), ["/repo/src/main.py"])
@@ -0,0 +1,109 @@
+import unittest
+
+from agent.import_graph import ImportGraph
+from agent.file_ranker import FileRanker, RankResult, score_file, get_manifest_ecosystem, RANKER_MODE_AUTO, \
+    RANKER_MODE_SHADOW, EXCLUDED_SCORE
+
+
+class TestScoreFile(unittest.TestCase):
+    def test_manifests_rank_above_entry_points_and_sources(self):
+        """Test manifests, entry points and sources are ranked in this order"""
+        self.assertGreater(score_file("pyproject.toml"), score_file("main.py"))
+        self.assertGreater(score_file("main.py"), score_file("utils.py"))
+        self.assertGreater(score_file("utils.py"), score_file("notes.md"))
+
+    def test_depth_and_tests_lower_score(self):
+        """Test nested files and test files score lower"""
+        self.assertGreater(score_file("app.py"), score_file("pkg/app.py"))
+        self.assertGreater(score_file("pkg/nodes.py"), score_file("tests/test_nodes.py"))
+        self.assertGreater(score_file("src/index.ts"), score_file("src/index.test.ts"))
+
+    def test_lock_files_and_empty_files_are_excluded(self):
+        """Test lock files and empty files get excluded score"""
+        self.assertEqual(score_file("package-lock.json"), EXCLUDED_SCORE)
+        self.assertEqual(score_file("pkg/__init__.py", size=0), EXCLUDED_SCORE)
+
+    def test_large_files_score_lower(self):
+        """Test large files score lower than small ones"""
+        self.assertGreater(score_file("data.py", size=100), score_file("data.py", size=10 ** 6))
+
+    def test_get_manifest_ecosystem(self):
+        """Test manifests are detected by name and extension"""
+        self.assertEqual(get_manifest_ecosystem("web/package.json"), "node")
+        self.assertEqual(get_manifest_ecosystem("App.csproj"), "dotnet")
+        self.assertIsNone(get_manifest_ecosystem("main.py"))
+
+
+class TestFileRanker(unittest.TestCase):
+    def test_unsupported_mode_raises(self):
+        """Test unknown mode is rejected"""
+        with self.assertRaises(Exception):
+            FileRanker(mode="sometimes")
+
+    def test_rank_recognized_layout_is_confident(self):
+        """Test single ecosystem repo with manifest is selected without LLM"""
+        file_ranker = FileRanker(mode=RANKER_MODE_AUTO)
+
+        result = file_ranker.rank(["README.md", "pyproject.toml", "poetry.lock", "main.py", "tests/test_main.py",
+                                   "agent/nodes.py"], sizes={"main.py": 100})
+
+        self.assertTrue(result.confident)
+        self.assertEqual(result.ecosystems, ["python"])
+        self.assertEqual(result.selected_rel_paths, ["pyproject.toml", "main.py", "README.md"])
+        self.assertNotIn("poetry.lock", result.candidate_rel_paths)
+        self.assertTrue(file_ranker.skips_llm(result))
+        self.assertFalse(file_ranker.shortlists(result))
+
+    def test_rank_with_import_graph_selects_central_sources(self):
+        """Test import graph lifts central source files and entry points into the selection"""
+        import_graph = ImportGraph(edges={"pkg/run.py": {"pkg/core.py"}, "pkg/core.py": set(), "pkg/misc.py": set()},
+                                   entry_points={"pkg/run.py"})
+        rel_paths = ["setup.py", "pkg/core.py", "pkg/misc.py", "pkg/run.py"]
+
+        without_graph = FileRanker().rank(rel_paths)
+        with_graph = FileRanker().rank(rel_paths, import_graph=import_graph)
+
+        self.assertEqual(without_graph.selected_rel_paths, ["setup.py"])
+        self.assertEqual(with_graph.selected_rel_paths, ["setup.py", "pkg/core.py", "pkg/run.py"])
+
+    def test_rank_monorepo_is_not_confident(self):
+        """Test repo with many nested manifests is left to LLM with a shortlist"""
+        file_ranker = FileRanker(mode=RANKER_MODE_AUTO, max_candidate_files=3)
+        rel_paths = ["package.json", "README.md", "index.js"] + [f"packages/p{index}/package.json"
+                                                                 for index in range(5)]
+
+        result = file_ranker.rank(rel_paths)
+
+        self.assertFalse(result.confident)
+        self.assertEqual(result.candidate_rel_paths, ["package.json", "packages/p0/package.json",
+                                                      "packages/p1/package.json"])
+        self.assertFalse(file_ranker.skips_llm(result))
+        self.assertTrue(file_ranker.shortlists(result))
+
+    def test_rank_without_manifest_is_not_confident(self):
+        """Test repo without manifest is not recognized"""
+        result = FileRanker().rank(["README.md", "main.py", "util.py"])
+
+        self.assertFalse(result.confident)
+        self.assertEqual(result.ecosystems, [])
+
+    def test_shadow_mode_never_skips_llm(self):
+        """Test shadow mode only measures agreement"""
+        file_ranker = FileRanker(mode=RANKER_MODE_SHADOW)
+        result = RankResult(selected_rel_paths=["setup.py"], confident=True)
+
+        self.assertFalse(file_ranker.skips_llm(result))
+        self.assertFalse(file_ranker.shortlists(result))
+
+    def test_record_agreement_updates_stats(self):
+        """Test agreement is Jaccard similarity and is averaged in stats"""
+        file_ranker = FileRanker(mode=RANKER_MODE_SHADOW)
+        file_ranker.rank(["setup.py", "main.py", "README.md"])
+        result = RankResult(selected_rel_paths=["setup.py", "main.py", "README.md"])
+
+        self.assertEqual(file_ranker.record_agreement(result, ["setup.py", "main.py", "app/core.py"]), 0.5)
+        self.assertEqual(file_ranker.record_agreement(result, ["setup.py", "main.py", "README.md"]), 1.0)
+
+        self.assertEqual(file_ranker.stats(), {"mode": RANKER_MODE_SHADOW, "runs": 1, "confident_runs": 1,
+                                               "comparisons": 2, "mean_agreement": 0.75, "mean_recall": 0.833})
+
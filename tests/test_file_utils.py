@@ -1,3 +1,4 @@
+import asyncio
 import os
 import pytest
 import tempfile
@@ -5,8 +6,8 @@ import tempfile
 from unittest.mock import patch, mock_open, MagicMock
 from tempfile import TemporaryDirectory
 
-from agent.file_utils import create_temp_directory, get_file_paths, get_file_names, get_essential_file_paths, \
-    create_readme, merge_files, extract_file_names
+from agent.file_utils import create_temp_directory, get_file_paths, create_readme, extract_file_names, \
+    merge_file_contents, iter_capped_files, TRUNCATION_MARKER, write_readme_stream, awrite_readme_stream
 
 
 class TestCreateTempDirectory:
@@ -170,6 +171,24 @@ class TestGetFilePaths:
         result = get_file_paths(self.repo_path)
         assert result == expected
 
+    def test_ignored_directories_pruned(self):
+        """Test vendor directories and .gitignore patterns are skipped"""
+        self.create_file_structure({
+            '.gitignore': '*.log\n',
+            'app.log': 'log',
+            'main.py': 'content',
+            'node_modules': {'lib': {'index.js': 'content'}},
+            'pkg': {'.gitignore': 'out/\n', 'out': {'gen.py': 'content'}, 'mod.py': 'content'}
+        })
+
+        expected = sorted([
+            os.path.join(self.repo_path, 'main.py'),
+            os.path.join(self.repo_path, 'pkg', 'mod.py')
+        ])
+
+        result = get_file_paths(self.repo_path)
+        assert result == expected
+
     def test_git_directory_exclusion(self):
         """Test that .git directories are excluded"""
         self.create_file_structure({
@@ -222,104 +241,6 @@ class TestGetFilePaths:
         assert result == expected
 
 
-class TestGetFileNames:
-    def test_basic_file_paths(self):
-        """Test with basic file paths"""
-        file_paths = [
-            '/home/user/documents/file1.txt',
-            '/home/user/documents/file2.pdf',
-            '/home/user/images/image.png'
-        ]
-        expected = ['file1.txt', 'file2.pdf', 'image.png']
-
-        result = get_file_names(file_paths)
-        assert result == expected
-
-    def test_empty_list(self):
-        """Test with an empty list of file paths"""
-        file_paths = []
-        expected = []
-
-        result = get_file_names(file_paths)
-        assert result == expected
-
-    def test_paths_with_no_extension(self):
-        """Test with file paths that have no file extension"""
-        file_paths = [
-            '/home/user/documents/file1',
-            '/home/user/documents/README',
-            '/home/user/bin/executable'
-        ]
-        expected = ['file1', 'README', 'executable']
-
-        result = get_file_names(file_paths)
-        assert result == expected
-
-    def test_hidden_files(self):
-        """Test with hidden files"""
-        file_paths = [
-            '/home/user/.config',
-            '/home/user/documents/.hidden_file',
-            '/home/user/.ssh/id_rsa'
-        ]
-        expected = ['.config', '.hidden_file', 'id_rsa']
-
-        result = get_file_names(file_paths)
-        assert result == expected
-
-
-class TestGetEssentialFilePaths:
-    def test_basic_filtering(self):
-        """Test basic filtering of file paths based on file names"""
-        file_names = ['file1.txt', 'file3.txt']
-        file_paths = [
-            '/home/user/documents/file1.txt',
-            '/home/user/documents/file2.txt',
-            '/home/user/downloads/file3.txt',
-            '/home/user/pictures/file4.jpg'
-        ]
-        expected = [
-            '/home/user/documents/file1.txt',
-            '/home/user/downloads/file3.txt'
-        ]
-
-        result = get_essential_file_paths(file_names, file_paths)
-        assert result == expected
-
-    def test_empty_file_names(self):
-        """Test with empty file_names list"""
-        file_names = []
-        file_paths = [
-            '/home/user/documents/file1.txt',
-            '/home/user/documents/file2.txt'
-        ]
-        expected = []
-
-        result = get_essential_file_paths(file_names, file_paths)
-        assert result == expected
-
-    def test_empty_file_paths(self):
-        """Test with empty file_paths list"""
-        file_names = ['file1.txt', 'file2.txt']
-        file_paths = []
-        expected = []
-
-        result = get_essential_file_paths(file_names, file_paths)
-        assert result == expected
-
-    def test_no_matches(self):
-        """Test when no file names match the given paths"""
-        file_names = ['nonexistent1.txt', 'nonexistent2.txt']
-        file_paths = [
-            '/home/user/documents/file1.txt',
-            '/home/user/documents/file2.txt'
-        ]
-        expected = []
-
-        result = get_essential_file_paths(file_names, file_paths)
-        assert result == expected
-
-
 class TestCreateReadme:
     def teardown_method(self):
         """Tear down test fixtures after each test method."""
@@ -357,108 +278,119 @@ class TestCreateReadme:
         mock_file().write.assert_called_once_with(content)
 
 
-class TestMergeFiles:
-    @patch('builtins.open')
-    @patch('os.path.basename')
-    def test_merge_single_file(self, mock_basename, mock_open):
-        """Test merging a single file."""
-        mock_file = mock_open.return_value.__enter__.return_value
-        mock_file.read.return_value = "This is the content of file1."
-        mock_basename.return_value = "file1.txt"
+class TestWriteReadmeStream:
+    def test_writes_chunks_and_echoes_progress(self, capsys):
+        """Test chunks are written to README.md and printed as they arrive"""
+        with TemporaryDirectory() as temp_dir:
+            char_count = write_readme_stream(iter(["# Title\n", "Body"]), temp_dir, echo=True)
 
-        result = merge_files(["/path/to/file1.txt"])
+            with open(os.path.join(temp_dir, "README.md"), encoding="utf-8") as file:
+                assert file.read() == "# Title\nBody"
 
-        expected = "--- file1.txt ---\nThis is the content of file1.\n\n"
-        assert result == expected
+        assert char_count == len("# Title\nBody")
+        assert capsys.readouterr().out == "# Title\nBody"
 
-        mock_open.assert_called_once_with("/path/to/file1.txt", "r", encoding="utf-8")
-        mock_basename.assert_called_once_with("/path/to/file1.txt")
-
-    @patch('builtins.open')
-    @patch('os.path.basename')
-    def test_merge_multiple_files(self, mock_basename, mock_open):
-        """Test merging multiple files."""
-        mock_file = MagicMock()
-        mock_open.return_value.__enter__.return_value = mock_file
-        mock_file.read.side_effect = [
-            "Content of file 1.",
-            "Content of file 2.",
-            "Content of file 3."
-        ]
-        mock_basename.side_effect = ["file1.txt", "file2.py", "file3.md"]
+    def test_keeps_partial_content_when_stream_fails(self):
+        """Test chunks written before a stream error stay on disk"""
+        def chunks():
+            yield "# Title\n"
+            raise ConnectionError("stream cut off")
 
-        result = merge_files(["/path/to/file1.txt", "/path/to/file2.py", "/path/to/file3.md"])
+        with TemporaryDirectory() as temp_dir:
+            with pytest.raises(ConnectionError):
+                write_readme_stream(chunks(), temp_dir)
 
-        expected = (
-            "--- file1.txt ---\nContent of file 1.\n\n"
-            "--- file2.py ---\nContent of file 2.\n\n"
-            "--- file3.md ---\nContent of file 3.\n\n"
-        )
-        assert result == expected
+            with open(os.path.join(temp_dir, "README.md"), encoding="utf-8") as file:
+                assert file.read() == "# Title\n"
 
-        assert mock_open.call_count == 3
+    def test_async_writes_chunks(self):
+        """Test async chunks are written to README.md"""
+        async def chunks():
+            for chunk in ["# Title\n", "Body"]:
+                yield chunk
 
-    @patch('builtins.open')
-    @patch('os.path.basename')
-    def test_empty_file_list(self, mock_basename, mock_open):
-        """Test with an empty list of files."""
-        result = merge_files([])
+        with TemporaryDirectory() as temp_dir:
+            char_count = asyncio.run(awrite_readme_stream(chunks(), temp_dir))
 
-        assert result == ""
+            with open(os.path.join(temp_dir, "README.md"), encoding="utf-8") as file:
+                assert file.read() == "# Title\nBody"
+        assert char_count == len("# Title\nBody")
 
-        mock_open.assert_not_called()
-        mock_basename.assert_not_called()
 
-    @patch('builtins.open')
-    @patch('os.path.basename')
-    def test_empty_file_content(self, mock_basename, mock_open):
-        """Test with files that have empty content."""
-        mock_file = mock_open.return_value.__enter__.return_value
-        mock_file.read.return_value = ""
-        mock_basename.return_value = "empty_file.txt"
+class TestIterCappedFiles:
+    def setup_method(self):
+        """Create files of known size"""
+        self.temp_dir = TemporaryDirectory()
+        self.file_paths = []
+        for name, content in [("a.py", "a" * 100), ("b.py", "b" * 10), ("c.py", "c" * 10), ("empty.md", "")]:
+            path = os.path.join(self.temp_dir.name, name)
+            with open(path, "w") as f:
+                f.write(content)
+            self.file_paths.append(path)
+
+    def teardown_method(self):
+        """Remove files"""
+        self.temp_dir.cleanup()
 
-        result = merge_files(["/path/to/empty_file.txt"])
+    def test_reads_files_in_order(self):
+        """Test files are read fully in order, including empty files"""
+        result = list(iter_capped_files(self.file_paths))
 
-        expected = "--- empty_file.txt ---\n\n\n"
-        assert result == expected
+        assert result == [(path, open(path).read()) for path in self.file_paths]
 
-    @patch('builtins.open')
-    @patch('os.path.basename')
-    def test_file_read_error(self, mock_basename, mock_open):
-        """Test handling of file read errors."""
-        mock_open.side_effect = [
-            IOError("Permission denied"),
-            mock_open.return_value
-        ]
-        mock_file = mock_open.return_value.__enter__.return_value
-        mock_file.read.return_value = "Content of file 2."
-        mock_basename.return_value = "file2.txt"
+    def test_merged_with_file_name_headers(self):
+        """Test read contents merge into framed content"""
+        result = merge_file_contents(list(iter_capped_files(self.file_paths[1:])))
 
-        result = merge_files(["/path/to/file1.txt", "/path/to/file2.txt"])
+        assert result == "--- b.py ---\n" + "b" * 10 + "\n\n--- c.py ---\n" + "c" * 10 + "\n\n--- empty.md ---\n\n\n"
 
-        expected = "--- file2.txt ---\nContent of file 2.\n\n"
-        assert result == expected
+    def test_empty_file_list(self):
+        """Test with an empty list of files"""
+        assert list(iter_capped_files([])) == []
+
+    def test_skips_unreadable_files(self):
+        """Test files that cannot be read are skipped without raising"""
+        missing_path = os.path.join(self.temp_dir.name, "missing.py")
+
+        result = list(iter_capped_files([missing_path, self.file_paths[1]]))
+
+        assert result == [(self.file_paths[1], "b" * 10)]
+
+    def test_uses_file_reader(self):
+        """Test provided file reader is called with remaining limit"""
+        file_reader = MagicMock(return_value="print()")
+
+        result = list(iter_capped_files(["/repo/main.py"], max_file_chars=50, file_reader=file_reader))
+
+        assert result == [("/repo/main.py", "print()")]
+        file_reader.assert_called_once_with("/repo/main.py", max_chars=50)
+
+    def test_per_file_cap_truncates_large_file(self):
+        """Test file above per-file cap is truncated with marker"""
+        result = dict(iter_capped_files(self.file_paths, max_file_chars=50))
+
+        assert result[self.file_paths[0]] == "a" * (50 - len(TRUNCATION_MARKER)) + TRUNCATION_MARKER
+        assert result[self.file_paths[1]] == "b" * 10
 
-    @patch('builtins.open')
-    @patch('os.path.basename')
-    def test_all_files_error(self, mock_basename, mock_open):
-        """Test when all files have read errors."""
-        mock_open.side_effect = IOError("Permission denied")
+    def test_total_cap_bounds_merged_content(self):
+        """Test merged content never exceeds overall cap and remaining files are skipped"""
+        result = merge_file_contents(list(iter_capped_files(self.file_paths, max_total_chars=160)))
 
-        result = merge_files(["/path/to/file1.txt", "/path/to/file2.txt"])
+        assert len(result) <= 160
+        assert "--- b.py ---" in result
+        assert "--- c.py ---" not in result
 
-        assert result == ""
 
-    def test_function_does_not_raise_exception(self):
-        """Test that the function doesn't raise exceptions even with problematic inputs."""
-        nonexistent_path = "/definitely/not/a/real/path/file.txt"
-        try:
-            result = merge_files([nonexistent_path])
+class TestMergeFileContents:
+    def test_merge_file_contents(self):
+        """Test already read contents are framed with file names."""
+        result = merge_file_contents([("/path/to/a.py", "print()"), ("/path/b.md", "")])
 
-            assert result == ""
+        assert result == "--- a.py ---\nprint()\n\n--- b.md ---\n\n\n"
 
-        except Exception as e:
-            pytest.fail(f"Function raised an exception unexpectedly: {e}")
+    def test_merge_file_contents_empty(self):
+        """Test with no contents."""
+        assert merge_file_contents([]) == ""
 
 
 class TestExtractFileNames:
@@ -1,8 +1,12 @@
+import os
+import subprocess
+import tempfile
 import unittest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from git import GitCommandError
 
-from agent.github_client import GitHubClient, HTTPS_PREFIX
+from agent.github_client import GitHubClient, HTTPS_PREFIX, CLONE_MODE_SHALLOW, CLONE_MODE_BLOBLESS, \
+    CLONE_MODE_SPARSE, CLONE_MODE_BARE
 
 
 class TestGitHubClient(unittest.TestCase):
@@ -49,3 +53,177 @@ class TestGitHubClient(unittest.TestCase):
         with self.assertRaises(GitCommandError):
             self.client.clone_repo(self.valid_url, self.target_dir)
         mock_clone.assert_called_once()
+
+    def test_init_unsupported_clone_mode_raises(self):
+        """Test client init with unknown clone mode"""
+        with self.assertRaises(Exception) as ex:
+            GitHubClient(self.token, clone_mode="unknown")
+        self.assertIn("Unsupported clone mode: unknown", str(ex.exception))
+
+    @patch("agent.github_client.Repo.clone_from")
+    def test_clone_repo_shallow_mode(self, mock_clone):
+        """Test the repo is cloned with depth 1"""
+        client = GitHubClient(self.token, clone_mode=CLONE_MODE_SHALLOW)
+        client.clone_repo(self.valid_url, self.target_dir)
+
+        mock_clone.assert_called_once_with(
+            client._modify_url(self.valid_url, self.token), self.target_dir, depth=1, single_branch=True
+        )
+        assert client.has_working_tree is True
+
+    @patch("agent.github_client.Repo.clone_from")
+    def test_clone_repo_uses_mirror_cache(self, mock_clone):
+        """Test the repo is checked out from mirror cache when configured"""
+        mirror_cache = MagicMock()
+        client = GitHubClient(self.token, mirror_cache=mirror_cache)
+
+        client.clone_repo(self.valid_url, self.target_dir)
+
+        mirror_cache.checkout.assert_called_once_with(
+            repo_url=self.valid_url,
+            target_dir=self.target_dir,
+            fetch_url=client._modify_url(self.valid_url, self.token)
+        )
+        mock_clone.assert_not_called()
+
+    def test_mirror_cache_overriding_clone_mode_is_logged(self):
+        """Test clone mode other than full is reported as ignored with mirror cache"""
+        with self.assertLogs("agent.github_client", level="WARNING") as logs:
+            client = GitHubClient(self.token, clone_mode=CLONE_MODE_BARE, mirror_cache=MagicMock())
+
+        assert "ignored" in logs.output[0]
+        assert client.has_working_tree is True
+
+    def test_release_repo_releases_mirror_worktree(self):
+        """Test finished run releases its mirror worktree"""
+        mirror_cache = MagicMock()
+        client = GitHubClient(self.token, mirror_cache=mirror_cache)
+
+        client.release_repo("/tmp/repo")
+
+        mirror_cache.release.assert_called_once_with("/tmp/repo")
+
+    @patch("agent.github_client.Repo.clone_from")
+    def test_clone_repo_sparse_mode(self, mock_clone):
+        """Test the repo is cloned without blobs and checkout in sparse mode"""
+        client = GitHubClient(self.token, clone_mode=CLONE_MODE_SPARSE)
+        client.clone_repo(self.valid_url, self.target_dir)
+
+        _, kwargs = mock_clone.call_args
+        assert kwargs["filter"] == "blob:none"
+        assert kwargs["no_checkout"] is True
+        assert kwargs["sparse"] is True
+        assert client.has_working_tree is False
+
+
+class TestGitHubClientPartialClone(unittest.TestCase):
+    def setUp(self):
+        """Create local bare repo that allows partial clone"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        work_dir = os.path.join(self.temp_dir.name, "work")
+        bare_dir = os.path.join(self.temp_dir.name, "repo.git")
+        files = {"README.md": "readme", ".gitignore": "*.pyc\n*.log", "src/main.py": "print()", "src/util.py": "x = 1",
+                 "debug.log": "log", "src/.gitignore": "generated_*.py", "src/generated_api.py": "api = 1",
+                 "node_modules/lib/index.js": "module.exports = {}"}
+        for relative_path, content in files.items():
+            path = os.path.join(work_dir, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+        subprocess.run(git + ["init", "-q"], cwd=work_dir, check=True)
+        subprocess.run(git + ["add", "-A"], cwd=work_dir, check=True)
+        subprocess.run(git + ["commit", "-q", "-m", "init"], cwd=work_dir, check=True)
+        subprocess.run(git + ["clone", "-q", "--bare", work_dir, bare_dir], check=True)
+        subprocess.run(git + ["config", "uploadpack.allowfilter", "true"], cwd=bare_dir, check=True)
+        self.repo_url = f"file://{bare_dir}"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _clone(self, clone_mode: str) -> tuple:
+        client = GitHubClient("token", clone_mode=clone_mode)
+        target_dir = os.path.join(self.temp_dir.name, clone_mode)
+        client._clone_from(self.repo_url, target_dir)
+        return client, target_dir
+
+    def test_list_files_without_checkout(self):
+        """Test files are listed from tree while working tree stays empty, skipping ignored files"""
+        client, target_dir = self._clone(CLONE_MODE_BLOBLESS)
+
+        file_paths = client.list_files(target_dir)
+
+        assert file_paths == [
+            os.path.join(target_dir, "README.md"),
+            os.path.join(target_dir, "src/main.py"),
+            os.path.join(target_dir, "src/util.py"),
+        ]
+        assert not os.path.exists(file_paths[0])
+        client.close_blob_reader(target_dir)
+
+    def test_list_files_bare_mode_applies_gitignore(self):
+        """Test bare listing applies repo .gitignore files and ignore patterns like the working tree walk"""
+        client, target_dir = self._clone(CLONE_MODE_BARE)
+
+        assert client.list_files(target_dir) == [
+            os.path.join(target_dir, "README.md"),
+            os.path.join(target_dir, "src/main.py"),
+            os.path.join(target_dir, "src/util.py"),
+        ]
+        assert client.list_files(target_dir, ignore_patterns=()) == [
+            os.path.join(target_dir, "README.md"),
+            os.path.join(target_dir, "node_modules/lib/index.js"),
+            os.path.join(target_dir, "src/main.py"),
+            os.path.join(target_dir, "src/util.py"),
+        ]
+        client.close_blob_reader(target_dir)
+
+    def test_checkout_files_blobless(self):
+        """Test only selected files are checked out in blobless mode"""
+        client, target_dir = self._clone(CLONE_MODE_BLOBLESS)
+
+        client.checkout_files(target_dir, [os.path.join(target_dir, "src/main.py")])
+
+        assert os.path.isfile(os.path.join(target_dir, "src/main.py"))
+        assert not os.path.exists(os.path.join(target_dir, "src/util.py"))
+        assert not os.path.exists(os.path.join(target_dir, "README.md"))
+
+    def test_checkout_files_sparse(self):
+        """Test only selected files are checked out in sparse mode"""
+        client, target_dir = self._clone(CLONE_MODE_SPARSE)
+
+        client.checkout_files(target_dir, [os.path.join(target_dir, "src/util.py")])
+
+        with open(os.path.join(target_dir, "src/util.py")) as f:
+            assert f.read() == "x = 1"
+        assert not os.path.exists(os.path.join(target_dir, "src/main.py"))
+
+    def test_get_blob_shas_without_checkout(self):
+        """Test blob SHAs are read from tree and match git hash-object"""
+        client, target_dir = self._clone(CLONE_MODE_BLOBLESS)
+        main_path = os.path.join(target_dir, "src/main.py")
+
+        blob_shas = client.get_blob_shas(target_dir, [main_path, os.path.join(target_dir, "README.md")])
+
+        expected_sha = subprocess.run(["git", "hash-object", "--stdin"], input=b"print()", capture_output=True,
+                                      check=True).stdout.decode().strip()
+        assert blob_shas[main_path] == expected_sha
+        assert set(blob_shas) == {main_path, os.path.join(target_dir, "README.md")}
+        assert not os.path.exists(main_path)
+
+    def test_read_blob_bare_mode(self):
+        """Test files are read from object database without any checkout"""
+        client, target_dir = self._clone(CLONE_MODE_BARE)
+        file_paths = client.list_files(target_dir)
+        main_path = os.path.join(target_dir, "src/main.py")
+
+        client.checkout_files(target_dir, [main_path])
+
+        assert client.reads_from_object_database
+        assert main_path in file_paths
+        assert not os.path.exists(main_path)
+        assert client.read_blob(target_dir, main_path) == "print()"
+        assert client.read_blob(target_dir, os.path.join(target_dir, "src/util.py"), max_chars=2) == "x ="
+        assert client.read_blob(target_dir, os.path.join(target_dir, "missing.py")) is None
+        client.close_blob_reader(target_dir)
+        assert client._blob_readers == {}
@@ -0,0 +1,63 @@
+import os
+import unittest
+
+from tempfile import TemporaryDirectory
+
+from agent.ignore_rules import IgnoreRules, DEFAULT_IGNORE_PATTERNS
+
+
+class TestIgnoreRules(unittest.TestCase):
+    def test_unanchored_patterns_match_at_any_level(self):
+        """Test patterns without slash match names in any directory"""
+        rules = IgnoreRules.from_patterns(["*.log", "node_modules/"])
+
+        self.assertTrue(rules.is_ignored("debug.log", is_dir=False))
+        self.assertTrue(rules.is_ignored("a/b/debug.log", is_dir=False))
+        self.assertTrue(rules.is_ignored("web/node_modules", is_dir=True))
+        self.assertFalse(rules.is_ignored("web/node_modules", is_dir=False))
+        self.assertFalse(rules.is_ignored("main.py", is_dir=False))
+
+    def test_anchored_patterns_match_relative_to_base(self):
+        """Test patterns with slash match from the .gitignore directory only"""
+        rules = IgnoreRules.from_patterns(["/build", "docs/*.html"], base="sub")
+
+        self.assertTrue(rules.is_ignored("sub/build", is_dir=True))
+        self.assertFalse(rules.is_ignored("sub/pkg/build", is_dir=True))
+        self.assertFalse(rules.is_ignored("build", is_dir=True))
+        self.assertTrue(rules.is_ignored("sub/docs/index.html", is_dir=False))
+        self.assertFalse(rules.is_ignored("sub/docs/api/index.html", is_dir=False))
+
+    def test_double_star(self):
+        """Test ** matches across directories"""
+        rules = IgnoreRules.from_patterns(["**/generated/**", "a/**/z.txt"])
+
+        self.assertTrue(rules.is_ignored("src/generated/x/y.py", is_dir=False))
+        self.assertTrue(rules.is_ignored("a/z.txt", is_dir=False))
+        self.assertTrue(rules.is_ignored("a/b/c/z.txt", is_dir=False))
+
+    def test_negation_last_match_wins(self):
+        """Test negated patterns re-include files"""
+        rules = IgnoreRules.from_patterns(["*.md", "!README.md", "# comment", ""])
+
+        self.assertTrue(rules.is_ignored("CHANGELOG.md", is_dir=False))
+        self.assertFalse(rules.is_ignored("README.md", is_dir=False))
+
+    def test_is_ignored_path_checks_parent_directories(self):
+        """Test file under ignored directory is ignored"""
+        rules = IgnoreRules.from_patterns(DEFAULT_IGNORE_PATTERNS)
+
+        self.assertTrue(rules.is_ignored_path("web/node_modules/react/index.js"))
+        self.assertTrue(rules.is_ignored_path("static/app.min.js"))
+        self.assertFalse(rules.is_ignored_path("src/app.js"))
+
+    def test_extend_from_file(self):
+        """Test patterns are read from .gitignore and missing file keeps rules"""
+        with TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, ".gitignore"), "w") as f:
+                f.write("secret.txt\n")
+            rules = IgnoreRules().extend_from_file(temp_dir, "pkg")
+            empty_rules = IgnoreRules()
+
+            self.assertTrue(rules.is_ignored("pkg/secret.txt", is_dir=False))
+            self.assertFalse(rules.is_ignored("secret.txt", is_dir=False))
+            self.assertIs(empty_rules.extend_from_file(os.path.join(temp_dir, "missing"), ""), empty_rules)
@@ -0,0 +1,143 @@
+import os
+import unittest
+
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from agent.import_graph import build_import_graph, parse_python, parse_javascript, parse_go, parse_java, \
+    ImportGraph
+
+REPO_FILES = {
+    "main.py": "import argparse\nfrom app import core\n\nif __name__ == '__main__':\n    core.run()\n",
+    "app/__init__.py": "",
+    "app/core.py": "from .util import helper\nfrom . import config\n\ndef run():\n    helper()\n",
+    "app/util.py": "import os\nfrom app.config import SETTINGS\n\ndef helper():\n    pass\n",
+    "app/config.py": "SETTINGS = {}\n",
+    "web/index.ts": "import { render } from './view';\nconst api = require('../web/api.js');\n",
+    "web/view.tsx": "import React from 'react';\nexport { api } from './api';\n",
+    "web/api.js": "module.exports = {};\n",
+    "go.mod": "module example.com/tool\n\ngo 1.21\n",
+    "cmd/tool/main.go": 'package main\n\nimport (\n\t"fmt"\n\tlib "example.com/tool/pkg/lib"\n)\n\n'
+                        'func main() {\n\tfmt.Println(lib.Name)\n}\n',
+    "pkg/lib/lib.go": 'package lib\n\nimport "strings"\n\nvar Name = strings.ToUpper("x")\n',
+    "src/com/acme/App.java": "package com.acme;\n\nimport com.acme.model.User;\nimport java.util.List;\n\n"
+                             "public class App {\n    public static void main(String[] args) {}\n}\n",
+    "src/com/acme/model/User.java": "package com.acme.model;\n\npublic class User {}\n",
+}
+
+
+class TestParsers(unittest.TestCase):
+    def test_parse_python_imports_and_main_guard(self):
+        """Test Python imports are parsed with ast and main guard marks entry point"""
+        imports, _, is_entry_point = parse_python(REPO_FILES["main.py"], "main.py")
+
+        self.assertEqual(imports, ["argparse", "app", "app.core"])
+        self.assertTrue(is_entry_point)
+
+    def test_parse_python_cli_decorator_is_entry_point(self):
+        """Test click style command decorator marks entry point"""
+        _, _, is_entry_point = parse_python("import click\n\n@click.command()\ndef cli():\n    pass\n", "cli.py")
+
+        self.assertTrue(is_entry_point)
+
+    def test_parse_python_falls_back_to_regex(self):
+        """Test Python 2 file that does not parse still yields imports"""
+        imports, _, _ = parse_python("import os, sys\nfrom app import core\nprint 'x'\n", "legacy.py")
+
+        self.assertEqual(imports, ["os", "sys", "app", "app.core"])
+
+    def test_parse_python_class_body_imports(self):
+        """Test imports inside class bodies are parsed, imports inside methods are not"""
+        source = "class Config:\n    from app import settings\n\n    def load(self):\n        import json\n"
+
+        imports, _, _ = parse_python(source, "config.py")
+
+        self.assertEqual(imports, ["app", "app.settings"])
+
+    def test_parse_javascript(self):
+        """Test import, export from and require specifiers are parsed"""
+        imports, _, is_entry_point = parse_javascript("#!/usr/bin/env node\n" + REPO_FILES["web/index.ts"],
+                                                      "web/index.ts")
+
+        self.assertEqual(imports, ["./view", "../web/api.js"])
+        self.assertTrue(is_entry_point)
+
+    def test_parse_go(self):
+        """Test Go import block and main package are parsed"""
+        imports, _, is_entry_point = parse_go(REPO_FILES["cmd/tool/main.go"], "cmd/tool/main.go")
+
+        self.assertEqual(imports, ["fmt", "example.com/tool/pkg/lib"])
+        self.assertTrue(is_entry_point)
+
+    def test_parse_java(self):
+        """Test Java package and imports are parsed"""
+        imports, package, is_entry_point = parse_java(REPO_FILES["src/com/acme/App.java"], "src/com/acme/App.java")
+
+        self.assertEqual(imports, ["com.acme.model.User", "java.util.List"])
+        self.assertEqual(package, "com.acme")
+        self.assertTrue(is_entry_point)
+
+
+class TestBuildImportGraph(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        for rel_path, content in REPO_FILES.items():
+            path = os.path.join(self.temp_dir.name, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(content)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_build_import_graph_resolves_repo_imports(self):
+        """Test imports resolve to repo files and third party modules are ignored"""
+        graph = build_import_graph(self.temp_dir.name, sorted(REPO_FILES))
+
+        self.assertEqual(graph.edges["main.py"], {"app/__init__.py", "app/core.py"})
+        self.assertEqual(graph.edges["app/core.py"], {"app/util.py", "app/config.py", "app/__init__.py"})
+        self.assertEqual(graph.edges["app/util.py"], {"app/config.py"})
+        self.assertEqual(graph.edges["web/index.ts"], {"web/view.tsx", "web/api.js"})
+        self.assertEqual(graph.edges["web/view.tsx"], {"web/api.js"})
+        self.assertEqual(graph.edges["cmd/tool/main.go"], {"pkg/lib/lib.go"})
+        self.assertEqual(graph.edges["src/com/acme/App.java"], {"src/com/acme/model/User.java"})
+        self.assertNotIn("go.mod", graph.edges)
+        self.assertEqual(graph.entry_points, {"main.py", "cmd/tool/main.go", "src/com/acme/App.java"})
+
+    def test_stdlib_and_nested_modules_are_not_resolved_by_suffix(self):
+        """Test stdlib imports and modules inside packages are not matched by their bare name"""
+        repo_files = {"main.py": "import logging\nimport util\nimport tools\n", "app/__init__.py": "",
+                      "app/logging.py": "", "app/util.py": "", "src/tools.py": ""}
+        for rel_path, content in repo_files.items():
+            path = os.path.join(self.temp_dir.name, "layout", rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(content)
+
+        graph = build_import_graph(os.path.join(self.temp_dir.name, "layout"), sorted(repo_files))
+
+        self.assertEqual(graph.edges["main.py"], {"src/tools.py"})
+
+    def test_rank_puts_entry_points_and_central_files_first(self):
+        """Test most imported files and entry points rank above leaves"""
+        graph = build_import_graph(self.temp_dir.name, sorted(REPO_FILES))
+        ranking = graph.rank()
+
+        self.assertLess(ranking.index("app/config.py"), ranking.index("app/util.py"))
+        self.assertLess(ranking.index("web/api.js"), ranking.index("web/index.ts"))
+        self.assertEqual(set(ranking[:3]), graph.entry_points)
+        self.assertEqual(len(graph.rank(limit=2)), 2)
+
+    def test_build_import_graph_in_process_pool(self):
+        """Test parallel parsing gives the same graph"""
+        with patch("agent.import_graph.PARALLEL_MIN_FILES", 0), patch("agent.import_graph.PARSE_CHUNK_SIZE", 3):
+            graph = build_import_graph(self.temp_dir.name, sorted(REPO_FILES), max_workers=2)
+
+        self.assertEqual(graph.edges, build_import_graph(self.temp_dir.name, sorted(REPO_FILES)).edges)
+
+    def test_order_by_centrality_keeps_other_files_first(self):
+        """Test files outside of graph keep order before source files ordered by score"""
+        graph = ImportGraph(edges={"a.py": {"b.py"}, "b.py": set()}, entry_points=set())
+
+        self.assertEqual(graph.order_by_centrality(["a.py", "README.md", "b.py", "setup.py"]),
+                         ["README.md", "setup.py", "b.py", "a.py"])
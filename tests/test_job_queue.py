@@ -0,0 +1,122 @@
+import threading
+import time
+import unittest
+
+from unittest.mock import MagicMock
+from agent.batch import STATUS_SUCCESS, STATUS_ERROR
+from agent.job_queue import JobQueue, QueueFullError, STATUS_QUEUED, STATUS_CANCELLED
+
+
+def wait_for_status(job_queue: JobQueue, job_id: str, statuses: tuple, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}")
+
+
+class TestJobQueue(unittest.TestCase):
+    def test_workers_run_jobs_on_shared_graph(self):
+        """Test queued jobs run on warm workers and record results"""
+        graph = MagicMock()
+        graph.invoke.side_effect = lambda state: {**state, "temp_directory_path": "/tmp/readme"}
+        job_queue = JobQueue(graph, workers=2)
+        job_queue.start()
+        try:
+            jobs = [job_queue.submit(f"https://github.com/user/repo{index}") for index in range(4)]
+            results = [wait_for_status(job_queue, job["job_id"], (STATUS_SUCCESS,)) for job in jobs]
+        finally:
+            job_queue.stop()
+
+        self.assertEqual(jobs[0]["status"], STATUS_QUEUED)
+        self.assertEqual(graph.invoke.call_count, 4)
+        self.assertEqual(results[0]["result"]["readme_path"], "/tmp/readme/README.md")
+        stats = job_queue.stats()
+        self.assertEqual(stats["succeeded"], 4)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["busy_workers"], 0)
+
+    def test_failed_job_records_error(self):
+        """Test graph error marks job as failed"""
+        graph = MagicMock()
+        graph.invoke.side_effect = RuntimeError("clone failed")
+        job_queue = JobQueue(graph, workers=1)
+        job_queue.start()
+        try:
+            job = wait_for_status(job_queue, job_queue.submit("https://github.com/user/repo")["job_id"],
+                                  (STATUS_ERROR,))
+        finally:
+            job_queue.stop()
+
+        self.assertEqual(job["result"]["error"], "RuntimeError: clone failed")
+        self.assertEqual(job_queue.stats()["failed"], 1)
+
+    def test_full_queue_rejects_jobs(self):
+        """Test jobs above max queue depth are rejected while workers are busy"""
+        release = threading.Event()
+        graph = MagicMock()
+        graph.invoke.side_effect = lambda state: release.wait() and {**state, "temp_directory_path": "/tmp"}
+        job_queue = JobQueue(graph, workers=1, max_queue_depth=1)
+        job_queue.start()
+        try:
+            running = job_queue.submit("https://github.com/user/running")
+            wait_for_status(job_queue, running["job_id"], ("running",))
+            job_queue.submit("https://github.com/user/queued")
+            with self.assertRaises(QueueFullError):
+                job_queue.submit("https://github.com/user/rejected")
+            self.assertEqual(job_queue.stats()["busy_workers"], 1)
+        finally:
+            release.set()
+            job_queue.stop()
+
+        stats = job_queue.stats()
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(stats["succeeded"], 2)
+
+    def test_stop_cancels_queued_jobs_and_times_out(self):
+        """Test stop cancels jobs that have not started and does not wait past timeout for running ones"""
+        release = threading.Event()
+        graph = MagicMock()
+        graph.invoke.side_effect = lambda state: release.wait() and {**state, "temp_directory_path": "/tmp"}
+        job_queue = JobQueue(graph, workers=1, max_queue_depth=2)
+        job_queue.start()
+        try:
+            running = job_queue.submit("https://github.com/user/running")
+            wait_for_status(job_queue, running["job_id"], ("running",))
+            queued = job_queue.submit("https://github.com/user/queued")
+
+            start = time.monotonic()
+            job_queue.stop(timeout=0.1, cancel_pending=True)
+
+            self.assertLess(time.monotonic() - start, 1.0)
+            self.assertEqual(job_queue.get(queued["job_id"])["status"], STATUS_CANCELLED)
+            self.assertEqual(job_queue.stats()["cancelled"], 1)
+        finally:
+            release.set()
+
+        self.assertEqual(graph.invoke.call_count, 1)
+
+    def test_finished_jobs_are_pruned(self):
+        """Test oldest finished jobs are forgotten above retention limit"""
+        graph = MagicMock()
+        graph.invoke.side_effect = lambda state: {**state, "temp_directory_path": "/tmp"}
+        job_queue = JobQueue(graph, workers=1, max_retained_jobs=2)
+        job_queue.start()
+        try:
+            first = job_queue.submit("https://github.com/user/repo0")
+            wait_for_status(job_queue, first["job_id"], (STATUS_SUCCESS,))
+            second = job_queue.submit("https://github.com/user/repo1")
+            wait_for_status(job_queue, second["job_id"], (STATUS_SUCCESS,))
+            job_queue.submit("https://github.com/user/repo2")
+        finally:
+            job_queue.stop()
+
+        self.assertIsNone(job_queue.get(first["job_id"]))
+        self.assertIsNotNone(job_queue.get(second["job_id"]))
+
+    def test_unsupported_size(self):
+        """Test queue needs at least one worker and one queued job"""
+        with self.assertRaises(Exception):
+            JobQueue(MagicMock(), workers=0)
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import unittest
+
+from unittest.mock import patch
+from agent.file_utils import extract_file_names
+from agent.llm_backends import LLMBackend, StubBackend, StubBackendError, ChatModelBackend, parse_file_tree, \
+    create_backend, LLM_BACKEND_STUB, LLM_BACKEND_LOCAL, LLM_BACKEND_OPENAI, STUB_README, STUB_MODEL_NAME, MODEL_NAME, \
+    TEMPERATURE
+from agent.llm_client import LLMClient
+from agent.prompts import get_essential_files_prompt_template, generate_readme_prompt_template
+from agent.tree_listing import encode_file_tree
+
+
+class TestStubBackend(unittest.TestCase):
+    def test_selection_prompt_gets_listed_files(self):
+        """Test file selection prompt is answered with shallowest listed files as JSON"""
+        rel_paths = ["README.md", "pyproject.toml", "src/app/core.py", "src/app/main.py", "docs/guide.md"]
+        prompt = get_essential_files_prompt_template.format(files=encode_file_tree(rel_paths))
+
+        response = StubBackend().complete(prompt)
+
+        selected = extract_file_names(response)
+        self.assertEqual(selected[:2], ["README.md", "pyproject.toml"])
+        self.assertEqual(sorted(selected), sorted(rel_paths))
+
+    def test_other_prompts_get_readme(self):
+        """Test README prompts are answered with canned README"""
+        prompt = generate_readme_prompt_template.format(all_files_content="--- main.py ---\nprint()\n\n")
+
+        self.assertEqual(StubBackend().complete(prompt), STUB_README)
+
+    @patch("agent.llm_backends.time.sleep")
+    def test_latency_and_jitter_are_deterministic(self, mock_sleep):
+        """Test each call waits fixed latency plus seeded jitter"""
+        delays = []
+        for _ in range(2):
+            backend = StubBackend(latency_seconds=0.2, jitter_seconds=0.1, seed=7)
+            for _ in range(3):
+                backend.complete("prompt")
+            delays.append([call.args[0] for call in mock_sleep.call_args_list[-3:]])
+
+        self.assertEqual(delays[0], delays[1])
+        self.assertTrue(all(0.2 <= delay <= 0.3 for delay in delays[0]))
+        self.assertEqual(backend.calls, 3)
+
+    def test_error_injection(self):
+        """Test configured share of calls fails"""
+        with self.assertRaises(StubBackendError):
+            StubBackend(error_rate=1.0).complete("prompt")
+        self.assertEqual(StubBackend(error_rate=0.0).complete("prompt"), STUB_README)
+        with self.assertRaises(Exception):
+            StubBackend(error_rate=2.0)
+
+    def test_stream_yields_lines(self):
+        """Test stub streams canned README line by line"""
+        chunks = list(StubBackend().stream("prompt"))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), STUB_README)
+
+    def test_acomplete(self):
+        """Test async call answers like sync call"""
+        self.assertEqual(asyncio.run(StubBackend(latency_seconds=0.001).acomplete("prompt")), STUB_README)
+
+    def test_llm_client_uses_stub_backend(self):
+        """Test client invokes backend and names responses by backend model"""
+        client = LLMClient(api_key="", backend=StubBackend())
+
+        self.assertEqual(client.model_name, STUB_MODEL_NAME)
+        self.assertEqual(client.invoke("prompt", token_count=1), STUB_README)
+
+
+class TestParseFileTree(unittest.TestCase):
+    def test_parses_collapsed_directories_and_size_hints(self):
+        """Test encoded tree is parsed back to relative paths"""
+        rel_paths = ["main.py", "src/pkg/deep/mod.py", "src/pkg/deep/util.py", "web/app.js", "web/index.html"]
+        listing = encode_file_tree(rel_paths, sizes={"main.py": 2048, "web/app.js": 100})
+
+        self.assertEqual(sorted(parse_file_tree(listing)), sorted(rel_paths))
+
+    def test_skips_summarized_files(self):
+        """Test summaries and collapsed subtrees are not parsed as files"""
+        rel_paths = ["README.md", "a.py", "b.py", "c.py", "pkg/x/one.py", "pkg/y/two.py"]
+        listing = encode_file_tree(rel_paths, max_files_per_dir=2, max_depth=1)
+
+        self.assertEqual(parse_file_tree(listing), ["README.md", "a.py"])
+
+
+class TestLLMBackend(unittest.TestCase):
+    def test_backend_without_complete_cannot_be_created(self):
+        """Test incomplete backend fails when created instead of on its first call"""
+        class IncompleteBackend(LLMBackend):
+            model_name = "incomplete"
+
+        with self.assertRaises(TypeError):
+            IncompleteBackend()
+
+
+class TestCreateBackend(unittest.TestCase):
+    def test_stub_backend(self):
+        """Test stub backend is created with latency settings"""
+        backend = create_backend(LLM_BACKEND_STUB, stub_latency_seconds=0.5, stub_error_rate=0.1)
+
+        self.assertIsInstance(backend, StubBackend)
+        self.assertEqual((backend.latency_seconds, backend.error_rate), (0.5, 0.1))
+
+    @patch("langchain_openai.ChatOpenAI")
+    def test_openai_backend(self, mock_chat_openai):
+        """Test OpenAI backend wraps ChatOpenAI"""
+        backend = create_backend(LLM_BACKEND_OPENAI, api_key="key")
+
+        mock_chat_openai.assert_called_once_with(model=MODEL_NAME, temperature=TEMPERATURE, api_key="key")
+        self.assertIsInstance(backend, ChatModelBackend)
+
+    @patch("langchain_openai.ChatOpenAI")
+    def test_local_backend(self, mock_chat_openai):
+        """Test local backend points ChatOpenAI at OpenAI-compatible server"""
+        mock_chat_openai.return_value.invoke.return_value.content = json.dumps(["main.py"])
+        backend = create_backend(LLM_BACKEND_LOCAL, model_name="llama3", base_url="http://localhost:8000/v1")
+
+        mock_chat_openai.assert_called_once_with(model="llama3", temperature=TEMPERATURE, api_key="local",
+                                                 base_url="http://localhost:8000/v1")
+        self.assertEqual(backend.model_name, "llama3")
+        self.assertEqual(backend.complete("prompt"), '["main.py"]')
+
+    @patch("langchain_openai.ChatOpenAI")
+    def test_openai_backend_without_client_retries(self, mock_chat_openai):
+        """Test OpenAI client retries are turned off when the request scheduler retries"""
+        create_backend(LLM_BACKEND_OPENAI, api_key="key", max_retries=0)
+
+        self.assertEqual(mock_chat_openai.call_args.kwargs["max_retries"], 0)
+
+    def test_local_backend_requires_base_url(self):
+        """Test local backend without base url fails"""
+        with self.assertRaises(Exception):
+            create_backend(LLM_BACKEND_LOCAL)
+
+    def test_unsupported_backend(self):
+        """Test unknown backend name fails"""
+        with self.assertRaises(Exception):
+            create_backend("anthropic")
@@ -0,0 +1,77 @@
+import os
+import time
+import unittest
+
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from agent.llm_cache import LLMResponseCache
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache", "llm.sqlite3")
+        self.cache = LLMResponseCache(self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_make_key_depends_on_model_temperature_and_prompt(self):
+        """Test key changes with every input"""
+        key = LLMResponseCache.make_key("gpt-4o", 0.3, "prompt")
+
+        assert key == LLMResponseCache.make_key("gpt-4o", 0.3, "prompt")
+        assert key != LLMResponseCache.make_key("gpt-4o-mini", 0.3, "prompt")
+        assert key != LLMResponseCache.make_key("gpt-4o", 0.5, "prompt")
+        assert key != LLMResponseCache.make_key("gpt-4o", 0.3, "other prompt")
+
+    def test_get_and_set_count_hits_and_misses(self):
+        """Test stored response is returned and counters are updated"""
+        assert self.cache.get("key") is None
+
+        self.cache.set("key", "response")
+
+        assert self.cache.get("key") == "response"
+        assert self.cache.stats() == {"hits": 1, "misses": 1, "bypass": False}
+
+    def test_cache_persists_between_instances(self):
+        """Test responses are stored on disk"""
+        self.cache.set("key", "response")
+
+        assert LLMResponseCache(self.path).get("key") == "response"
+
+    def test_expired_entry_is_a_miss(self):
+        """Test entries older than ttl are not returned"""
+        cache = LLMResponseCache(self.path, ttl_seconds=10)
+        cache.set("key", "response")
+
+        with patch("agent.llm_cache.time.time", return_value=time.time() + 11):
+            assert cache.get("key") is None
+
+        assert cache.misses == 1
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test cache keeps at most max entries"""
+        cache = LLMResponseCache(self.path, max_entries=2)
+        now = time.time()
+        with patch("agent.llm_cache.time.time", side_effect=[now - 4, now - 3, now - 2, now - 1]):
+            cache.set("a", "1")
+            cache.set("b", "2")
+            cache.get("a")
+            cache.set("c", "3")
+
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+
+    def test_bypass_skips_reads_but_stores_responses(self):
+        """Test bypass forces fresh responses and refreshes cache"""
+        self.cache.set("key", "old")
+        bypass_cache = LLMResponseCache(self.path, bypass=True)
+
+        assert bypass_cache.get("key") is None
+        bypass_cache.set("key", "new")
+
+        assert self.cache.get("key") == "new"
+        assert bypass_cache.stats() == {"hits": 0, "misses": 0, "bypass": True}
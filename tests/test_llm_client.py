@@ -1,4 +1,8 @@
+import asyncio
+import os
 import unittest
+
+from tempfile import TemporaryDirectory
 from unittest.mock import patch, MagicMock
 from agent.llm_client import (
     LLMClient,
@@ -6,10 +10,23 @@ from agent.llm_client import (
     TEMPERATURE,
     INPUT_TOKEN_LIMIT,
 )
+from agent import tracing
+from agent.llm_backends import StubBackend, STUB_README
+from agent.llm_cache import LLMResponseCache
+from agent.request_scheduler import RequestScheduler
+from agent.token_counter import TokenCounter, get_encoding
+from agent.tracing import SummaryExporter
+from tests.test_token_packer import CharEncoding
 
 
 class TestLLMClient(unittest.TestCase):
-    @patch("agent.llm_client.ChatOpenAI")
+    def setUp(self):
+        get_encoding.cache_clear()
+
+    def tearDown(self):
+        get_encoding.cache_clear()
+
+    @patch("langchain_openai.ChatOpenAI")
     def test_init_sets_model_and_llm(self, mock_chat_openai):
         """Test init client setup"""
         api_key = "api_key"
@@ -20,10 +37,10 @@ class TestLLMClient(unittest.TestCase):
         mock_chat_openai.assert_called_once_with(
             model=MODEL_NAME, temperature=TEMPERATURE, api_key=api_key
         )
-        self.assertIs(client.llm, mock_chat_openai.return_value)
+        self.assertIs(client.backend.llm, mock_chat_openai.return_value)
 
     @patch("agent.llm_client.LLMClient._count_tokens", return_value=5)
-    @patch("agent.llm_client.ChatOpenAI")
+    @patch("langchain_openai.ChatOpenAI")
     def test_invoke_success(self, mock_chat_openai, mock_count_tokens):
         """Test successful LLM invoke"""
         prompt = "My prompt"
@@ -34,7 +51,7 @@ class TestLLMClient(unittest.TestCase):
 
         result = client.invoke(prompt)
 
-        mock_count_tokens.assert_called_once_with(text=prompt, model_name=MODEL_NAME)
+        mock_count_tokens.assert_called_once_with(text=prompt)
 
         invoked_args, _ = mock_chat_openai.return_value.invoke.call_args
         msgs = invoked_args[0]
@@ -44,7 +61,7 @@ class TestLLMClient(unittest.TestCase):
         assert result == "LLM response"
 
     @patch("agent.llm_client.LLMClient._count_tokens", return_value=INPUT_TOKEN_LIMIT + 1)
-    @patch("agent.llm_client.ChatOpenAI")
+    @patch("langchain_openai.ChatOpenAI")
     def test_invoke_exceeds_token_limit(self, mock_chat_openai, mock_count_tokens):
         """Test LLM invoke with exceeding token limit"""
         prompt = "x" * 1000
@@ -56,8 +73,8 @@ class TestLLMClient(unittest.TestCase):
 
         mock_chat_openai.return_value.invoke.assert_not_called()
 
-    @patch("agent.llm_client.ChatOpenAI")
-    @patch("agent.llm_client.tiktoken.encoding_for_model")
+    @patch("langchain_openai.ChatOpenAI")
+    @patch("tiktoken.encoding_for_model")
     def test_count_tokens_uses_tiktoken(self, mock_encoding_for_model, mock_chat_openai):
         """Test tokens count with tiktoken"""
         text = "abcde"
@@ -67,14 +84,145 @@ class TestLLMClient(unittest.TestCase):
 
         client = LLMClient("api_key")
 
-        count = client._count_tokens(text, MODEL_NAME)
+        count = client._count_tokens(text)
 
         mock_encoding_for_model.assert_called_once_with(MODEL_NAME)
-        fake_encoding.encode.assert_called_once_with(text)
+        fake_encoding.encode.assert_called_once_with(text, disallowed_special=())
         assert count == 5
 
+    @patch("langchain_openai.ChatOpenAI")
+    @patch("tiktoken.encoding_for_model")
+    def test_encoding_is_loaded_once(self, mock_encoding_for_model, mock_chat_openai):
+        """Test tokenizer encoding is cached between token counts"""
+        mock_encoding_for_model.return_value.encode.return_value = [1, 2]
+        client = LLMClient("api_key")
+
+        client._count_tokens("ab")
+        client._count_tokens("cd")
+
+        mock_encoding_for_model.assert_called_once_with(MODEL_NAME)
+
+    @patch("agent.llm_client.LLMClient._count_tokens")
+    @patch("langchain_openai.ChatOpenAI")
+    def test_invoke_with_token_count_skips_encoding(self, mock_chat_openai, mock_count_tokens):
+        """Test prompt is not re-encoded when token count is provided"""
+        mock_chat_openai.return_value.invoke.return_value = MagicMock(content="ok")
+        client = LLMClient("api_key")
+
+        assert client.invoke("prompt", token_count=10) == "ok"
+        mock_count_tokens.assert_not_called()
+
+    @patch("agent.llm_client.LLMClient._count_tokens")
+    @patch("langchain_openai.ChatOpenAI")
+    def test_invoke_with_token_count_above_limit(self, mock_chat_openai, mock_count_tokens):
+        """Test provided token count is validated"""
+        client = LLMClient("api_key")
+
+        with self.assertRaises(Exception) as ex:
+            client.invoke("prompt", token_count=INPUT_TOKEN_LIMIT + 1)
+
+        assert str(ex.exception) == "Prompt exceeds token limit"
+        mock_chat_openai.return_value.invoke.assert_not_called()
+
+    @patch("langchain_openai.ChatOpenAI")
+    @patch("tiktoken.encoding_for_model")
+    def test_get_encoding(self, mock_encoding_for_model, mock_chat_openai):
+        """Test encoding of the model is returned"""
+        client = LLMClient("api_key")
+
+        assert client.get_encoding() is mock_encoding_for_model.return_value
+        mock_encoding_for_model.assert_called_once_with(MODEL_NAME)
+
+    @patch("tiktoken.encoding_for_model")
+    def test_stub_backend_needs_no_tokenizer(self, mock_encoding_for_model):
+        """Test stub backend counts tokens without loading tiktoken encoding"""
+        client = LLMClient(api_key="", backend=StubBackend())
+
+        self.assertEqual(client.get_token_counter().count("abcdefgh"), 2)
+        mock_encoding_for_model.assert_not_called()
+
+    def test_injected_encoding_is_used(self):
+        """Test encoding passed to client replaces the backend encoding"""
+        encoding = CharEncoding()
+        client = LLMClient(api_key="", backend=StubBackend(), encoding=encoding)
+
+        self.assertIs(client.get_encoding(), encoding)
+        self.assertEqual(client._count_tokens("abc"), 3)
+
+    @patch("agent.llm_client.LLMClient._count_tokens", return_value=5)
+    @patch("langchain_openai.ChatOpenAI")
+    def test_invoke_uses_response_cache(self, mock_chat_openai, mock_count_tokens):
+        """Test repeated prompt is served from response cache"""
+        mock_chat_openai.return_value.invoke.return_value = MagicMock(content="LLM response")
+        with TemporaryDirectory() as temp_dir:
+            cache = LLMResponseCache(os.path.join(temp_dir, "llm.sqlite3"))
+            client = LLMClient("api_key", response_cache=cache)
+
+            first = client.invoke("prompt")
+            second = client.invoke("prompt")
+
+        assert first == second == "LLM response"
+        mock_chat_openai.return_value.invoke.assert_called_once()
+        assert cache.stats() == {"hits": 1, "misses": 1, "bypass": False}
+
+    def test_invoke_records_tokens_and_cache_hits(self):
+        """Test LLM span records prompt and completion tokens and cache hits"""
+        llm = MagicMock()
+        llm.invoke.return_value = MagicMock(content="LLM response")
+        exporter = SummaryExporter()
+        tracing.add_exporter(exporter)
+        with TemporaryDirectory() as temp_dir:
+            client = LLMClient("api_key", response_cache=LLMResponseCache(os.path.join(temp_dir, "llm.sqlite3")),
+                               llm=llm)
+            client._token_counter = TokenCounter(CharEncoding())
+            try:
+                with tracing.run():
+                    client.invoke("prompt", token_count=7)
+                    client.invoke("prompt", token_count=7)
+            finally:
+                tracing.remove_exporter(exporter)
+
+        stats = exporter.stats()["llm.invoke"]
+        assert stats["count"] == 2
+        assert stats["prompt_tokens"] == 14
+        assert stats["completion_tokens"] == 2 * len("LLM response")
+        assert stats["cache_hits"] == 1
+
+    def test_stream_records_tokens_and_caches_response(self):
+        """Test streamed chunks are recorded on LLM span and cached as one response"""
+        exporter = SummaryExporter()
+        tracing.add_exporter(exporter)
+        with TemporaryDirectory() as temp_dir:
+            client = LLMClient("api_key", response_cache=LLMResponseCache(os.path.join(temp_dir, "llm.sqlite3")),
+                               backend=StubBackend())
+            client._token_counter = TokenCounter(CharEncoding())
+            try:
+                with tracing.run():
+                    chunks = list(client.stream("prompt", token_count=7))
+                    cached_chunks = list(client.stream("prompt", token_count=7))
+            finally:
+                tracing.remove_exporter(exporter)
+
+        assert len(chunks) > 1
+        assert cached_chunks == [STUB_README] == ["".join(chunks)]
+        stats = exporter.stats()["llm.invoke"]
+        assert stats["count"] == 2
+        assert stats["completion_tokens"] == 2 * len(STUB_README)
+        assert stats["cache_hits"] == 1
+        assert "first_chunk_seconds" in stats
+
+    def test_stream_retries_before_first_chunk(self):
+        """Test stream that fails before any output is retried by scheduler"""
+        backend = StubBackend(error_rate=0.5, seed=3)
+        client = LLMClient("api_key", backend=backend,
+                           scheduler=RequestScheduler(max_retries=10, base_delay_seconds=0.001))
+
+        for _ in range(3):
+            assert "".join(client.stream("prompt", token_count=1)) == STUB_README
+        assert backend.calls > 3
+
     @patch("agent.llm_client.LLMClient._count_tokens", return_value=INPUT_TOKEN_LIMIT + 10)
-    @patch("agent.llm_client.ChatOpenAI")
+    @patch("langchain_openai.ChatOpenAI")
     def test_validate_token_count_above_limit(self, mock_chat_openai, mock_count_tokens):
         """Test tokens count above limit"""
         client = LLMClient("api_key")
@@ -82,3 +230,82 @@ class TestLLMClient(unittest.TestCase):
             client._validate_token_count("dummy")
 
         assert str(ex.exception) == "Prompt exceeds token limit"
+
+
+class TestLLMClientAsync(unittest.IsolatedAsyncioTestCase):
+    @patch("agent.llm_client.LLMClient._count_tokens", return_value=5)
+    @patch("langchain_openai.ChatOpenAI")
+    async def test_ainvoke_success(self, mock_chat_openai, mock_count_tokens):
+        """Test successful async LLM invoke"""
+        dummy_response = MagicMock()
+        dummy_response.content = "LLM response"
+
+        async def fake_ainvoke(messages):
+            return dummy_response
+
+        mock_chat_openai.return_value.ainvoke.side_effect = fake_ainvoke
+        client = LLMClient("api_key")
+
+        result = await client.ainvoke("My prompt")
+
+        msgs = mock_chat_openai.return_value.ainvoke.call_args[0][0]
+        assert msgs[0].content == "My prompt"
+        assert result == "LLM response"
+        mock_chat_openai.return_value.invoke.assert_not_called()
+
+    @patch("agent.llm_client.LLMClient._count_tokens", return_value=5)
+    @patch("langchain_openai.ChatOpenAI")
+    async def test_ainvoke_limits_requests_in_flight(self, mock_chat_openai, mock_count_tokens):
+        """Test semaphore bounds number of concurrent requests"""
+        in_flight = {"current": 0, "max": 0}
+
+        async def fake_ainvoke(messages):
+            in_flight["current"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["current"])
+            await asyncio.sleep(0.01)
+            in_flight["current"] -= 1
+            return MagicMock(content="ok")
+
+        mock_chat_openai.return_value.ainvoke.side_effect = fake_ainvoke
+        client = LLMClient("api_key", max_concurrent_requests=2)
+
+        results = await asyncio.gather(*(client.ainvoke("prompt") for _ in range(6)))
+
+        assert results == ["ok"] * 6
+        assert in_flight["max"] == 2
+
+    @patch("agent.llm_client.LLMClient._count_tokens", return_value=5)
+    @patch("langchain_openai.ChatOpenAI")
+    async def test_ainvoke_uses_response_cache(self, mock_chat_openai, mock_count_tokens):
+        """Test repeated async prompt is served from response cache"""
+        async def fake_ainvoke(messages):
+            return MagicMock(content="LLM response")
+
+        mock_chat_openai.return_value.ainvoke.side_effect = fake_ainvoke
+        with TemporaryDirectory() as temp_dir:
+            client = LLMClient("api_key", response_cache=LLMResponseCache(os.path.join(temp_dir, "llm.sqlite3")))
+
+            assert await client.ainvoke("prompt") == "LLM response"
+            assert await client.ainvoke("prompt") == "LLM response"
+
+        assert mock_chat_openai.return_value.ainvoke.call_count == 1
+
+    @patch("agent.llm_client.LLMClient._count_tokens", return_value=INPUT_TOKEN_LIMIT + 1)
+    @patch("langchain_openai.ChatOpenAI")
+    async def test_ainvoke_exceeds_token_limit(self, mock_chat_openai, mock_count_tokens):
+        """Test async LLM invoke with exceeding token limit"""
+        client = LLMClient("api_key")
+
+        with self.assertRaises(Exception) as cm:
+            await client.ainvoke("x")
+        self.assertEqual(str(cm.exception), "Prompt exceeds token limit")
+        mock_chat_openai.return_value.ainvoke.assert_not_called()
+
+    async def test_astream_yields_chunks(self):
+        """Test async stream yields backend chunks as they arrive"""
+        client = LLMClient("api_key", backend=StubBackend(latency_seconds=0.001))
+
+        chunks = [chunk async for chunk in client.astream("prompt", token_count=1)]
+
+        assert len(chunks) > 1
+        assert "".join(chunks) == STUB_README
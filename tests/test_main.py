@@ -0,0 +1,21 @@
+import unittest
+
+from unittest.mock import patch
+from main import parse_args
+
+
+class TestParseArgs(unittest.TestCase):
+    def test_batch_args(self):
+        """Test batch options are parsed"""
+        with patch("sys.argv", ["main.py", "--batch", "repos.txt", "--concurrency", "2"]):
+            args = parse_args()
+
+        assert args.batch == "repos.txt"
+        assert args.concurrency == 2
+
+    def test_rejects_sizes_below_one(self):
+        """Test zero or negative concurrency, workers and queue depth are rejected"""
+        for argv in (["--batch", "repos.txt", "--concurrency", "0"], ["--serve", "--workers", "0"],
+                     ["--serve", "--max-queue", "-1"]):
+            with patch("sys.argv", ["main.py", *argv]), patch("sys.stderr"), self.assertRaises(SystemExit):
+                parse_args()
@@ -0,0 +1,143 @@
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from agent.mirror_cache import MirrorCache, normalize_repo_url
+
+GIT = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+
+
+class TestNormalizeRepoUrl(unittest.TestCase):
+    def test_equivalent_urls_are_normalized(self):
+        """Test credentials, case, trailing slash and .git suffix are dropped"""
+        urls = [
+            "https://github.com/Owner/repo",
+            "https://token@GitHub.com/Owner/repo.git",
+            "https://github.com/Owner/repo/",
+        ]
+        assert {normalize_repo_url(url) for url in urls} == {"https://github.com/Owner/repo"}
+
+
+class TestMirrorCache(unittest.TestCase):
+    def setUp(self):
+        """Create source repo and empty cache"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.temp_dir.name, "source")
+        os.makedirs(self.source_dir)
+        subprocess.run(GIT + ["init", "-q"], cwd=self.source_dir, check=True)
+        self._commit("main.py", "print('v1')")
+        self.repo_url = f"file://{self.source_dir}"
+        self.cache = MirrorCache(cache_dir=os.path.join(self.temp_dir.name, "cache"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _commit(self, file_name: str, content: str, repo_dir: str = None) -> None:
+        repo_dir = repo_dir or self.source_dir
+        with open(os.path.join(repo_dir, file_name), "w") as f:
+            f.write(content)
+        subprocess.run(GIT + ["add", "-A"], cwd=repo_dir, check=True)
+        subprocess.run(GIT + ["commit", "-q", "-m", file_name], cwd=repo_dir, check=True)
+
+    def _read(self, target_dir: str, file_name: str) -> str:
+        with open(os.path.join(target_dir, file_name)) as f:
+            return f.read()
+
+    def _target(self, name: str) -> str:
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_checkout_creates_mirror_and_worktree(self):
+        """Test first checkout creates bare mirror and worktree"""
+        self.cache.checkout(self.repo_url, self._target("run1"))
+
+        assert self._read(self._target("run1"), "main.py") == "print('v1')"
+        mirrors = [name for name in os.listdir(self.cache.cache_dir) if name.endswith(".git")]
+        assert len(mirrors) == 1
+
+    def test_checkout_fetches_new_commits(self):
+        """Test repeated checkout reuses mirror and fetches new commits"""
+        self.cache.checkout(self.repo_url, self._target("run1"))
+        self._commit("main.py", "print('v2')")
+
+        self.cache.checkout(self.repo_url + ".git", self._target("run2"), fetch_url=self.repo_url)
+
+        assert self._read(self._target("run1"), "main.py") == "print('v1')"
+        assert self._read(self._target("run2"), "main.py") == "print('v2')"
+
+    def test_concurrent_checkouts_share_mirror(self):
+        """Test concurrent jobs for the same repo are serialized by the mirror lock"""
+        targets = [self._target(f"run{index}") for index in range(4)]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda target: self.cache.checkout(self.repo_url, target), targets))
+
+        for target in targets:
+            assert self._read(target, "main.py") == "print('v1')"
+
+    def test_evict_removes_least_recently_used_mirror(self):
+        """Test mirrors are evicted in LRU order when cache exceeds max size"""
+        other_dir = os.path.join(self.temp_dir.name, "other")
+        os.makedirs(other_dir)
+        subprocess.run(GIT + ["init", "-q"], cwd=other_dir, check=True)
+        self._commit("lib.py", "x = 1", repo_dir=other_dir)
+        other_url = f"file://{other_dir}"
+
+        self.cache.checkout(self.repo_url, self._target("run1"))
+        self.cache.release(self._target("run1"))
+        old_time = time.time() - 100
+        os.utime(self.cache._mirror_path(self.cache._key(self.repo_url)), (old_time, old_time))
+        self.cache.max_bytes = 1
+
+        self.cache.checkout(other_url, self._target("run2"))
+
+        assert not os.path.exists(self.cache._mirror_path(self.cache._key(self.repo_url)))
+        assert not os.path.exists(self.cache._lock_path(self.cache._key(self.repo_url)))
+        assert os.path.isdir(self.cache._mirror_path(self.cache._key(other_url)))
+
+    def test_evict_skips_mirror_with_live_worktree(self):
+        """Test mirror is kept while a run still uses its worktree and evicted once released"""
+        self.cache.checkout(self.repo_url, self._target("run1"))
+        self.cache.max_bytes = 0
+
+        assert self.cache.evict() == []
+        assert self._read(self._target("run1"), "main.py") == "print('v1')"
+
+        self.cache.release(self._target("run1"))
+
+        assert self.cache.evict() == [self.cache._key(self.repo_url)]
+        assert self._read(self._target("run1"), "main.py") == "print('v1')"
+
+    def test_lock_is_retaken_on_new_file_after_eviction(self):
+        """Test lock held on a lock file removed by eviction is not trusted and taken again on the new file"""
+        key = self.cache._key(self.repo_url)
+        lock_path = self.cache._lock_path(key)
+        real_is_current_lock = MirrorCache._is_current_lock
+        removed = []
+
+        def remove_once(lock_file, path):
+            if not removed:
+                os.remove(path)
+                removed.append(path)
+            return real_is_current_lock(lock_file, path)
+
+        with patch.object(MirrorCache, "_is_current_lock", side_effect=remove_once) as mock_is_current_lock:
+            with self.cache._lock(key) as acquired:
+                assert acquired
+                assert os.path.exists(lock_path)
+
+        assert mock_is_current_lock.call_count == 2
+
+    def test_checkout_tracks_mirror_size(self):
+        """Test mirror size is recorded on checkout instead of walking mirrors on eviction"""
+        self.cache.checkout(self.repo_url, self._target("run1"))
+        key = self.cache._key(self.repo_url)
+
+        with open(os.path.join(self.cache.cache_dir, key + ".size")) as f:
+            size = int(f.read())
+        assert size > 0
+        assert self.cache._read_size(key) == size
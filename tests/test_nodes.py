@@ -1,8 +1,72 @@
+import os
+import subprocess
+import sys
+import threading
 import unittest
-from unittest.mock import patch
+from tempfile import TemporaryDirectory
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from langgraph.types import Send
+
+from agent.nodes import clone_repo_node, select_essential_files_node, readme_file_node, readme_body_node, \
+    resolve_essential_files_node, aresolve_essential_files_node, \
+    aclone_repo_node, aselect_essential_files_node, areadme_body_node, areadme_file_node, route_readme_generation, \
+    summarize_chunk_node, reduce_readme_node, areduce_readme_node, asummarize_chunk_node, summarize_files_node, \
+    asummarize_files_node
+from agent.llm_client import INPUT_TOKEN_LIMIT
+from agent.request_scheduler import PRIORITY_HIGH
+from agent.nodes import PROMPT_SAFETY_MARGIN_TOKENS, IGNORE_PATTERNS, SELECTION_MODE_CHUNKED
+from agent.prompts import get_essential_files_prompt_template, generate_readme_prompt_template, \
+    summarize_files_prompt_template, reduce_readme_prompt_template, narrow_essential_files_prompt_template
+from agent.token_packer import PackResult
+from agent.file_utils import read_file
+from agent.file_ranker import FileRanker, RANKER_MODE_AUTO, RANKER_MODE_SHADOW
+from agent.import_graph import ImportGraph
+from agent.repo_index import FileRecord
+from agent.summary_cache import FileSummaryCache
+from agent.token_counter import TokenCounter
+from tests.test_token_packer import CharEncoding
+from agent.nodes import get_client, get_llm_client, set_clients
+from agent.llm_backends import StubBackend
+from agent.llm_client import LLMClient
+
+
+def setUpModule():
+    """Inject stub LLM client, so that tests need no OpenAI key and patches never create the real client"""
+    set_clients(llm_client=LLMClient(api_key="", backend=StubBackend()))
+
+
+class TestClients(unittest.TestCase):
+    def setUp(self):
+        """Keep shared LLM client"""
+        self.llm_client = get_llm_client()
+
+    def tearDown(self):
+        """Restore shared LLM client"""
+        set_clients(llm_client=self.llm_client)
+
+    def test_set_clients_injects_client(self):
+        """Test injected client is used instead of the one from environment settings"""
+        stub_llm = MagicMock()
+        stub_llm.invoke.return_value.content = "stub response"
+        set_clients(llm_client=LLMClient(api_key="", llm=stub_llm))
+
+        self.assertEqual(get_llm_client().invoke("prompt", token_count=1), "stub response")
+        self.assertIs(get_client("llm_client"), get_llm_client())
+
+    def test_set_clients_unknown_name(self):
+        """Test injecting unknown client fails"""
+        with self.assertRaises(Exception):
+            set_clients(llm=MagicMock())
 
-from agent.nodes import clone_repo_node, select_essential_files_node, readme_file_node, readme_body_node
-from agent.prompts import get_essential_files_prompt_template, generate_readme_prompt_template
+    def test_import_defers_heavy_modules(self):
+        """Test importing CLI does not import LLM, tokenizer and graph libraries"""
+        code = "import sys, main; print(sorted({m.split('.')[0] for m in sys.modules} & " \
+               "{'langchain_openai', 'langgraph', 'tiktoken', 'openai'}))"
+        completed = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(__file__)),
+                                   capture_output=True, text=True, check=True)
+
+        self.assertEqual(completed.stdout.strip(), "[]")
 
 
 class TestCloneRepoNode(unittest.TestCase):
@@ -16,13 +80,18 @@ class TestCloneRepoNode(unittest.TestCase):
             "readme_body": "Initial readme"
         }
 
-    @patch("agent.nodes.get_file_paths")
+    @patch("agent.nodes.index_repo")
     @patch("agent.nodes.create_temp_directory")
     @patch("agent.nodes.github_client.clone_repo")
-    def test_clone_repo_node_success(self, mock_clone_repo, mock_create_tmp, mock_get_paths):
+    def test_clone_repo_node_success(self, mock_clone_repo, mock_create_tmp, mock_index_repo):
         """Test successful clone repo"""
         mock_create_tmp.return_value = "/tmp/testdir"
-        mock_get_paths.return_value = ["file1.py", "file2.md"]
+        mock_index_repo.return_value = [
+            FileRecord("/tmp/testdir", "file1.py", 10, ".py", False),
+            FileRecord("/tmp/testdir", "file2.md", 10, ".md", False),
+            FileRecord("/tmp/testdir", "logo.png", 10, ".png", True),
+            FileRecord("/tmp/testdir", "data.json", 10 ** 9, ".json", False),
+        ]
         state = dict(self.initial_state)
 
         result = clone_repo_node(state)
@@ -35,12 +104,30 @@ class TestCloneRepoNode(unittest.TestCase):
             target_dir="/tmp/testdir"
         )
 
-        mock_get_paths.assert_called_once_with(repo_path="/tmp/testdir")
-        self.assertEqual(result["file_paths"], ["file1.py", "file2.md"])
+        mock_index_repo.assert_called_once_with(repo_path="/tmp/testdir", ignore_patterns=IGNORE_PATTERNS)
+        self.assertEqual(result["file_paths"], ["/tmp/testdir/file1.py", "/tmp/testdir/file2.md"])
+        self.assertEqual(result["file_index"].rel_paths, ["file1.py", "file2.md"])
+        self.assertIsNone(result["import_graph"])
 
         self.assertEqual(result["essential_file_names"], self.initial_state["essential_file_names"])
         self.assertEqual(result["readme_body"], self.initial_state["readme_body"])
 
+    @patch("agent.nodes.IMPORT_GRAPH", True)
+    @patch("agent.nodes.build_import_graph")
+    @patch("agent.nodes.index_repo")
+    @patch("agent.nodes.create_temp_directory", return_value="/tmp/testdir")
+    @patch("agent.nodes.github_client.clone_repo")
+    def test_clone_repo_node_builds_import_graph(self, mock_clone_repo, mock_create_tmp, mock_index_repo,
+                                                 mock_build_import_graph):
+        """Test import graph is built from indexed files when enabled"""
+        mock_index_repo.return_value = [FileRecord("/tmp/testdir", "main.py", 10, ".py", False),
+                                        FileRecord("/tmp/testdir", "README.md", 10, ".md", False)]
+
+        result = clone_repo_node(dict(self.initial_state))
+
+        mock_build_import_graph.assert_called_once_with(repo_path="/tmp/testdir", rel_paths=["main.py", "README.md"])
+        self.assertEqual(result["import_graph"], mock_build_import_graph.return_value)
+
     @patch("agent.nodes.create_temp_directory")
     @patch("agent.nodes.github_client.clone_repo", side_effect=Exception("clone failed"))
     def test_clone_repo_node_clone_failure_propagates(self, mock_clone_repo, mock_create_tmp):
@@ -55,36 +142,49 @@ class TestCloneRepoNode(unittest.TestCase):
         mock_create_tmp.assert_called_once()
         mock_clone_repo.assert_called_once()
 
+    @patch("agent.nodes.index_repo")
+    @patch("agent.nodes.create_temp_directory")
+    @patch("agent.nodes.github_client")
+    def test_clone_repo_node_lists_tree_without_working_tree(self, mock_github_client, mock_create_tmp,
+                                                             mock_index_repo):
+        """Test files are listed from git tree in partial clone modes"""
+        mock_create_tmp.return_value = "/tmp/testdir"
+        mock_github_client.has_working_tree = False
+        mock_github_client.list_files.return_value = ["/tmp/testdir/logo.png", "/tmp/testdir/main.py"]
+
+        result = clone_repo_node(dict(self.initial_state))
+
+        mock_github_client.list_files.assert_called_once_with(repo_path="/tmp/testdir", ignore_patterns=IGNORE_PATTERNS)
+        mock_index_repo.assert_not_called()
+        self.assertEqual(result["file_paths"], ["/tmp/testdir/main.py"])
+
 
 class TestSelectEssentialFilesNode(unittest.TestCase):
     @patch("agent.nodes.extract_file_names")
     @patch("agent.nodes.llm_client.invoke")
-    @patch("agent.nodes.get_file_names")
+    @patch("agent.nodes.llm_client.get_token_counter")
     def test_select_essential_files_node_success(
         self,
-        mock_get_file_names,
+        mock_get_token_counter,
         mock_llm_invoke,
         mock_extract_file_names,
     ):
         """Test successful essential files selection"""
-        file_paths = ["src/main.py", "CHANGELOG.md"]
-        state = {"file_paths": file_paths}
-        file_names = ["main.py", "CHANGELOG.md"]
-        mock_get_file_names.return_value = file_names
+        file_paths = ["/repo/src/main.py", "/repo/CHANGELOG.md"]
+        state = {"temp_directory_path": "/repo", "file_paths": file_paths}
+        mock_get_token_counter.return_value.count.return_value = 10
 
-        result_str = '```json\n["main.py"]\n```'
+        result_str = '```json\n["src/main.py"]\n```'
         mock_llm_invoke.return_value = result_str
 
-        essential_names = ["main.py"]
+        essential_names = ["src/main.py"]
         mock_extract_file_names.return_value = essential_names
 
-        expected_prompt = get_essential_files_prompt_template.format(files=file_names)
+        expected_prompt = get_essential_files_prompt_template.format(files="CHANGELOG.md\nsrc/\n main.py")
 
         new_state = select_essential_files_node(state)
 
-        mock_get_file_names.assert_called_once_with(file_paths=file_paths)
-
-        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt)
+        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt, token_count=20, priority=PRIORITY_HIGH)
 
         mock_extract_file_names.assert_called_once_with(string_input=result_str)
 
@@ -93,54 +193,150 @@ class TestSelectEssentialFilesNode(unittest.TestCase):
 
     @patch("agent.nodes.extract_file_names")
     @patch("agent.nodes.llm_client.invoke")
-    @patch("agent.nodes.get_file_names")
+    @patch("agent.nodes.llm_client.get_token_counter")
     def test_select_essential_files_node_empty_result(
         self,
-        mock_get_file_names,
+        mock_get_token_counter,
         mock_llm_invoke,
         mock_extract_file_names,
     ):
         """Test essential files selection with empty result"""
-        file_paths = []
-        state = {"file_paths": file_paths}
-        mock_get_file_names.return_value = []
+        state = {"temp_directory_path": "/repo", "file_paths": []}
+        mock_get_token_counter.return_value.count.return_value = 10
 
         result_str = "not a json list"
         mock_llm_invoke.return_value = result_str
 
         mock_extract_file_names.return_value = []
 
-        expected_prompt = get_essential_files_prompt_template.format(files=[])
+        expected_prompt = get_essential_files_prompt_template.format(files="")
 
         new_state = select_essential_files_node(state)
 
-        mock_get_file_names.assert_called_once_with(file_paths=file_paths)
-        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt)
+        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt, token_count=20, priority=PRIORITY_HIGH)
         mock_extract_file_names.assert_called_once_with(string_input=result_str)
 
         self.assertEqual(new_state["essential_file_names"], [])
 
+    @patch("agent.nodes.SELECTION_MODE", SELECTION_MODE_CHUNKED)
+    @patch("agent.nodes.partition_file_tree")
+    @patch("agent.nodes.llm_client.invoke")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    def test_select_essential_files_node_selects_from_chunks(self, mock_get_token_counter, mock_llm_invoke,
+                                                             mock_partition_file_tree):
+        """Test listing that does not fit is selected per chunk and narrowed by a final call"""
+        file_paths = ["/repo/README.md", "/repo/a/main.py", "/repo/a/util.py", "/repo/b/app.py"]
+        state = {"temp_directory_path": "/repo", "file_paths": file_paths}
+        mock_get_token_counter.return_value.count.return_value = 10
+        mock_partition_file_tree.return_value = [("README.md\na/\n main.py\n util.py", 30), ("b/\n app.py", 8)]
+        responses = {
+            get_essential_files_prompt_template.format(files="README.md\na/\n main.py\n util.py"):
+                '["README.md", "a/main.py"]',
+            get_essential_files_prompt_template.format(files="b/\n app.py"): '["b/app.py"]',
+        }
+        mock_llm_invoke.side_effect = lambda prompt, token_count, priority: responses.get(prompt, '["a/main.py"]')
+
+        new_state = select_essential_files_node(state)
+
+        self.assertEqual(mock_partition_file_tree.call_args.kwargs["rel_paths"],
+                         ["README.md", "a/main.py", "a/util.py", "b/app.py"])
+        self.assertEqual(mock_llm_invoke.call_count, 3)
+        mock_llm_invoke.assert_called_with(
+            prompt=narrow_essential_files_prompt_template.format(files="README.md\na/\n main.py\nb/\n app.py"),
+            token_count=20, priority=PRIORITY_HIGH)
+        self.assertEqual(new_state["essential_file_names"], ["a/main.py"])
+
+    @patch("agent.nodes.SELECTION_MODE", SELECTION_MODE_CHUNKED)
+    @patch("agent.nodes.llm_client.invoke", return_value='["main.py"]')
+    @patch("agent.nodes.llm_client.get_token_counter")
+    def test_select_essential_files_node_chunked_mode_single_call_when_listing_fits(self, mock_get_token_counter,
+                                                                                   mock_llm_invoke):
+        """Test chunked mode uses one selection call when listing fits"""
+        state = {"temp_directory_path": "/repo", "file_paths": ["/repo/main.py"]}
+        mock_get_token_counter.return_value = TokenCounter(CharEncoding())
+
+        select_essential_files_node(state)
+
+        prompt = get_essential_files_prompt_template.format(files="main.py")
+        mock_llm_invoke.assert_called_once_with(prompt=prompt, token_count=len(prompt), priority=PRIORITY_HIGH)
+
+    @patch("agent.nodes.llm_client.invoke")
+    @patch("agent.nodes.file_ranker", FileRanker(mode=RANKER_MODE_AUTO))
+    def test_select_essential_files_node_skips_llm_for_recognized_layout(self, mock_llm_invoke):
+        """Test confident file ranker selects files without LLM call"""
+        file_paths = ["/repo/README.md", "/repo/pyproject.toml", "/repo/main.py", "/repo/tests/test_main.py"]
+        state = {"temp_directory_path": "/repo", "file_paths": file_paths}
+
+        new_state = select_essential_files_node(state)
+
+        mock_llm_invoke.assert_not_called()
+        self.assertEqual(new_state["essential_file_names"], ["pyproject.toml", "main.py", "README.md"])
+
+    @patch("agent.nodes.llm_client.invoke")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.file_ranker", FileRanker(mode=RANKER_MODE_AUTO, max_candidate_files=2))
+    def test_select_essential_files_node_lists_candidates_for_ambiguous_layout(self, mock_get_token_counter,
+                                                                              mock_llm_invoke):
+        """Test file ranker without confidence lists only candidate files to LLM"""
+        file_paths = ["/repo/README.md", "/repo/main.py", "/repo/util.py", "/repo/yarn.lock"]
+        state = {"temp_directory_path": "/repo", "file_paths": file_paths}
+        mock_get_token_counter.return_value.count.return_value = 10
+        mock_llm_invoke.return_value = '["main.py"]'
+
+        new_state = select_essential_files_node(state)
+
+        expected_prompt = get_essential_files_prompt_template.format(files="README.md\nmain.py")
+        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt, token_count=20, priority=PRIORITY_HIGH)
+        self.assertEqual(new_state["essential_file_names"], ["main.py"])
+
+    @patch("agent.nodes.llm_client.invoke")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    def test_select_essential_files_node_records_agreement_in_shadow_mode(self, mock_get_token_counter,
+                                                                          mock_llm_invoke):
+        """Test shadow mode asks LLM with full listing and records agreement"""
+        file_ranker = FileRanker(mode=RANKER_MODE_SHADOW)
+        file_paths = ["/repo/README.md", "/repo/setup.py", "/repo/main.py", "/repo/docs/usage.md"]
+        state = {"temp_directory_path": "/repo", "file_paths": file_paths}
+        mock_get_token_counter.return_value.count.return_value = 10
+        mock_llm_invoke.return_value = '["setup.py", "main.py", "docs/usage.md"]'
+
+        with patch("agent.nodes.file_ranker", file_ranker):
+            new_state = select_essential_files_node(state)
+
+        expected_prompt = get_essential_files_prompt_template.format(
+            files="README.md\nmain.py\nsetup.py\ndocs/\n usage.md")
+        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt, token_count=20, priority=PRIORITY_HIGH)
+        self.assertEqual(new_state["essential_file_names"], ["setup.py", "main.py", "docs/usage.md"])
+        self.assertEqual(file_ranker.stats()["comparisons"], 1)
+        self.assertEqual(file_ranker.stats()["mean_agreement"], 0.5)
+
 
 class TestReadmeBodyNode(unittest.TestCase):
     @patch("agent.nodes.llm_client.invoke")
-    @patch("agent.nodes.merge_files")
-    @patch("agent.nodes.get_essential_file_paths")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.merge_file_contents")
+    @patch("agent.nodes.pack_files")
     def test_readme_body_node_success(
         self,
-        mock_get_essential_paths,
-        mock_merge_files,
+        mock_pack_files,
+        mock_merge_file_contents,
+        mock_get_token_counter,
         mock_llm_invoke,
     ):
         """Test successful readme body node creation"""
         state = {
-            "essential_file_names": ["file1.txt", "file2.md"],
-            "file_paths": ["repo/file1.txt", "repo/file2.md", "repo/file3.py"]
+            "temp_directory_path": "repo",
+            "essential_file_paths": ["repo/file2.md", "repo/file1.txt"],
+            "essential_file_token_counts": [("repo/file2.md", 20), ("repo/file1.txt", 30)]
         }
-        essential_paths = ["repo/file1.txt", "repo/file2.md"]
-        mock_get_essential_paths.return_value = essential_paths
+        mock_get_token_counter.return_value.count.return_value = 100
+
+        file_contents = [("repo/file2.md", "Content of file2"), ("repo/file1.txt", "Content of file1")]
+        mock_pack_files.return_value = PackResult(file_contents=file_contents, token_count=40,
+                                                  truncated_file_paths=["repo/file1.txt"])
 
         merged_content = "Content of file1 and file2"
-        mock_merge_files.return_value = merged_content
+        mock_merge_file_contents.return_value = merged_content
 
         expected_prompt = generate_readme_prompt_template.format(
             all_files_content=merged_content
@@ -150,33 +346,38 @@ class TestReadmeBodyNode(unittest.TestCase):
 
         new_state = readme_body_node(state)
 
-        mock_get_essential_paths.assert_called_once_with(
-            file_names=state["essential_file_names"],
-            file_paths=state["file_paths"]
+        mock_pack_files.assert_called_once_with(
+            file_paths=["repo/file2.md", "repo/file1.txt"],
+            token_budget=INPUT_TOKEN_LIMIT - 100 - PROMPT_SAFETY_MARGIN_TOKENS,
+            token_counter=mock_get_token_counter.return_value,
+            file_reader=read_file,
+            file_token_counts={"repo/file2.md": 20, "repo/file1.txt": 30}
         )
-
-        mock_merge_files.assert_called_once_with(essential_paths)
-        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt)
+        mock_merge_file_contents.assert_called_once_with(file_contents)
+        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt, token_count=140)
 
         self.assertIn("readme_body", new_state)
         self.assertEqual(new_state["readme_body"], generated_readme)
+        self.assertEqual(new_state["truncated_file_paths"], ["repo/file1.txt"])
+        self.assertEqual(new_state["dropped_file_paths"], [])
 
     @patch("agent.nodes.llm_client.invoke")
-    @patch("agent.nodes.merge_files")
-    @patch("agent.nodes.get_essential_file_paths")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.pack_files")
     def test_readme_body_node_empty_essential_files(
         self,
-        mock_get_essential_paths,
-        mock_merge_files,
+        mock_pack_files,
+        mock_get_token_counter,
         mock_llm_invoke,
     ):
         """Test readme body node creation with empty essential files"""
         state = {
-            "essential_file_names": [],
-            "file_paths": ["repo/file1.txt", "repo/file2.md"]
+            "temp_directory_path": "repo",
+            "essential_file_paths": [],
+            "essential_file_token_counts": []
         }
-        mock_get_essential_paths.return_value = []
-        mock_merge_files.return_value = ""
+        mock_get_token_counter.return_value.count.return_value = 100
+        mock_pack_files.return_value = PackResult()
 
         expected_prompt = generate_readme_prompt_template.format(
             all_files_content=""
@@ -185,15 +386,223 @@ class TestReadmeBodyNode(unittest.TestCase):
 
         new_state = readme_body_node(state)
 
-        mock_get_essential_paths.assert_called_once_with(
-            file_names=[],
-            file_paths=state["file_paths"]
-        )
-        mock_merge_files.assert_called_once_with([])
-        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt)
+        self.assertEqual(mock_pack_files.call_args.kwargs["file_paths"], [])
+        mock_llm_invoke.assert_called_once_with(prompt=expected_prompt, token_count=100)
 
         self.assertEqual(new_state["readme_body"], "")
 
+    @patch("agent.nodes.llm_client.invoke", return_value="README")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.pack_files", return_value=PackResult())
+    @patch("agent.nodes.github_client")
+    def test_readme_body_node_reads_from_object_database(self, mock_github_client, mock_pack_files,
+                                                         mock_get_token_counter, mock_llm_invoke):
+        """Test files are read through git blob reader in bare mode"""
+        mock_github_client.has_working_tree = False
+        mock_github_client.reads_from_object_database = True
+        mock_get_token_counter.return_value.count.return_value = 100
+        state = {"temp_directory_path": "/tmp/repo", "essential_file_paths": ["/tmp/repo/main.py"],
+                 "essential_file_token_counts": [("/tmp/repo/main.py", 10)]}
+
+        readme_body_node(state)
+
+        file_reader = mock_pack_files.call_args.kwargs["file_reader"]
+        file_reader("/tmp/repo/main.py", max_chars=10)
+        mock_github_client.read_blob.assert_called_once_with("/tmp/repo", "/tmp/repo/main.py", max_chars=10)
+
+    @patch("agent.nodes.README_STREAMING", True)
+    @patch("agent.nodes._build_readme_prompt", return_value=("prompt", 5))
+    @patch("agent.nodes.llm_client.stream", return_value=iter(["# Title\n", "Body"]))
+    @patch("agent.nodes.create_readme")
+    def test_readme_body_node_streams_to_file(self, mock_create_readme, mock_llm_stream, mock_build_readme_prompt):
+        """Test streaming mode writes README as chunks arrive instead of keeping the body in state"""
+        with TemporaryDirectory() as temp_dir:
+            state = {"temp_directory_path": temp_dir, "readme_body": ""}
+
+            new_state = readme_file_node(readme_body_node(state))
+
+            with open(os.path.join(temp_dir, "README.md"), encoding="utf-8") as file:
+                self.assertEqual(file.read(), "# Title\nBody")
+        mock_llm_stream.assert_called_once_with(prompt="prompt", token_count=5)
+        mock_create_readme.assert_not_called()
+        self.assertTrue(new_state["readme_streamed"])
+        self.assertEqual(new_state["readme_body"], "")
+
+
+class TestResolveEssentialFilesNode(unittest.TestCase):
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.count_file_tokens", return_value=[("/tmp/repo/main.py", 10)])
+    @patch("agent.nodes.github_client")
+    def test_resolve_essential_files_node_checks_out_and_counts_once(self, mock_github_client,
+                                                                     mock_count_file_tokens, mock_get_token_counter):
+        """Test essential files are resolved, checked out in partial clone modes and counted once"""
+        state = {
+            "essential_file_names": ["main.py"],
+            "file_paths": ["/tmp/repo/main.py", "/tmp/repo/util.py"],
+            "temp_directory_path": "/tmp/repo"
+        }
+        mock_github_client.has_working_tree = False
+        mock_get_token_counter.return_value.count.return_value = 0
+
+        new_state = resolve_essential_files_node(state)
+        route_readme_generation(new_state)
+
+        mock_github_client.checkout_files.assert_called_once_with(
+            repo_path="/tmp/repo", file_paths=["/tmp/repo/main.py"]
+        )
+        mock_count_file_tokens.assert_called_once()
+        self.assertEqual(new_state["essential_file_paths"], ["/tmp/repo/main.py"])
+        self.assertEqual(new_state["essential_file_token_counts"], [("/tmp/repo/main.py", 10)])
+
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.count_file_tokens", return_value=[])
+    def test_resolve_essential_files_node_orders_central_files_first(self, mock_count_file_tokens,
+                                                                     mock_get_token_counter):
+        """Test import graph orders essential source files by centrality"""
+        import_graph = ImportGraph(edges={"main.py": {"core.py"}, "core.py": set()}, entry_points=set())
+        state = {"temp_directory_path": "/repo", "file_paths": ["/repo/main.py", "/repo/core.py", "/repo/setup.py"],
+                 "essential_file_names": ["main.py", "setup.py", "core.py"], "import_graph": import_graph}
+
+        new_state = resolve_essential_files_node(state)
+
+        self.assertEqual(new_state["essential_file_paths"], ["/repo/setup.py", "/repo/core.py", "/repo/main.py"])
+
+    @patch("agent.nodes.count_file_tokens")
+    @patch("agent.nodes.summary_cache")
+    def test_resolve_essential_files_node_skips_counting_with_summary_cache(self, _, mock_count_file_tokens):
+        """Test token counts are not needed when files are summarized one by one"""
+        state = {"temp_directory_path": "/repo", "file_paths": ["/repo/a.py"], "essential_file_names": ["a.py"]}
+
+        new_state = resolve_essential_files_node(state)
+
+        mock_count_file_tokens.assert_not_called()
+        self.assertEqual(new_state["essential_file_paths"], ["/repo/a.py"])
+        self.assertIsNone(new_state["essential_file_token_counts"])
+
+
+class TestRouteReadmeGeneration(unittest.TestCase):
+    @patch("agent.nodes.llm_client.get_token_counter")
+    def test_small_repo_uses_single_call(self, mock_get_token_counter):
+        """Test essential files within budget are routed to readme body node"""
+        mock_get_token_counter.return_value.count.return_value = 0
+        state = {"temp_directory_path": "/repo", "essential_file_token_counts": [("/repo/a.py", 100),
+                                                                                 ("/repo/b.py", 100)]}
+
+        assert route_readme_generation(state) == "readme_body_node"
+
+    @patch("agent.nodes.llm_client.get_token_counter")
+    def test_large_repo_is_split_into_chunks(self, mock_get_token_counter):
+        """Test essential files over budget are sent to parallel chunk summaries with their token counts"""
+        mock_get_token_counter.return_value.count.return_value = 0
+        chunk_budget = INPUT_TOKEN_LIMIT - PROMPT_SAFETY_MARGIN_TOKENS
+        state = {"temp_directory_path": "/repo", "essential_file_token_counts": [
+            ("/repo/a.py", chunk_budget - 10), ("/repo/b.py", 5), ("/repo/c.py", chunk_budget)
+        ]}
+
+        result = route_readme_generation(state)
+
+        assert result == [
+            Send("summarize_chunk_node", {"temp_directory_path": "/repo", "chunk_index": 0,
+                                          "chunk_file_paths": ["/repo/a.py", "/repo/b.py"],
+                                          "chunk_file_token_counts": {"/repo/a.py": chunk_budget - 10,
+                                                                      "/repo/b.py": 5}}),
+            Send("summarize_chunk_node", {"temp_directory_path": "/repo", "chunk_index": 1,
+                                          "chunk_file_paths": ["/repo/c.py"],
+                                          "chunk_file_token_counts": {"/repo/c.py": chunk_budget}}),
+        ]
+
+
+class TestMapReduceNodes(unittest.TestCase):
+    @patch("agent.nodes.llm_client.invoke", return_value="chunk summary")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.pack_files")
+    def test_summarize_chunk_node(self, mock_pack_files, mock_get_token_counter, mock_llm_invoke):
+        """Test chunk files are packed and summarized"""
+        mock_get_token_counter.return_value.count.return_value = 100
+        mock_pack_files.return_value = PackResult(file_contents=[("/repo/a.py", "print()")], token_count=10)
+
+        result = summarize_chunk_node({"chunk_index": 2, "chunk_file_paths": ["/repo/a.py"]})
+
+        self.assertEqual(mock_pack_files.call_args.kwargs["file_paths"], ["/repo/a.py"])
+        mock_llm_invoke.assert_called_once_with(
+            prompt=summarize_files_prompt_template.format(all_files_content="--- a.py ---\nprint()\n\n"),
+            token_count=110
+        )
+        self.assertEqual(result, {"chunk_summaries": {2: ("part 3", "chunk summary")}})
+
+    @patch("agent.nodes.llm_client.invoke", return_value="README")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.pack_contents")
+    def test_reduce_readme_node(self, mock_pack_contents, mock_get_token_counter, mock_llm_invoke):
+        """Test chunk summaries are combined in chunk order"""
+        state = {"chunk_summaries": {1: ("part 2", "second"), 0: ("part 1", "first")}}
+        mock_get_token_counter.return_value.count.return_value = 100
+        mock_pack_contents.side_effect = lambda file_contents, token_budget, token_counter: PackResult(
+            file_contents=file_contents, token_count=20
+        )
+
+        result = reduce_readme_node(state)
+
+        self.assertEqual(mock_pack_contents.call_args.kwargs["file_contents"],
+                         [("part 1", "first"), ("part 2", "second")])
+        mock_llm_invoke.assert_called_once_with(prompt=reduce_readme_prompt_template.format(
+            summaries="--- part 1 ---\nfirst\n\n--- part 2 ---\nsecond\n\n"
+        ), token_count=120)
+        self.assertEqual(result["readme_body"], "README")
+
+
+class TestSummarizeFilesNode(unittest.TestCase):
+    def setUp(self):
+        self.state = {
+            "temp_directory_path": "/repo",
+            "essential_file_paths": ["/repo/a.py", "/repo/b.py"],
+        }
+
+    @patch("agent.nodes.summary_cache")
+    def test_route_to_summarize_files_node_with_summary_cache(self, _):
+        """Test router uses per-file summaries when summary cache is configured"""
+        self.assertEqual(route_readme_generation(self.state), "summarize_files_node")
+
+    @patch("agent.nodes.llm_client.invoke", return_value="b summary")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.pack_files", return_value=PackResult())
+    @patch("agent.nodes.summary_cache")
+    @patch("agent.nodes.github_client")
+    def test_summarize_files_node_only_summarizes_changed_files(self, mock_github_client, mock_summary_cache,
+                                                                mock_pack_files, mock_get_token_counter,
+                                                                mock_llm_invoke):
+        """Test cached summaries are reused and only missing ones are generated and stored"""
+        mock_github_client.has_working_tree = True
+        mock_github_client.get_blob_shas.return_value = {"/repo/a.py": "sha-a", "/repo/b.py": "sha-b"}
+        mock_get_token_counter.return_value.count.return_value = 100
+        model_name = get_llm_client().model_name
+        key_a = FileSummaryCache.make_summary_key("sha-a", "a.py", model_name, summarize_files_prompt_template)
+        key_b = FileSummaryCache.make_summary_key("sha-b", "b.py", model_name, summarize_files_prompt_template)
+        mock_summary_cache.get_many.return_value = {key_a: "a summary"}
+
+        result = summarize_files_node(self.state)
+
+        mock_pack_files.assert_called_once()
+        self.assertEqual(mock_pack_files.call_args.kwargs["file_paths"], ["/repo/b.py"])
+        mock_llm_invoke.assert_called_once()
+        mock_summary_cache.set_many.assert_called_once_with({key_b: "b summary"})
+        self.assertEqual(result["chunk_summaries"], {0: ("a.py", "a summary"), 1: ("b.py", "b summary")})
+
+    @patch("agent.nodes.llm_client.invoke")
+    @patch("agent.nodes.summary_cache")
+    @patch("agent.nodes.github_client")
+    def test_summarize_files_node_all_cached(self, mock_github_client, mock_summary_cache, mock_llm_invoke):
+        """Test no LLM call is made when all summaries are cached"""
+        mock_github_client.has_working_tree = True
+        mock_github_client.get_blob_shas.return_value = {"/repo/a.py": "sha-a", "/repo/b.py": "sha-b"}
+        mock_summary_cache.get_many.side_effect = lambda keys: {key: "summary" for key in keys}
+
+        result = summarize_files_node(self.state)
+
+        mock_llm_invoke.assert_not_called()
+        mock_summary_cache.set_many.assert_called_once_with({})
+        self.assertEqual(len(result["chunk_summaries"]), 2)
+
 
 class TestReadmeFileNode(unittest.TestCase):
     @patch("agent.nodes.create_readme")
@@ -226,4 +635,158 @@ class TestReadmeFileNode(unittest.TestCase):
             content="",
             target_dir="/tmp/empty"
         )
-        self.assertIs(result, state)
\ No newline at end of file
+        self.assertIs(result, state)
+
+class TestAsyncNodes(unittest.IsolatedAsyncioTestCase):
+    @patch("agent.nodes.index_repo", return_value=[FileRecord("/tmp/testdir", "main.py", 10, ".py", False)])
+    @patch("agent.nodes.create_temp_directory", return_value="/tmp/testdir")
+    @patch("agent.nodes.github_client.clone_repo")
+    async def test_aclone_repo_node(self, mock_clone_repo, mock_create_tmp, mock_index_repo):
+        """Test async clone repo runs clone off the event loop"""
+        result = await aclone_repo_node({"repo_url": "https://github.com/user/repo.git"})
+
+        mock_clone_repo.assert_called_once_with(repo_url="https://github.com/user/repo.git",
+                                                target_dir="/tmp/testdir")
+        self.assertEqual(result["file_paths"], ["/tmp/testdir/main.py"])
+
+    @patch("agent.nodes.llm_client.ainvoke", new_callable=AsyncMock, return_value='["main.py"]')
+    @patch("agent.nodes.llm_client.get_token_counter")
+    async def test_aselect_essential_files_node(self, mock_get_token_counter, mock_ainvoke):
+        """Test async essential files selection uses async LLM call"""
+        state = {"temp_directory_path": "/repo", "file_paths": ["/repo/src/main.py", "/repo/CHANGELOG.md"]}
+        mock_get_token_counter.return_value.count.return_value = 10
+
+        result = await aselect_essential_files_node(state)
+
+        mock_ainvoke.assert_awaited_once_with(
+            prompt=get_essential_files_prompt_template.format(files="CHANGELOG.md\nsrc/\n main.py"), token_count=20,
+            priority=PRIORITY_HIGH
+        )
+        self.assertEqual(result["essential_file_names"], ["main.py"])
+
+    @patch("agent.nodes.SELECTION_MODE", SELECTION_MODE_CHUNKED)
+    @patch("agent.nodes.partition_file_tree", return_value=[("a/\n main.py", 10), ("b/\n app.py", 10)])
+    @patch("agent.nodes.llm_client.ainvoke", new_callable=AsyncMock)
+    @patch("agent.nodes.llm_client.get_token_counter")
+    async def test_aselect_essential_files_node_selects_from_chunks(self, mock_get_token_counter, mock_ainvoke,
+                                                                    mock_partition_file_tree):
+        """Test async chunked selection awaits chunk calls together before narrowing"""
+        state = {"temp_directory_path": "/repo", "file_paths": ["/repo/a/main.py", "/repo/b/app.py"]}
+        mock_get_token_counter.return_value.count.return_value = 10
+        mock_ainvoke.side_effect = ['["a/main.py"]', '["b/app.py"]', '["b/app.py"]']
+
+        result = await aselect_essential_files_node(state)
+
+        self.assertEqual(mock_ainvoke.await_count, 3)
+        mock_ainvoke.assert_awaited_with(
+            prompt=narrow_essential_files_prompt_template.format(files="a/\n main.py\nb/\n app.py"), token_count=20,
+            priority=PRIORITY_HIGH)
+        self.assertEqual(result["essential_file_names"], ["b/app.py"])
+
+    @patch("agent.nodes.llm_client.ainvoke", new_callable=AsyncMock, return_value="README")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.merge_file_contents", return_value="merged")
+    @patch("agent.nodes.pack_files")
+    async def test_areadme_body_node(self, mock_pack_files, mock_merge_file_contents, mock_get_token_counter,
+                                     mock_ainvoke):
+        """Test async readme body generation"""
+        state = {"temp_directory_path": "/repo", "essential_file_paths": ["/repo/main.py"],
+                 "essential_file_token_counts": [("/repo/main.py", 5)]}
+        mock_get_token_counter.return_value.count.return_value = 100
+        mock_pack_files.return_value = PackResult(file_contents=[("/repo/main.py", "print()")], token_count=5)
+
+        result = await areadme_body_node(state)
+
+        self.assertEqual(mock_pack_files.call_args.kwargs["file_paths"], ["/repo/main.py"])
+        mock_merge_file_contents.assert_called_once_with([("/repo/main.py", "print()")])
+        mock_ainvoke.assert_awaited_once_with(
+            prompt=generate_readme_prompt_template.format(all_files_content="merged"), token_count=105
+        )
+        self.assertEqual(result["readme_body"], "README")
+
+    @patch("agent.nodes.llm_client.ainvoke", new_callable=AsyncMock, return_value="chunk summary")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.pack_files", return_value=PackResult())
+    async def test_asummarize_chunk_node(self, mock_pack_files, mock_get_token_counter, mock_ainvoke):
+        """Test async chunk summary"""
+        mock_get_token_counter.return_value.count.return_value = 100
+        result = await asummarize_chunk_node({"chunk_index": 0, "chunk_file_paths": []})
+
+        mock_ainvoke.assert_awaited_once()
+        self.assertEqual(result, {"chunk_summaries": {0: ("part 1", "chunk summary")}})
+
+    @patch("agent.nodes.llm_client.ainvoke", new_callable=AsyncMock, return_value="summary")
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.pack_files", return_value=PackResult())
+    @patch("agent.nodes.summary_cache")
+    @patch("agent.nodes.github_client")
+    async def test_asummarize_files_node(self, mock_github_client, mock_summary_cache, mock_pack_files,
+                                         mock_get_token_counter, mock_ainvoke):
+        """Test async per-file summaries are generated for cache misses"""
+        mock_github_client.has_working_tree = True
+        mock_github_client.get_blob_shas.return_value = {"/repo/a.py": "sha-a"}
+        mock_get_token_counter.return_value.count.return_value = 100
+        mock_summary_cache.get_many.return_value = {}
+        state = {"temp_directory_path": "/repo", "essential_file_paths": ["/repo/a.py"]}
+
+        result = await asummarize_files_node(state)
+
+        mock_ainvoke.assert_awaited_once()
+        mock_summary_cache.set_many.assert_called_once()
+        self.assertEqual(result["chunk_summaries"], {0: ("a.py", "summary")})
+
+    @patch("agent.nodes.README_STREAMING", True)
+    @patch("agent.nodes._build_readme_prompt", return_value=("prompt", 5))
+    @patch("agent.nodes.llm_client.astream")
+    async def test_areadme_body_node_streams_to_file(self, mock_llm_astream, mock_build_readme_prompt):
+        """Test async streaming mode writes README as chunks arrive"""
+        async def chunks():
+            for chunk in ["# Title\n", "Body"]:
+                yield chunk
+
+        mock_llm_astream.return_value = chunks()
+        with TemporaryDirectory() as temp_dir:
+            result = await areadme_body_node({"temp_directory_path": temp_dir, "readme_body": ""})
+
+            with open(os.path.join(temp_dir, "README.md"), encoding="utf-8") as file:
+                self.assertEqual(file.read(), "# Title\nBody")
+        self.assertTrue(result["readme_streamed"])
+
+    @patch("agent.nodes.llm_client.get_token_counter")
+    @patch("agent.nodes.count_file_tokens", return_value=[("/repo/main.py", 5)])
+    async def test_aresolve_essential_files_node(self, mock_count_file_tokens, mock_get_token_counter):
+        """Test async resolution stores essential file paths and token counts"""
+        state = {"temp_directory_path": "/repo", "file_paths": ["/repo/main.py"], "essential_file_names": ["main.py"]}
+
+        result = await aresolve_essential_files_node(state)
+
+        self.assertEqual(result["essential_file_paths"], ["/repo/main.py"])
+        self.assertEqual(result["essential_file_token_counts"], [("/repo/main.py", 5)])
+
+    @patch("agent.nodes.llm_client.ainvoke", new_callable=AsyncMock, return_value="README")
+    @patch("agent.nodes._build_reduce_prompt")
+    async def test_areduce_readme_node_builds_prompt_off_event_loop(self, mock_build_reduce_prompt, mock_ainvoke):
+        """Test reduce prompt is counted and packed in a worker thread"""
+        prompt_threads = []
+
+        def build_reduce_prompt(state):
+            prompt_threads.append(threading.current_thread())
+            return "prompt", 10
+
+        mock_build_reduce_prompt.side_effect = build_reduce_prompt
+
+        result = await areduce_readme_node({"chunk_summaries": {0: ("a.py", "summary")}})
+
+        self.assertIsNot(prompt_threads[0], threading.current_thread())
+        mock_ainvoke.assert_awaited_once_with(prompt="prompt", token_count=10)
+        self.assertEqual(result["readme_body"], "README")
+
+    @patch("agent.nodes.create_readme")
+    async def test_areadme_file_node(self, mock_create_readme):
+        """Test async readme file creation"""
+        state = {"readme_body": "README", "temp_directory_path": "/tmp/testdir"}
+
+        result = await areadme_file_node(state)
+
+        mock_create_readme.assert_called_once_with(content="README", target_dir="/tmp/testdir")
+        self.assertIs(result, state)
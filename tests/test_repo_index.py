@@ -0,0 +1,104 @@
+import os
+import unittest
+
+from tempfile import TemporaryDirectory
+
+from agent.repo_index import FileRecord, index_repo, filter_records, is_binary_extension
+
+
+class TestIndexRepo(unittest.TestCase):
+    def setUp(self):
+        """Create repo tree with text, binary, ignored and git files"""
+        self.temp_dir = TemporaryDirectory()
+        self.repo_path = self.temp_dir.name
+        files = {
+            "README.md": b"# readme",
+            ".gitignore": b"*.pyc",
+            "src/main.py": b"print()",
+            "src/data.raw": b"abc\0def",
+            "assets/logo.png": b"text pretending to be png",
+            ".git/HEAD": b"ref: refs/heads/main",
+            "empty.txt": b"",
+        }
+        for relative_path, content in files.items():
+            path = os.path.join(self.repo_path, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_index_repo_records(self):
+        """Test records are sorted, skip git files and carry size, extension and binary flag"""
+        records = index_repo(self.repo_path)
+
+        self.assertEqual([record.rel_path for record in records],
+                         ["README.md", "assets/logo.png", "empty.txt", "src/data.raw", "src/main.py"])
+        self.assertEqual(records[4], FileRecord(self.repo_path, "src/main.py", 7, ".py", False))
+        self.assertEqual(records[4].path, os.path.join(self.repo_path, "src/main.py"))
+        self.assertTrue(records[1].is_binary)
+        self.assertFalse(records[2].is_binary)
+        self.assertTrue(records[3].is_binary)
+
+    def test_index_repo_without_sniff(self):
+        """Test only extension is used when header sniffing is disabled"""
+        records = {record.rel_path: record for record in index_repo(self.repo_path, sniff=False)}
+
+        self.assertTrue(records["assets/logo.png"].is_binary)
+        self.assertFalse(records["src/data.raw"].is_binary)
+
+    def test_index_repo_prunes_ignored_directories(self):
+        """Test vendor directories and .gitignore rules skip whole subtrees, nested rules apply to their directory"""
+        files = {
+            "node_modules/react/index.js": "x",
+            "logs/app.log": "x",
+            "src/.gitignore": "gen/\n",
+            "src/gen/api.py": "x",
+            "gen/keep.py": "x",
+        }
+        for relative_path, content in files.items():
+            path = os.path.join(self.repo_path, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        with open(os.path.join(self.repo_path, ".gitignore"), "w") as f:
+            f.write("logs/\n")
+
+        rel_paths = [record.rel_path for record in index_repo(self.repo_path)]
+
+        self.assertIn("gen/keep.py", rel_paths)
+        self.assertNotIn("src/gen/api.py", rel_paths)
+        self.assertNotIn("logs/app.log", rel_paths)
+        self.assertNotIn("node_modules/react/index.js", rel_paths)
+        self.assertIn("node_modules/react/index.js",
+                      [record.rel_path for record in index_repo(self.repo_path, ignore_patterns=())])
+
+    def test_index_repo_nonexistent_directory(self):
+        """Test nonexistent directory gives empty index"""
+        self.assertEqual(index_repo(os.path.join(self.repo_path, "missing")), [])
+
+    def test_record_has_no_instance_dict(self):
+        """Test records use slots"""
+        record = FileRecord("/repo", "a.py", 1, ".py", False)
+
+        self.assertFalse(hasattr(record, "__dict__"))
+
+
+class TestFilterRecords(unittest.TestCase):
+    def test_filter_records(self):
+        """Test binary and oversized files are filtered out"""
+        text = FileRecord("/repo", "a.py", 10, ".py", False)
+        binary = FileRecord("/repo", "b.png", 10, ".png", True)
+        large = FileRecord("/repo", "package-lock.json", 5000, ".json", False)
+
+        self.assertEqual(filter_records([text, binary, large], max_file_size=1000), [text])
+        self.assertEqual(filter_records([text, binary, large], max_file_size=None), [text, large])
+        self.assertEqual(filter_records([text, binary, large], max_file_size=1000, include_binary=True),
+                         [text, binary])
+
+    def test_is_binary_extension(self):
+        """Test known binary extensions are detected case insensitively"""
+        self.assertTrue(is_binary_extension("/repo/IMAGE.PNG"))
+        self.assertFalse(is_binary_extension("/repo/main.py"))
+        self.assertFalse(is_binary_extension("/repo/Makefile"))
@@ -0,0 +1,251 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from unittest.mock import patch, AsyncMock, MagicMock
+from agent.llm_backends import StubBackend, StubBackendError, STUB_README
+from agent.llm_client import LLMClient
+from agent.request_scheduler import TokenBucket, RequestScheduler, is_transient_error, get_retry_after, \
+    PRIORITY_HIGH, PRIORITY_NORMAL
+from agent.token_counter import TokenCounter
+from tests.test_token_packer import CharEncoding
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_wait_time_refills_per_second(self):
+        """Test empty bucket refills limit per minute"""
+        bucket = TokenBucket(60)
+        now = bucket.updated
+
+        bucket.consume(60, now)
+
+        self.assertAlmostEqual(bucket.wait_time(1, now), 1.0)
+        self.assertAlmostEqual(bucket.wait_time(1, now + 0.5), 0.5)
+        self.assertEqual(bucket.wait_time(1, now + 1.0), 0.0)
+
+    def test_amount_above_capacity_waits_for_full_bucket(self):
+        """Test request larger than limit starts with full bucket instead of waiting forever"""
+        bucket = TokenBucket(600)
+        now = bucket.updated
+
+        self.assertEqual(bucket.wait_time(1000, now), 0.0)
+        bucket.consume(1000, now)
+        self.assertAlmostEqual(bucket.wait_time(600, now), 60.0)
+
+    def test_adjust_settles_reservation(self):
+        """Test unused tokens are returned and extra tokens are taken"""
+        bucket = TokenBucket(100)
+        now = bucket.updated
+        bucket.consume(50, now)
+
+        bucket.adjust(-20)
+        self.assertAlmostEqual(bucket.level, 70)
+        bucket.adjust(100)
+        self.assertAlmostEqual(bucket.level, -30)
+
+    def test_unsupported_rate(self):
+        """Test limit must be positive"""
+        with self.assertRaises(Exception):
+            TokenBucket(0)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def test_call_without_limits(self):
+        """Test call runs right away and is counted"""
+        scheduler = RequestScheduler()
+
+        self.assertEqual(scheduler.call(lambda: "response", prompt_tokens=10), "response")
+
+        stats = scheduler.stats()
+        self.assertEqual(stats["requests"], 1)
+        self.assertIsNone(stats["requests_per_minute_limit"])
+        self.assertFalse(scheduler.paces_tokens)
+
+    def test_requests_are_paced(self):
+        """Test requests above burst wait for the request bucket to refill"""
+        scheduler = RequestScheduler(requests_per_minute=1200)
+        scheduler.request_bucket.level = 1
+
+        start = time.monotonic()
+        for _ in range(3):
+            scheduler.call(lambda: "response")
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertGreater(scheduler.stats()["queue_wait"]["normal"]["max_seconds"], 0.0)
+
+    def test_tokens_are_paced_and_settled(self):
+        """Test token reservation waits for token bucket and is settled with counted completion tokens"""
+        scheduler = RequestScheduler(tokens_per_minute=6000, expected_completion_tokens=50)
+        scheduler.token_bucket.level = 100
+
+        scheduler.call(lambda: "response", prompt_tokens=50, count_tokens=lambda response: 10)
+        self.assertAlmostEqual(scheduler.token_bucket.level, 40, delta=1)
+
+        start = time.monotonic()
+        scheduler.call(lambda: "response", prompt_tokens=50, count_tokens=lambda response: 10)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.5)
+        self.assertEqual(scheduler.stats()["tokens"], 120)
+
+    @patch("agent.request_scheduler.time.sleep")
+    def test_failed_attempts_release_tokens(self, mock_sleep):
+        """Test token reservation of failed attempts is given back before retrying"""
+        scheduler = RequestScheduler(tokens_per_minute=6000, expected_completion_tokens=50)
+        scheduler.token_bucket.level = 1000
+        function = MagicMock(side_effect=[StubBackendError("error"), StubBackendError("error"), "response"])
+
+        scheduler.call(function, prompt_tokens=50, count_tokens=lambda response: 10)
+
+        self.assertAlmostEqual(scheduler.token_bucket.level, 940, delta=1)
+
+    def test_settle_later_keeps_reservation_until_settled(self):
+        """Test call with settle_later is settled with completion tokens reported afterwards"""
+        scheduler = RequestScheduler(tokens_per_minute=6000, expected_completion_tokens=50)
+        scheduler.token_bucket.level = 1000
+
+        scheduler.call(lambda: "stream", prompt_tokens=50, settle_later=True)
+        self.assertAlmostEqual(scheduler.token_bucket.level, 900, delta=1)
+        self.assertEqual(scheduler.stats()["requests"], 0)
+
+        scheduler.settle(prompt_tokens=50, completion_tokens=300)
+
+        self.assertAlmostEqual(scheduler.token_bucket.level, 650, delta=1)
+        self.assertEqual(scheduler.stats()["tokens"], 350)
+
+    def test_llm_client_settles_stream_with_received_tokens(self):
+        """Test streamed response settles token reservation with its counted completion tokens"""
+        scheduler = RequestScheduler(tokens_per_minute=60000, expected_completion_tokens=50)
+        client = LLMClient(api_key="", backend=StubBackend(), scheduler=scheduler)
+
+        with patch.object(LLMClient, "get_token_counter", return_value=TokenCounter(CharEncoding())):
+            response = "".join(client.stream(prompt="prompt", token_count=10))
+
+        self.assertEqual(scheduler.stats()["tokens"], 10 + len(response))
+
+    def test_high_priority_starts_first(self):
+        """Test waiting selection calls start before waiting README calls queued earlier"""
+        scheduler = RequestScheduler(requests_per_minute=600)
+        scheduler.request_bucket.level = 0
+        started = []
+
+        def submit(name: str, priority: int) -> threading.Thread:
+            thread = threading.Thread(target=scheduler.call, args=(lambda: started.append(name),),
+                                      kwargs={"priority": priority})
+            thread.start()
+            return thread
+
+        threads = [submit("normal-1", PRIORITY_NORMAL), submit("normal-2", PRIORITY_NORMAL)]
+        time.sleep(0.02)
+        threads.append(submit("high", PRIORITY_HIGH))
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(started, ["high", "normal-1", "normal-2"])
+        self.assertEqual(scheduler.stats()["queue_wait"]["high"]["starts"], 1)
+
+    @patch("agent.request_scheduler.time.sleep")
+    def test_transient_errors_are_retried(self, mock_sleep):
+        """Test transient error is retried with backoff capped by max delay"""
+        scheduler = RequestScheduler(max_retries=3, base_delay_seconds=1.0, max_delay_seconds=2.0, seed=1)
+        function = MagicMock(side_effect=[StubBackendError("error"), StubBackendError("error"), "response"])
+
+        self.assertEqual(scheduler.call(function), "response")
+
+        self.assertEqual(function.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertTrue(all(0.0 <= call.args[0] <= 2.0 for call in mock_sleep.call_args_list))
+        self.assertEqual(scheduler.stats()["retries"], 2)
+
+    @patch("agent.request_scheduler.time.sleep")
+    def test_retries_are_limited(self, mock_sleep):
+        """Test last transient error is raised when retries are exhausted"""
+        scheduler = RequestScheduler(max_retries=2)
+        function = MagicMock(side_effect=StubBackendError("error"))
+
+        with self.assertRaises(StubBackendError):
+            scheduler.call(function)
+
+        self.assertEqual(function.call_count, 3)
+        self.assertEqual(scheduler.stats()["failures"], 1)
+
+    def test_other_errors_are_not_retried(self):
+        """Test non-transient error is raised right away"""
+        scheduler = RequestScheduler()
+        function = MagicMock(side_effect=ValueError("bad request"))
+
+        with self.assertRaises(ValueError):
+            scheduler.call(function)
+
+        self.assertEqual(function.call_count, 1)
+        self.assertEqual(scheduler.stats()["retries"], 0)
+
+    @patch("agent.request_scheduler.time.sleep")
+    def test_retry_after_is_honored(self, mock_sleep):
+        """Test Retry-After of rate limit response sets minimal backoff"""
+        error = Exception("rate limited")
+        error.status_code = 429
+        error.response = MagicMock(headers={"retry-after": "3"})
+        scheduler = RequestScheduler(base_delay_seconds=0.1)
+
+        scheduler.call(MagicMock(side_effect=[error, "response"]))
+
+        self.assertEqual(mock_sleep.call_args.args[0], 3.0)
+
+    def test_is_transient_error(self):
+        """Test rate limit, timeout and server errors are transient"""
+        RateLimitError = type("RateLimitError", (Exception,), {})
+        server_error = Exception("server error")
+        server_error.status_code = 503
+        client_error = Exception("client error")
+        client_error.status_code = 400
+
+        self.assertTrue(is_transient_error(RateLimitError()))
+        self.assertTrue(is_transient_error(server_error))
+        self.assertTrue(is_transient_error(TimeoutError()))
+        self.assertFalse(is_transient_error(client_error))
+        self.assertFalse(is_transient_error(ValueError()))
+        self.assertIsNone(get_retry_after(client_error))
+
+
+class TestRequestSchedulerAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_acall_is_paced(self):
+        """Test async requests wait for request bucket without blocking the event loop"""
+        scheduler = RequestScheduler(requests_per_minute=1200)
+        scheduler.request_bucket.level = 1
+
+        async def function():
+            return "response"
+
+        start = time.monotonic()
+        for _ in range(3):
+            self.assertEqual(await scheduler.acall(function), "response")
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(scheduler.stats()["requests"], 3)
+
+    async def test_cancelled_request_gives_back_granted_reservation(self):
+        """Test request cancelled after its slot and tokens were granted returns them to the buckets"""
+        scheduler = RequestScheduler(requests_per_minute=60, tokens_per_minute=1000)
+        function = AsyncMock(return_value="response")
+
+        task = asyncio.create_task(scheduler.acall(function, prompt_tokens=100))
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        function.assert_not_awaited()
+        self.assertEqual(scheduler.request_bucket.level, 60)
+        self.assertEqual(scheduler.token_bucket.level, 1000)
+
+    async def test_llm_client_retries_stub_errors(self):
+        """Test client invoked through scheduler retries injected backend errors"""
+        backend = StubBackend(error_rate=0.5, seed=3)
+        client = LLMClient(api_key="", backend=backend,
+                           scheduler=RequestScheduler(max_retries=10, base_delay_seconds=0.001))
+
+        responses = [await client.ainvoke(prompt="prompt", token_count=1) for _ in range(5)]
+
+        self.assertEqual(responses, [STUB_README] * 5)
+        self.assertGreater(backend.calls, 5)
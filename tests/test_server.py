@@ -0,0 +1,112 @@
+import http.client
+import json
+import os
+import threading
+import unittest
+
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, patch
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from agent.batch import STATUS_SUCCESS
+from agent.job_queue import JobQueue
+from agent.server import JobServer, MAX_REQUEST_BYTES
+from agent.tracing import SummaryExporter
+from tests.test_job_queue import wait_for_status
+
+
+class TestJobServer(unittest.TestCase):
+    def setUp(self):
+        """Start server on a free port with a graph writing README files"""
+        self.temp_dir = TemporaryDirectory()
+
+        def invoke(state):
+            with open(os.path.join(self.temp_dir.name, "README.md"), "w", encoding="utf-8") as file:
+                file.write("# Repo")
+            return {**state, "temp_directory_path": self.temp_dir.name}
+
+        graph = MagicMock()
+        graph.invoke.side_effect = invoke
+        self.job_queue = JobQueue(graph, workers=1, max_queue_depth=2)
+        self.job_queue.start()
+        self.server = JobServer(self.job_queue, host="127.0.0.1", port=0, span_summary=SummaryExporter())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        """Stop server and workers"""
+        self.server.shutdown()
+        self.server.server_close()
+        self.job_queue.stop()
+        self.temp_dir.cleanup()
+
+    def request(self, path: str, body: dict = None) -> tuple:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        try:
+            with urlopen(Request(self.base_url + path, data=data, method="POST" if data else "GET")) as response:
+                return response.status, response.read()
+        except HTTPError as e:
+            return e.code, e.read()
+
+    def post_raw(self, content_length: str, body: bytes = b"") -> int:
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_port)
+        try:
+            connection.putrequest("POST", "/jobs")
+            connection.putheader("Content-Length", content_length)
+            connection.endheaders(body)
+            return connection.getresponse().status
+        finally:
+            connection.close()
+
+    def test_job_lifecycle(self):
+        """Test submitted job can be polled and its README downloaded"""
+        status, body = self.request("/jobs", {"repo_url": "https://github.com/user/repo"})
+        self.assertEqual(status, 202)
+        job_id = json.loads(body)["job_id"]
+
+        wait_for_status(self.job_queue, job_id, (STATUS_SUCCESS,))
+        status, body = self.request(f"/jobs/{job_id}")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["result"]["repo_url"], "https://github.com/user/repo")
+
+        status, body = self.request(f"/jobs/{job_id}/readme")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b"# Repo")
+
+    def test_metrics(self):
+        """Test metrics expose queue and LLM request statistics"""
+        status, body = self.request("/metrics")
+
+        metrics = json.loads(body)
+        self.assertEqual(status, 200)
+        self.assertEqual(metrics["queue"]["workers"], 1)
+        self.assertEqual(metrics["queue"]["max_queue_depth"], 2)
+        self.assertIn("llm_requests", metrics)
+        self.assertIn("spans", metrics)
+
+    @patch("agent.server.get_summary_cache")
+    @patch("agent.server.get_response_cache")
+    def test_metrics_report_cache_stats(self, mock_get_response_cache, mock_get_summary_cache):
+        """Test metrics expose response and summary cache hits and misses"""
+        mock_get_response_cache.return_value.stats.return_value = {"hits": 3, "misses": 1, "bypass": False}
+        mock_get_summary_cache.return_value.stats.return_value = {"hits": 5, "misses": 2, "bypass": False}
+
+        metrics = json.loads(self.request("/metrics")[1])
+
+        self.assertEqual(metrics["response_cache"], {"hits": 3, "misses": 1, "bypass": False})
+        self.assertEqual(metrics["summary_cache"], {"hits": 5, "misses": 2, "bypass": False})
+
+    def test_invalid_requests(self):
+        """Test bad bodies and unknown jobs and paths are rejected"""
+        self.assertEqual(self.request("/jobs", {"url": "missing"})[0], 400)
+        self.assertEqual(self.request("/jobs/unknown")[0], 404)
+        self.assertEqual(self.request("/jobs/unknown/readme")[0], 404)
+        self.assertEqual(self.request("/unknown")[0], 404)
+        self.assertEqual(self.request("/health")[0], 200)
+
+    def test_invalid_content_length(self):
+        """Test malformed, negative and too large Content-Length are rejected"""
+        self.assertEqual(self.post_raw("abc"), 400)
+        self.assertEqual(self.post_raw("-1"), 400)
+        self.assertEqual(self.post_raw(str(MAX_REQUEST_BYTES + 1)), 413)
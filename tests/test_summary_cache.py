@@ -0,0 +1,41 @@
+import os
+import unittest
+
+from tempfile import TemporaryDirectory
+
+from agent.summary_cache import FileSummaryCache
+
+
+class TestFileSummaryCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.cache = FileSummaryCache(os.path.join(self.temp_dir.name, "summaries.sqlite3"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_make_summary_key_depends_on_blob_path_model_and_template(self):
+        """Test key changes with blob content, file path, model and prompt template"""
+        key = FileSummaryCache.make_summary_key("sha", "LICENSE", "gpt-4o", "template")
+
+        assert key == FileSummaryCache.make_summary_key("sha", "LICENSE", "gpt-4o", "template")
+        assert key != FileSummaryCache.make_summary_key("other-sha", "LICENSE", "gpt-4o", "template")
+        assert key != FileSummaryCache.make_summary_key("sha", "docs/LICENSE.txt", "gpt-4o", "template")
+        assert key != FileSummaryCache.make_summary_key("sha", "LICENSE", "gpt-4o-mini", "template")
+        assert key != FileSummaryCache.make_summary_key("sha", "LICENSE", "gpt-4o", "other template")
+
+    def test_get_many_returns_only_hits(self):
+        """Test stored summaries are returned and misses are left out"""
+        self.cache.set_many({"a": "summary a", "b": "summary b"})
+
+        summaries = self.cache.get_many(["a", "b", "c"])
+
+        assert summaries == {"a": "summary a", "b": "summary b"}
+        assert self.cache.stats() == {"hits": 2, "misses": 1, "bypass": False}
+
+    def test_bypass_skips_reads(self):
+        """Test bypass ignores cached summaries"""
+        self.cache.set_many({"a": "summary a"})
+        bypass_cache = FileSummaryCache(self.cache.path, bypass=True)
+
+        assert bypass_cache.get_many(["a"]) == {}
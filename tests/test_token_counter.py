@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock
+
+from agent.token_counter import TokenCounter
+
+
+class TestTokenCounter(unittest.TestCase):
+    def setUp(self):
+        self.encoding = MagicMock()
+        self.encoding.encode_batch.side_effect = lambda texts, num_threads, disallowed_special: [
+            text.split() for text in texts
+        ]
+
+    def test_count_many_keeps_order(self):
+        """Test counts are returned in order of texts"""
+        counter = TokenCounter(self.encoding)
+
+        assert counter.count_many(["a b c", "d", ""]) == [3, 1, 0]
+
+    def test_counts_are_memoized_by_content(self):
+        """Test only unseen texts are encoded, in one batch"""
+        counter = TokenCounter(self.encoding, num_threads=4)
+        counter.count_many(["a b", "c"])
+
+        result = counter.count_many(["c", "a b", "d e f", "d e f"])
+
+        assert result == [1, 2, 3, 3]
+        assert self.encoding.encode_batch.call_count == 2
+        self.encoding.encode_batch.assert_called_with(["d e f"], num_threads=4, disallowed_special=())
+
+    def test_count_single_text(self):
+        """Test single text count"""
+        counter = TokenCounter(self.encoding)
+
+        assert counter.count("one two") == 2
+        assert counter.count("one two") == 2
+        self.encoding.encode_batch.assert_called_once()
+
+    def test_cache_is_bounded(self):
+        """Test least recently used counts are evicted"""
+        counter = TokenCounter(self.encoding, cache_size=2)
+        counter.count_many(["a", "b"])
+        counter.count("a")
+        counter.count("c")
+
+        counter.count("a")
+        assert self.encoding.encode_batch.call_count == 2
+
+        counter.count("b")
+        assert self.encoding.encode_batch.call_count == 3
+
+    def test_encode_treats_special_tokens_as_text(self):
+        """Test special tokens in file content do not raise"""
+        counter = TokenCounter(self.encoding)
+
+        counter.encode("<|endoftext|>")
+
+        self.encoding.encode.assert_called_once_with("<|endoftext|>", disallowed_special=())
@@ -0,0 +1,145 @@
+import os
+import unittest
+
+from tempfile import TemporaryDirectory
+
+from agent.file_utils import merge_file_contents, MAX_FILE_CHARS
+from agent.token_counter import TokenCounter
+from agent.token_packer import pack_files, pack_contents, count_file_tokens, split_into_chunks, \
+    MIN_TRUNCATED_TOKENS, TRUNCATION_MARKER
+
+
+class CharEncoding:
+    """Encoding with one token per character"""
+
+    def encode(self, text: str, disallowed_special=()) -> list:
+        return list(text)
+
+    def encode_batch(self, texts: list, num_threads: int = 1, disallowed_special=()) -> list:
+        return [list(text) for text in texts]
+
+    def decode(self, tokens: list) -> str:
+        return "".join(tokens)
+
+
+class TestPackFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.token_counter = TokenCounter(CharEncoding())
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _create_file(self, name: str, content: str) -> str:
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_all_files_fit(self):
+        """Test files are kept unchanged when they fit the budget"""
+        paths = [self._create_file("a.py", "a" * 10), self._create_file("b.py", "b" * 10)]
+
+        result = pack_files(paths, token_budget=1000, token_counter=self.token_counter)
+
+        assert result.file_contents == [(paths[0], "a" * 10), (paths[1], "b" * 10)]
+        assert result.token_count == len(merge_file_contents(result.file_contents))
+        assert result.truncated_file_paths == []
+        assert result.dropped_file_paths == []
+
+    def test_large_file_is_truncated_to_fit(self):
+        """Test file exceeding remaining budget is truncated"""
+        small = self._create_file("small.py", "s" * 100)
+        large = self._create_file("large.py", "l" * 5000)
+        budget = 1000
+
+        result = pack_files([small, large], token_budget=budget, token_counter=self.token_counter)
+
+        assert result.token_count <= budget
+        assert result.token_count == len(merge_file_contents(result.file_contents))
+        assert result.truncated_file_paths == [large]
+        assert result.file_contents[1][1].endswith(TRUNCATION_MARKER)
+
+    def test_file_is_dropped_when_remaining_budget_is_too_small(self):
+        """Test file is dropped when less than min truncated tokens remain, smaller files still packed"""
+        first = self._create_file("first.py", "f" * 900)
+        large = self._create_file("large.py", "l" * 5000)
+        tiny = self._create_file("tiny.py", "t")
+        budget = 900 + MIN_TRUNCATED_TOKENS // 2
+
+        result = pack_files([first, large, tiny], token_budget=budget, token_counter=self.token_counter)
+
+        assert [path for path, _ in result.file_contents] == [first, tiny]
+        assert result.dropped_file_paths == [large]
+        assert result.token_count <= budget
+
+    def test_unreadable_files_are_skipped(self):
+        """Test missing files are skipped"""
+        path = self._create_file("a.py", "a")
+
+        result = pack_files(["/not/a/real/file.py", path], token_budget=100, token_counter=self.token_counter)
+
+        assert result.file_contents == [(path, "a")]
+        assert result.dropped_file_paths == []
+
+    def test_file_above_char_limit_is_cut_with_marker(self):
+        """Test file content is read up to per-file character limit and marked as truncated"""
+        path = self._create_file("huge.py", "h" * (MAX_FILE_CHARS + 10))
+
+        result = pack_files([path], token_budget=2 * MAX_FILE_CHARS, token_counter=self.token_counter)
+
+        content = result.file_contents[0][1]
+        assert len(content) == MAX_FILE_CHARS
+        assert content.endswith(TRUNCATION_MARKER)
+
+    def test_token_counts_are_reused(self):
+        """Test given token counts are used instead of counting contents again"""
+        paths = [self._create_file("a.py", "a" * 10), self._create_file("b.py", "b" * 10)]
+
+        result = pack_files(paths, token_budget=1000, token_counter=self.token_counter,
+                            file_token_counts={paths[0]: 100, paths[1]: 200})
+
+        assert result.token_count == 300
+
+
+class TestPackContents(unittest.TestCase):
+    def test_packs_in_memory_contents(self):
+        """Test already read contents are packed into budget"""
+        contents = [("part 1", "a" * 300), ("part 2", "b" * 600)]
+
+        result = pack_contents(contents, token_budget=700, token_counter=TokenCounter(CharEncoding()))
+
+        assert result.file_contents[0] == ("part 1", "a" * 300)
+        assert result.truncated_file_paths == ["part 2"]
+        assert result.token_count <= 700
+
+
+class TestCountFileTokens(unittest.TestCase):
+    def test_counts_framed_content_per_file(self):
+        """Test tokens are counted per readable file including frame"""
+        with TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "a.py")
+            with open(path, "w") as f:
+                f.write("abc")
+
+            result = count_file_tokens([path, "/not/a/real/file.py"], TokenCounter(CharEncoding()))
+
+        assert result == [(path, len("--- a.py ---\nabc\n\n"))]
+
+
+class TestSplitIntoChunks(unittest.TestCase):
+    def test_splits_consecutive_files_by_budget(self):
+        """Test files are grouped into chunks that fit budget"""
+        counts = [("a", 40), ("b", 50), ("c", 30), ("d", 100), ("e", 10)]
+
+        assert split_into_chunks(counts, token_budget=100) == [["a", "b"], ["c"], ["d"], ["e"]]
+
+    def test_file_larger_than_budget_forms_own_chunk(self):
+        """Test oversized file is not merged with others"""
+        counts = [("a", 10), ("big", 500), ("b", 10)]
+
+        assert split_into_chunks(counts, token_budget=100) == [["a"], ["big"], ["b"]]
+
+    def test_empty(self):
+        """Test no files give no chunks"""
+        assert split_into_chunks([], token_budget=100) == []
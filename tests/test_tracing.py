@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from agent import tracing
+from agent.tracing import SpanExporter, SummaryExporter, JsonLinesExporter, RUN_SPAN_NAME
+
+
+class ListExporter(SpanExporter):
+    def __init__(self):
+        self.batches = []
+
+    def export(self, spans: list) -> None:
+        self.batches.append(spans)
+
+
+class FailingExporter(SpanExporter):
+    def export(self, spans: list) -> None:
+        raise OSError("disk full")
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.exporter = ListExporter()
+        tracing.add_exporter(self.exporter)
+
+    def tearDown(self):
+        tracing.remove_exporter(self.exporter)
+
+    def test_exporter_without_export_cannot_be_created(self):
+        """Test incomplete exporter fails when created instead of on its first export"""
+        class IncompleteExporter(SpanExporter):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteExporter()
+
+    def test_span_without_run_or_exporter_is_not_recorded(self):
+        """Test spans are skipped when nothing records them"""
+        tracing.remove_exporter(self.exporter)
+        try:
+            with tracing.span("clone") as span:
+                tracing.set_attributes(file_count=1)
+            self.assertIsNone(span)
+            self.assertFalse(tracing.is_recording())
+        finally:
+            tracing.add_exporter(self.exporter)
+
+    def test_run_exports_nested_spans_once(self):
+        """Test spans of a run are exported together with parents and attributes"""
+        with tracing.run(repo_url="https://github.com/user/repo.git") as run_span:
+            with tracing.span("clone_repo_node") as node_span:
+                tracing.set_attributes(file_count=3)
+                with tracing.span("index_repo"):
+                    tracing.add_to_attribute("chars_read", 10)
+                    tracing.add_to_attribute("chars_read", 5)
+
+        self.assertEqual(len(self.exporter.batches), 1)
+        spans = {span.name: span for span in self.exporter.batches[0]}
+        self.assertEqual(self.exporter.batches[0][-1].name, RUN_SPAN_NAME)
+        self.assertEqual(spans["index_repo"].parent_id, node_span.span_id)
+        self.assertEqual(spans["clone_repo_node"].parent_id, run_span.span_id)
+        self.assertEqual({span.run_id for span in spans.values()}, {run_span.run_id})
+        self.assertEqual(spans["clone_repo_node"].attributes, {"file_count": 3})
+        self.assertEqual(spans["index_repo"].attributes, {"chars_read": 15})
+        self.assertEqual(run_span.attributes, {"repo_url": "https://github.com/user/repo.git"})
+        self.assertGreaterEqual(run_span.wall_seconds, spans["clone_repo_node"].wall_seconds)
+        self.assertIsNotNone(run_span.cpu_seconds)
+
+    def test_span_records_error(self):
+        """Test failing block is recorded with error type and still exported"""
+        with self.assertRaises(ValueError):
+            with tracing.run():
+                with tracing.span("llm.invoke"):
+                    raise ValueError("boom")
+
+        spans = self.exporter.batches[0]
+        self.assertEqual([span.attributes.get("error") for span in spans], ["ValueError", "ValueError"])
+
+    def test_in_current_context_keeps_run_in_executor_threads(self):
+        """Test spans created in executor threads belong to the current run and span"""
+        with tracing.run() as run_span:
+            record_span = tracing.in_current_context(self._record_span)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(record_span, range(3)))
+
+        thread_spans = [span for span in self.exporter.batches[0] if span.name == "llm.invoke"]
+        self.assertEqual(len(self.exporter.batches), 1)
+        self.assertEqual(sorted(span.attributes["index"] for span in thread_spans), [0, 1, 2])
+        self.assertTrue(all(span.parent_id == run_span.span_id for span in thread_spans))
+
+    def test_traced_async_function_leaves_cpu_unset(self):
+        """Test async traced function is recorded without CPU time"""
+        @tracing.traced("readme_body_node")
+        async def node(state: dict) -> dict:
+            await asyncio.sleep(0)
+            return state
+
+        async def run_node():
+            with tracing.run(measure_cpu=False):
+                return await node({"readme_body": "body"})
+
+        self.assertEqual(asyncio.run(run_node()), {"readme_body": "body"})
+        spans = self.exporter.batches[0]
+        self.assertEqual([span.name for span in spans], ["readme_body_node", RUN_SPAN_NAME])
+        self.assertEqual([span.cpu_seconds for span in spans], [None, None])
+
+    def test_failing_exporter_does_not_fail_run(self):
+        """Test exporter errors are logged instead of raised"""
+        failing_exporter = FailingExporter()
+        tracing.add_exporter(failing_exporter)
+        try:
+            with tracing.run():
+                pass
+        finally:
+            tracing.remove_exporter(failing_exporter)
+
+        self.assertEqual(len(self.exporter.batches), 1)
+
+    @staticmethod
+    def _record_span(index: int) -> None:
+        with tracing.span("llm.invoke", index=index):
+            pass
+
+
+class TestExporters(unittest.TestCase):
+    def test_summary_exporter_aggregates_by_name(self):
+        """Test summary sums time and numeric attributes per span name"""
+        exporter = SummaryExporter()
+        tracing.add_exporter(exporter)
+        try:
+            for prompt_tokens in (100, 50):
+                with tracing.run(repo_url="url"):
+                    with tracing.span("llm.invoke", model="gpt-4o"):
+                        tracing.set_attributes(prompt_tokens=prompt_tokens, cache_hits=0)
+        finally:
+            tracing.remove_exporter(exporter)
+
+        stats = exporter.stats()
+        self.assertEqual(exporter.runs, 2)
+        self.assertEqual(stats["llm.invoke"]["count"], 2)
+        self.assertEqual(stats["llm.invoke"]["prompt_tokens"], 150)
+        self.assertEqual(stats["llm.invoke"]["cache_hits"], 0)
+        self.assertNotIn("model", stats["llm.invoke"])
+        self.assertEqual(stats[RUN_SPAN_NAME]["count"], 2)
+        self.assertIn("prompt_tokens=150", exporter.format_table())
+
+    def test_json_lines_exporter_writes_span_per_line(self):
+        """Test spans are appended as JSON lines"""
+        with TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "spans.jsonl")
+            exporter = JsonLinesExporter(path)
+            tracing.add_exporter(exporter)
+            try:
+                with tracing.run(repo_url="url"):
+                    with tracing.span("github.clone", clone_mode="full"):
+                        pass
+            finally:
+                tracing.remove_exporter(exporter)
+
+            with open(path, encoding="utf-8") as file:
+                spans = [json.loads(line) for line in file]
+
+        self.assertEqual([span["name"] for span in spans], ["github.clone", RUN_SPAN_NAME])
+        self.assertEqual(spans[0]["attributes"], {"clone_mode": "full"})
+        self.assertEqual(spans[0]["parent_id"], spans[1]["span_id"])
+        self.assertEqual(spans[0]["run_id"], spans[1]["run_id"])
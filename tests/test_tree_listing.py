@@ -0,0 +1,115 @@
+import unittest
+
+from agent.token_counter import TokenCounter
+from agent.tree_listing import encode_file_tree, fit_file_tree, partition_file_tree, format_size
+from tests.test_token_packer import CharEncoding
+
+
+class TestEncodeFileTree(unittest.TestCase):
+    def test_encodes_indented_tree_with_collapsed_chains(self):
+        """Test files come before subdirectories and single child directories are joined"""
+        rel_paths = ["README.md", "src/main/java/com/app/App.java", "src/main/java/com/app/Util.java",
+                     "src/test/AppTest.java", "pom.xml"]
+
+        result = encode_file_tree(rel_paths)
+
+        self.assertEqual(result, "\n".join([
+            "README.md",
+            "pom.xml",
+            "src/",
+            " main/java/com/app/",
+            "  App.java",
+            "  Util.java",
+            " test/",
+            "  AppTest.java",
+        ]))
+
+    def test_size_hints(self):
+        """Test sizes are shown next to file names"""
+        result = encode_file_tree(["a.py", "data/big.csv"], sizes={"a.py": 100, "data/big.csv": 3 * 1024 ** 2})
+
+        self.assertEqual(result, "a.py 100B\ndata/\n big.csv 3M")
+
+    def test_large_directory_is_summarized(self):
+        """Test files above per directory limit are summarized by extension"""
+        rel_paths = [f"migrations/{index:04}.sql" for index in range(100)] + ["migrations/README.md"]
+
+        result = encode_file_tree(rel_paths, max_files_per_dir=2)
+
+        self.assertEqual(result, "migrations/\n 0000.sql\n 0001.sql\n [+99 more: 98 .sql, 1 .md]")
+
+    def test_deep_subtrees_are_summarized(self):
+        """Test directories below max depth are shown as file counts"""
+        rel_paths = ["a/b/c.py", "a/b/d.py", "a/e/f.py", "g.py"]
+
+        self.assertEqual(encode_file_tree(rel_paths, max_depth=1), "g.py\na/\n b/ [2 files]\n e/ [1 files]")
+        self.assertEqual(encode_file_tree(rel_paths, max_files_per_dir=0, max_depth=0),
+                         "[1 files: 1 .py]\na/ [3 files]")
+
+    def test_format_size(self):
+        """Test size hints use bytes, kibibytes and mebibytes"""
+        self.assertEqual([format_size(size) for size in (512, 4096, 5 * 1024 ** 2)], ["512B", "4K", "5M"])
+
+
+class TestFitFileTree(unittest.TestCase):
+    def setUp(self):
+        self.token_counter = TokenCounter(CharEncoding())
+        self.rel_paths = [f"pkg{package}/module{module}/file{index}.py"
+                          for package in range(10) for module in range(10) for index in range(50)]
+
+    def test_full_listing_when_it_fits(self):
+        """Test listing with size hints is kept when budget allows"""
+        sizes = {rel_path: 10 for rel_path in self.rel_paths[:10]}
+
+        listing, token_count = fit_file_tree(self.rel_paths[:10], 10_000, self.token_counter, sizes=sizes)
+
+        self.assertIn("file0.py 10B", listing)
+        self.assertEqual(token_count, len(listing))
+
+    def test_listing_shrinks_to_budget(self):
+        """Test 5000 file listing is reduced until it fits the budget"""
+        full_listing = encode_file_tree(self.rel_paths)
+
+        listing, token_count = fit_file_tree(self.rel_paths, 2_000, self.token_counter)
+
+        self.assertGreater(len(full_listing), 2_000)
+        self.assertLessEqual(token_count, 2_000)
+        self.assertEqual(token_count, len(listing))
+        self.assertIn("pkg0/", listing)
+
+
+class TestPartitionFileTree(unittest.TestCase):
+    def setUp(self):
+        self.token_counter = TokenCounter(CharEncoding())
+
+    def test_single_listing_when_it_fits(self):
+        """Test tree that fits budget is not partitioned"""
+        rel_paths = ["README.md", "src/main.py"]
+
+        self.assertEqual(partition_file_tree(rel_paths, 1_000, self.token_counter),
+                         [("README.md\nsrc/\n main.py", 23)])
+
+    def test_partitions_by_directory_within_budget(self):
+        """Test large tree is split by directories into listings that fit and keep every file"""
+        rel_paths = [f"pkg{package}/module{module}/file{index}.py"
+                     for package in range(5) for module in range(4) for index in range(30)] + ["setup.py"]
+
+        chunks = partition_file_tree(rel_paths, 1_000, self.token_counter)
+
+        self.assertGreater(len(chunks), 1)
+        for listing, token_count in chunks:
+            self.assertEqual(token_count, len(listing))
+            self.assertLessEqual(token_count, 1_000)
+        self.assertTrue(chunks[0][0].startswith("setup.py\n"))
+        listed_files = [line.strip() for listing, _ in chunks for line in listing.split("\n")
+                        if line.strip().endswith(".py")]
+        self.assertEqual(len(listed_files), len(rel_paths))
+
+    def test_large_flat_directory_is_split(self):
+        """Test directory with too many files is split into slices of files"""
+        rel_paths = [f"data/{index:03}.json" for index in range(100)]
+
+        chunks = partition_file_tree(rel_paths, 300, self.token_counter)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(listing.startswith("data/\n") and token_count <= 300 for listing, token_count in chunks))